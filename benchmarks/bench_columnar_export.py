@@ -0,0 +1,79 @@
+# benchmarks/bench_columnar_export.py
+"""
+تصدير المؤشرات + الصفوف: to_json(include_rows=True) مقابل Arrow IPC و Parquet،
+ثم القراءة من عملية أخرى (memory_map بدون نسخ) مقابل json.loads.
+
+    python benchmarks/bench_columnar_export.py --rows 1000000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.compute_core import compute_core  # noqa: E402
+from engine.export import read_arrow_ipc, to_arrow_ipc, to_json, to_parquet  # noqa: E402
+from engine.kpi import compute_kpis  # noqa: E402
+
+
+def timed(fn, *args, **kw):
+    t0 = time.perf_counter()
+    out = fn(*args, **kw)
+    return time.perf_counter() - t0, out
+
+
+def make_core(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        "date": pd.Timestamp("2018-01-31") + pd.to_timedelta(rng.integers(0, 2500, rows), unit="D"),
+        "entity_name": rng.choice(np.array(["الرياض", "جدة", "الدمام"]), rows),
+        "revenue": np.round(rng.uniform(0, 50_000, rows), 2),
+        "expenses": np.round(rng.uniform(0, 40_000, rows), 2),
+        "vat_collected": np.round(rng.uniform(0, 7_500, rows), 2),
+        "vat_paid": np.round(rng.uniform(0, 6_000, rows), 2),
+    })
+    return compute_core(raw, copy=False)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--json-rows", type=int, default=0,
+                    help="حد صفوف مسار JSON (0 = كل الصفوف)؛ الزمن يُقدّر خطيًا")
+    args = ap.parse_args()
+
+    core = make_core(args.rows)
+    kpis = compute_kpis(core)
+    n_json = args.json_rows or args.rows
+    scale = args.rows / n_json
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arrow_path = os.path.join(tmp, "out.arrow")
+        parquet_path = os.path.join(tmp, "out.parquet")
+
+        t_json, text = timed(to_json, core.iloc[:n_json], include_rows=True, kpis=kpis)
+        t_json_read, _ = timed(json.loads, text)
+        t_ipc, _ = timed(to_arrow_ipc, core, arrow_path, kpis=kpis)
+        t_ipc_read, (table, _) = timed(read_arrow_ipc, arrow_path)
+        t_pq, _ = timed(to_parquet, core, parquet_path, kpis=kpis)
+
+        json_mb = len(text.encode("utf-8")) * scale / 1e6
+        print(f"rows={args.rows:,}" + (f"  (JSON on {n_json:,} rows, scaled)" if scale != 1 else ""))
+        print(f"json      write {t_json * scale:8.2f}s  read {t_json_read * scale:8.2f}s  {json_mb:10,.1f} MB")
+        print(f"arrow ipc write {t_ipc:8.2f}s  read {t_ipc_read:8.4f}s  "
+              f"{os.path.getsize(arrow_path) / 1e6:10,.1f} MB  (memory-mapped, {table.num_rows:,} rows)")
+        print(f"parquet   write {t_pq:8.2f}s  {'':19}{os.path.getsize(parquet_path) / 1e6:10,.1f} MB")
+        print(f"speedup vs json: arrow x{t_json * scale / t_ipc:.0f}, parquet x{t_json * scale / t_pq:.0f}")
+
+
+if __name__ == "__main__":
+    main()
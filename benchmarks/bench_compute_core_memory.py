@@ -0,0 +1,65 @@
+# benchmarks/bench_compute_core_memory.py
+"""
+ذروة الذاكرة لـ compute_core مع النسخ الكامل (copy=True) وبدونه (copy=False).
+
+    python benchmarks/bench_compute_core_memory.py --rows 2000000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.compute_core import compute_core  # noqa: E402
+
+
+def make_ledger(rows: int, extra_cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {
+        "date": pd.date_range("2000-01-31", periods=rows, freq="min"),
+        "entity_name": pd.Categorical(rng.integers(0, 50, rows).astype(str)),
+        "revenue": rng.uniform(1e3, 1e5, rows),
+        "expenses": rng.uniform(1e3, 1e5, rows),
+        "vat_collected": rng.uniform(0, 1e4, rows),
+        "vat_paid": rng.uniform(0, 1e4, rows),
+    }
+    for i in range(extra_cols):
+        data[f"memo_{i}"] = rng.uniform(0, 1, rows)
+    return pd.DataFrame(data)
+
+
+def measure(df: pd.DataFrame, copy: bool):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = compute_core(df, copy=copy)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del out
+    return peak, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--extra-cols", type=int, default=8)
+    args = ap.parse_args()
+
+    df = make_ledger(args.rows, args.extra_cols)
+    in_mb = df.memory_usage(deep=True).sum() / 2**20
+    print(f"input: {args.rows:,} rows, {in_mb:,.1f} MiB")
+    for copy in (True, False):
+        peak, elapsed = measure(df, copy)
+        print(f"copy={copy!s:<5} peak={peak / 2**20:>9,.1f} MiB  time={elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
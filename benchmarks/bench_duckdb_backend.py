@@ -0,0 +1,116 @@
+# benchmarks/bench_duckdb_backend.py
+"""
+المؤشرات الإجمالية + المجاميع الشهرية على ملف Parquet: pandas (تحميل + compute_core + compute_kpis)
+مقابل DuckDB (SQL مباشرة على الملف).
+
+    python benchmarks/bench_duckdb_backend.py --rows 1000000,10000000,100000000
+    python benchmarks/bench_duckdb_backend.py --rows 100000000 --skip-pandas-above 20000000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.compute_core import compute_core  # noqa: E402
+from engine.duckdb_backend import DuckLedger, duckdb_available  # noqa: E402
+from engine.kpi import compute_kpis  # noqa: E402
+
+CHUNK = 5_000_000
+
+
+def write_ledger(path: str, rows: int, seed: int = 0) -> None:
+    """دفتر تركيبي على دفعات (الذاكرة محكومة بـ CHUNK لا بعدد الصفوف)."""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("2015-01-31", periods=120, freq="ME").to_numpy()
+    writer = None
+    try:
+        for start in range(0, rows, CHUNK):
+            n = min(CHUNK, rows - start)
+            # أشهر مرتبة عبر الملف حتى يبقى "آخر صف في الشهر" معرفًا
+            month_idx = (np.arange(start, start + n) * len(months)) // rows
+            table = pa.table({
+                "date": months[month_idx],
+                "entity_name": rng.choice(np.array(["الرياض", "جدة", "الدمام"]), n),
+                "revenue": np.round(rng.uniform(0, 50_000, n), 2),
+                "expenses": np.round(rng.uniform(0, 40_000, n), 2),
+                "vat_collected": np.round(rng.uniform(0, 7_500, n), 2),
+                "vat_paid": np.round(rng.uniform(0, 6_000, n), 2),
+                "zakat_base": np.round(rng.uniform(0, 10_000, n), 2),
+            })
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def run_pandas(path: str):
+    df = pd.read_parquet(path)
+    core = compute_core(df, copy=False)
+    month = core["date"].dt.to_period("M").dt.to_timestamp("M")
+    monthly = core.groupby(month, sort=True)[["revenue", "expenses"]].sum()
+    return compute_kpis(core), monthly
+
+
+def run_duckdb(path: str):
+    ledger = DuckLedger(path)
+    return ledger.kpis(), ledger.monthly_totals(("revenue", "expenses")).set_index("date")
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="1000000,10000000,100000000")
+    ap.add_argument("--skip-pandas-above", type=int, default=0,
+                    help="لا تشغّل pandas فوق هذا العدد (0 = شغّله دائمًا)")
+    ap.add_argument("--dir", default=None, help="مجلد ملفات Parquet المؤقتة")
+    args = ap.parse_args()
+
+    if not duckdb_available():
+        sys.exit("duckdb is not installed (pip install duckdb)")
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for rows in (int(r) for r in args.rows.split(",")):
+            path = os.path.join(tmp, f"ledger_{rows}.parquet")
+            t_gen, _ = timed(write_ledger, path, rows)
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"rows={rows:,}  parquet={size_mb:,.0f} MB  (generated in {t_gen:.1f}s)")
+
+            t_duck, (k_duck, s_duck) = timed(run_duckdb, path)
+            print(f"  duckdb   {t_duck:8.2f}s  revenue={k_duck.total_revenue:,.2f}  net_vat={k_duck.net_vat:,.2f}")
+
+            if args.skip_pandas_above and rows > args.skip_pandas_above:
+                print("  pandas   skipped")
+                continue
+            try:
+                t_pd, (k_pd, s_pd) = timed(run_pandas, path)
+            except MemoryError:
+                print("  pandas   MemoryError")
+                continue
+            rel = abs(k_pd.total_revenue - k_duck.total_revenue) / max(abs(k_pd.total_revenue), 1.0)
+            month_diff = float(np.max(np.abs(s_pd.to_numpy() - s_duck.to_numpy())))
+            print(f"  pandas   {t_pd:8.2f}s  x{t_pd / t_duck:.1f} vs duckdb  "
+                  f"revenue rel.diff={rel:.1e}  net_vat diff={k_pd.net_vat - k_duck.net_vat:.2e}  "
+                  f"monthly max diff={month_diff:.1e}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_excel_backends.py
+"""
+مقارنة قارئات Excel في engine.io.load_excel على مصنفات 10k/100k/1M صف.
+
+    python benchmarks/bench_excel_backends.py --sizes 10000,100000,1000000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.io import LedgerCache, excel_backends, load_excel  # noqa: E402
+import engine.io as eio  # noqa: E402
+
+
+def make_workbook(path: str, rows: int) -> None:
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2015-01-31", periods=rows, freq="D")
+    rev = rng.uniform(1e4, 1e5, rows).round(2)
+    exp = (rev * rng.uniform(0.6, 1.1, rows)).round(2)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("data")
+    ws.append(["Entity Name", "Date", "Revenue", "Expenses", "VAT Collected", "VAT Paid"])
+    for i in range(rows):
+        ws.append([f"Branch {i % 20}", dates[i].to_pydatetime(), rev[i], exp[i],
+                   round(rev[i] * 0.15, 2), round(exp[i] * 0.15, 2)])
+    wb.save(path)
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+
+    backends = excel_backends()
+    print(f"available backends: {backends}")
+    print(f"{'rows':>9} | " + " | ".join(f"{b:>12}" for b in [*backends, "parquet_hit"]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # كاش معزول حتى لا تتأثر النتائج بملفات سابقة
+        eio._CACHE = LedgerCache(os.path.join(tmp, "cache"), max_bytes=1 << 34)
+        for rows in [int(x) for x in args.sizes.split(",") if x]:
+            path = os.path.join(tmp, f"ledger_{rows}.xlsx")
+            make_workbook(path, rows)
+
+            timings = [
+                _time(lambda: load_excel(path, use_cache=False, backend=b), args.repeat)
+                for b in backends
+            ]
+            load_excel(path, backend="parquet")  # تعبئة الكاش
+            timings.append(_time(lambda: load_excel(path, backend="parquet"), args.repeat))
+
+            print(f"{rows:>9} | " + " | ".join(f"{t:>11.3f}s" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_gosi.py
+"""
+اشتراكات التأمينات الاجتماعية لملف رواتب كامل: موظفون × أشهر (افتراضيًا 100 ألف × 12)
+ثم جدول المجاميع الشهري.
+
+    python benchmarks/bench_gosi.py --employees 100000 --months 12
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.gosi import compute_gosi, gosi_totals  # noqa: E402
+
+
+def make_payroll(employees: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "employee_id": np.char.add("E", np.arange(employees).astype(str)),
+        "basic_salary": np.round(rng.uniform(1_000, 60_000, employees), 2),
+        "housing_allowance": np.round(rng.uniform(0, 12_000, employees), 2),
+        "nationality": rng.choice(np.array(["سعودي", "Saudi", "Egyptian", "Indian", "Filipino"]), employees),
+    })
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--employees", type=int, default=100_000)
+    ap.add_argument("--months", type=int, default=12)
+    args = ap.parse_args()
+
+    payroll = make_payroll(args.employees)
+    months = pd.period_range("2024-01", periods=args.months, freq="M")
+
+    t0 = time.perf_counter()
+    contributions = compute_gosi(payroll, months=months)
+    t_rows = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    totals = gosi_totals(contributions)
+    t_totals = time.perf_counter() - t0
+
+    rows = len(contributions)
+    print(f"employees={args.employees:,}  months={args.months}  rows={rows:,}")
+    print(f"compute_gosi {t_rows:7.2f}s  {rows / t_rows:12,.0f} employee-months/s")
+    print(f"gosi_totals  {t_totals:7.2f}s")
+    print(f"total contributions (all months): {totals['total'].sum():,.2f} SAR")
+
+
+if __name__ == "__main__":
+    main()
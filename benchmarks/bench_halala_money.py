@@ -0,0 +1,63 @@
+# benchmarks/bench_halala_money.py
+"""
+ضريبة لكل صف ثم المجموع: float64 مقابل الهللة int64 (مع/بدون التحويل) مقابل Decimal.
+
+    python benchmarks/bench_halala_money.py --rows 5000000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.money import apply_rate, from_halalas, to_halalas  # noqa: E402
+
+VAT = 0.15
+
+
+def best_of(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--decimal-rows", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    amounts = np.round(rng.uniform(0.01, 50_000, args.rows), 2)
+    stored = to_halalas(amounts)
+
+    t_float, v_float = best_of(lambda: float((amounts * VAT).sum()), args.repeat)
+    t_conv, v_conv = best_of(lambda: int(apply_rate(to_halalas(amounts), VAT).sum()), args.repeat)
+    t_int, v_int = best_of(lambda: int(apply_rate(stored, VAT).sum()), args.repeat)
+
+    n_dec = min(args.decimal_rows, args.rows)
+    dec = [Decimal(f"{a:.2f}") for a in amounts[:n_dec]]
+    rate, cent = Decimal("0.15"), Decimal("0.01")
+    t_dec, _ = best_of(lambda: sum((a * rate).quantize(cent, ROUND_HALF_UP) for a in dec), 1)
+    t_dec *= args.rows / n_dec  # تقدير خطي لنفس عدد الصفوف
+
+    print(f"rows={args.rows:,}")
+    print(f"float64                 {t_float:8.3f}s  total={v_float:,.4f}")
+    print(f"halala (from float)     {t_conv:8.3f}s  total={from_halalas(v_conv):,.2f}  x{t_conv / t_float:.1f}")
+    print(f"halala (stored int64)   {t_int:8.3f}s  total={from_halalas(v_int):,.2f}  x{t_int / t_float:.1f}")
+    print(f"Decimal (estimated)     {t_dec:8.3f}s  x{t_dec / t_float:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_streaming_export.py
+"""
+ذروة الذاكرة (tracemalloc) لـ to_ndjson و to_xlsx على دفعات متزايدة العدد —
+يجب أن تبقى ثابتة مهما زاد عدد الصفوف.
+
+    python benchmarks/bench_streaming_export.py --rows 100000,400000 --formats ndjson,xlsx
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.export import to_ndjson, to_xlsx  # noqa: E402
+
+
+def chunks(total: int, size: int = 50_000):
+    rng = np.random.default_rng(0)
+    for start in range(0, total, size):
+        n = min(size, total - start)
+        yield pd.DataFrame({
+            "date": pd.Timestamp("2020-01-31") + pd.to_timedelta(rng.integers(0, 900, n), unit="D"),
+            "entity_name": rng.choice(np.array(["الرياض", "جدة"]), n),
+            "revenue": np.round(rng.uniform(0, 50_000, n), 2),
+            "expenses": np.round(rng.uniform(0, 40_000, n), 2),
+        })
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="100000,400000")
+    ap.add_argument("--formats", default="ndjson,xlsx")
+    args = ap.parse_args()
+    writers = {"ndjson": (to_ndjson, "out.ndjson"), "xlsx": (to_xlsx, "out.xlsx")}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats.split(","):
+            fn, name = writers[fmt]
+            for rows in (int(r) for r in args.rows.split(",")):
+                path = os.path.join(tmp, name)
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                fn(chunks(rows), path)
+                elapsed = time.perf_counter() - t0
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{fmt:7} rows={rows:>10,}  {elapsed:8.2f}s (traced)  peak={peak / 1e6:7.1f} MB  "
+                      f"file={os.path.getsize(path) / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_vat_reconcile.py
+"""
+مطابقة ضريبة سطور الفواتير لسنة كاملة: إطار واحد مقابل دفعات (pd.read_csv chunksize)،
+مع نسبة صغيرة من السطور المخالفة عمدًا للتحقق من اكتشافها كلها.
+
+    python benchmarks/bench_vat_reconcile.py --rows 5000000 --chunk 500000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.vat_reconcile import reconcile_invoices  # noqa: E402
+
+
+def make_lines(rows: int, bad_share: float = 0.001):
+    rng = np.random.default_rng(0)
+    amount = np.round(rng.uniform(-100, 20_000, rows), 2)   # السالب = إشعار دائن
+    vat = np.round(amount * 0.15, 2)
+    bad = rng.random(rows) < bad_share
+    vat[bad] += np.round(rng.uniform(0.05, 50, int(bad.sum())), 2)
+    lines = pd.DataFrame({
+        "invoice_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366, rows), unit="D"),
+        "invoice_no": np.arange(rows),
+        "invoice_type": rng.choice(np.array(["sales", "purchase"]), rows, p=[0.6, 0.4]),
+        "net_amount": amount,
+        "vat_amount": vat,
+        "entity_name": rng.choice(np.array(["الرياض", "جدة", "الدمام"]), rows),
+    })
+    return lines, int(bad.sum())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--chunk", type=int, default=500_000)
+    ap.add_argument("--frequency", default="quarterly", choices=["monthly", "quarterly"])
+    args = ap.parse_args()
+
+    lines, planted = make_lines(args.rows)
+
+    t0 = time.perf_counter()
+    full = reconcile_invoices(lines, frequency=args.frequency)
+    t_full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    chunked = reconcile_invoices(
+        (lines.iloc[i:i + args.chunk] for i in range(0, len(lines), args.chunk)),
+        frequency=args.frequency,
+    )
+    t_chunk = time.perf_counter() - t0
+
+    print(f"rows={args.rows:,}  planted mismatches={planted:,}")
+    print(f"frame   {t_full:7.2f}s  {args.rows / t_full:12,.0f} lines/s  found={full.mismatched_lines:,}")
+    print(f"chunked {t_chunk:7.2f}s  {args.rows / t_chunk:12,.0f} lines/s  found={chunked.mismatched_lines:,}")
+    print(f"periods equal: {full.periods.equals(chunked.periods)}  ({len(full.periods)} entity x period rows)")
+
+
+if __name__ == "__main__":
+    main()
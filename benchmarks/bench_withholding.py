@@ -0,0 +1,57 @@
+# benchmarks/bench_withholding.py
+"""
+ضريبة الاستقطاع على دفتر مدفوعات لغير المقيمين: تصنيف نوع الدفعة + النسبة + التجميع
+الشهري في تمريرة متجهة واحدة.
+
+    python benchmarks/bench_withholding.py --rows 2000000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from engine.withholding import compute_withholding, withholding_totals  # noqa: E402
+
+TYPES = np.array(["Royalties", "rent", "أتعاب إدارة", "consulting", "dividends", "freight", "غير مصنف"])
+
+
+def make_payments(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "payment_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366, rows), unit="D"),
+        "payee": rng.choice(np.array(["Vendor A", "Vendor B", "Vendor C"]), rows),
+        "payment_type": rng.choice(TYPES, rows),
+        "amount": np.round(rng.uniform(100, 1_000_000, rows), 2),
+    })
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    args = ap.parse_args()
+
+    payments = make_payments(args.rows)
+    t0 = time.perf_counter()
+    result = compute_withholding(payments)
+    t_rows = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    totals = withholding_totals(result.payments)
+    t_totals = time.perf_counter() - t0
+
+    print(f"rows={args.rows:,}")
+    print(f"compute_withholding {t_rows:7.2f}s  {args.rows / t_rows:12,.0f} payments/s")
+    print(f"withholding_totals  {t_totals:7.2f}s  ({len(totals)} months)")
+    print(f"withholding (all months): {totals['withholding'].sum():,.2f} SAR  "
+          f"(rejected rows: {len(result.rejected):,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# engine/columns.py
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.config import (
+    DEFAULT_ENGINE_CONFIG as CFG,
+    ColumnMap,
+    CURRENT_LIABILITIES,
+    ZAKATABLE_ASSETS,
+)
+
+# أسماء إضافية كانت taxes/forecasting_core تقبلها خارج ColumnMap
+_EXTRA_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "expenses": ("expense", "تكاليف"),
+    "vat_collected": ("vat_output", "ضريبة المخرجات"),
+    "vat_paid": ("vat_input", "ضريبة المدخلات"),
+    "zakat_base": ("وعاء الزكاة",),
+}
+
+
+def norm_name(c: Any) -> str:
+    """نفس تطبيع engine.io لأسماء الأعمدة: حروف صغيرة ومسافات -> _."""
+    return str(c).strip().lower().replace(" ", "_")
+
+
+@dataclass(frozen=True)
+class ColumnBinding:
+    """
+    ربط ثابت بين الأسماء الموحّدة (revenue, date, entity, ...) وأعمدة إطار معيّن،
+    مع عمود واحد لكل بند زكوي (أصول/خصوم). يُحسب مرة واحدة لكل مخطط أعمدة.
+    """
+    columns: Tuple[Any, ...]
+    names: Mapping[str, Any]
+    zakat_assets: Tuple[Any, ...] = ()
+    zakat_liabilities: Tuple[Any, ...] = ()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.names.get(name, default)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def __getitem__(self, name: str) -> Any:
+        return self.names[name]
+
+
+class ColumnResolver:
+    """
+    يبني جداول الأسماء البديلة مرة واحدة (ColumnMap + بنود الزكاة)، ثم يحل مخطط
+    أي إطار إلى ColumnBinding — النتيجة محفوظة (memoized) حسب صف أسماء الأعمدة.
+    """
+
+    def __init__(self, colmap: ColumnMap = CFG.colmap,
+                 extra_aliases: Mapping[str, Iterable[str]] = _EXTRA_ALIASES,
+                 zakat_assets: Mapping[str, Iterable[str]] = ZAKATABLE_ASSETS,
+                 zakat_liabilities: Mapping[str, Iterable[str]] = CURRENT_LIABILITIES):
+        aliases: Dict[str, Tuple[str, ...]] = {}
+        for f in fields(colmap):
+            names = (f.name, *getattr(colmap, f.name), *extra_aliases.get(f.name, ()))
+            aliases[f.name] = tuple(dict.fromkeys(norm_name(n) for n in names))
+        self._aliases = aliases
+        self._assets = tuple(tuple(norm_name(a) for a in al) for al in zakat_assets.values())
+        self._liabs = tuple(tuple(norm_name(a) for a in al) for al in zakat_liabilities.values())
+        self._resolve = lru_cache(maxsize=256)(self._resolve_columns)
+
+    def aliases(self, name: str) -> Tuple[str, ...]:
+        return self._aliases.get(name, (norm_name(name),))
+
+    def _resolve_columns(self, columns: Tuple[Any, ...]) -> ColumnBinding:
+        lookup: Dict[str, Any] = {}
+        for c in columns:
+            lookup.setdefault(norm_name(c), c)
+
+        def first(cands: Iterable[str]) -> Optional[Any]:
+            for a in cands:
+                if a in lookup:
+                    return lookup[a]
+            return None
+
+        bound = {}
+        for name, cands in self._aliases.items():
+            col = first(cands)
+            if col is not None:
+                bound[name] = col
+        assets = tuple(c for c in (first(g) for g in self._assets) if c is not None)
+        liabs = tuple(c for c in (first(g) for g in self._liabs) if c is not None)
+        return ColumnBinding(columns=columns, names=MappingProxyType(bound),
+                             zakat_assets=assets, zakat_liabilities=liabs)
+
+    def resolve(self, df: Union[pd.DataFrame, Iterable[Any]]) -> ColumnBinding:
+        cols = df.columns if hasattr(df, "columns") else df
+        return self._resolve(tuple(cols))
+
+
+DEFAULT_RESOLVER = ColumnResolver()
+
+
+def resolve_columns(df: Union[pd.DataFrame, Iterable[Any]],
+                    binding: Optional[ColumnBinding] = None) -> ColumnBinding:
+    """يرجع binding الممرر إن وجد، وإلا يحل أعمدة الإطار بالمحلل الافتراضي."""
+    return binding if binding is not None else DEFAULT_RESOLVER.resolve(df)
+
+
+def resolve_aliases(df: Union[pd.DataFrame, Iterable[Any]],
+                    table: Mapping[str, Iterable[str]]) -> Dict[str, Any]:
+    """
+    حل جدول أسماء بديلة مستقل عن ColumnMap (سطور الفواتير، ملفات الرواتب...):
+    الحقل -> أول عمود يطابق أحد أسمائه بعد norm_name. الحقول غير الموجودة تُحذف.
+    """
+    cols = df.columns if hasattr(df, "columns") else df
+    lookup: Dict[str, Any] = {}
+    for c in cols:
+        lookup.setdefault(norm_name(c), c)
+    out: Dict[str, Any] = {}
+    for name, aliases in table.items():
+        for a in aliases:
+            if norm_name(a) in lookup:
+                out[name] = lookup[norm_name(a)]
+                break
+    return out
+
+
+# ----------------------------- Value parsing ---------------------------------
+# مشتركة بين محركات الملفات الجانبية (الرواتب، المدفوعات، سطور الفواتير)
+
+# قيم "نعم" في أعمدة منطقية نصية (is_saudi, is_resident, ...)
+TRUE_LABELS: Tuple[str, ...] = ("1", "true", "yes", "y", "نعم")
+
+
+def to_float_array(s: pd.Series) -> np.ndarray:
+    """
+    float64 لعمود مبالغ: الأرقام كما هي، والنصوص بعد حذف فواصل الآلاف والمسافات
+    ("2,000" و "2٬000" -> 2000). غير الرقمي أو الفارغ -> NaN.
+    """
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        return s.to_numpy(dtype=np.float64, na_value=np.nan)
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    text = s.astype("string").str.replace("[,\\s\u066c]", "", regex=True)
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def is_truthy(s: pd.Series, labels: Iterable[str] = TRUE_LABELS) -> np.ndarray:
+    """bool لكل صف: عمود منطقي كما هو، أو نص ضمن labels (factorize ثم مقارنة القيم المميزة فقط)."""
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return s.fillna(False).to_numpy(dtype=bool)
+    codes, uniques = pd.factorize(s)
+    accepted = {str(a).strip().lower() for a in labels}
+    hit = np.array([str(u).strip().lower() in accepted for u in uniques] + [False])
+    return hit[codes]
+
+
+def month_ordinals(values: Any) -> np.ndarray:
+    """
+    سنة*12 + شهر-1 لكل قيمة (تاريخ، "2024-01"، Period شهري، أو YYYYMM رقمًا أو نصًا مثل 202401).
+    غير الصالح -> -1. أرقام الأشهر 1-12 بلا سنة تُرفض (ValueError) بدل قراءتها كتواريخ epoch.
+    """
+    s = pd.Series(values)
+    if isinstance(s.dtype, pd.PeriodDtype):
+        s = s.dt.to_timestamp()
+    elif s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+        kind = pd.api.types.infer_dtype(s, skipna=True)
+        if kind in ("integer", "floating", "mixed-integer-float"):
+            s = pd.to_numeric(s, errors="coerce")
+        elif kind == "string":
+            # "202401" كنص (من Excel أو CSV بأعمدة نصية) = YYYYMM وليس تاريخًا
+            text = s.str.strip()
+            if text.notna().any() and text.dropna().str.fullmatch(r"\d{6}").all():
+                s = pd.to_numeric(text, errors="coerce")
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        v = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        if ((v >= 1) & (v <= 12)).any():
+            raise ValueError("Month values look like month numbers (1-12) without a year; "
+                             "use YYYY-MM, YYYYMM or dates")
+        year, month = np.divmod(v, 100)
+        ok = (v == np.floor(v)) & (year >= 1900) & (month >= 1) & (month <= 12)
+        return np.where(ok, year * 12 + month - 1, -1).astype(np.int64)
+    d = pd.to_datetime(s, errors="coerce")
+    ords = (d.dt.year * 12 + d.dt.month - 1).to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(ords), -1, ords).astype(np.int64)
@@ -0,0 +1,84 @@
+# engine/compact.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import resolve_columns
+
+# أعمدة يضيفها المحرك أو المحمّل ويجب أن تبقى
+_DERIVED = ("profit", "profit_margin", "cash_flow", "sheet", "category")
+
+
+@dataclass(frozen=True)
+class CompactReport:
+    before_bytes: int
+    after_bytes: int
+    dropped: Tuple[str, ...] = ()
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.before_bytes - self.after_bytes
+
+    @property
+    def saved_pct(self) -> float:
+        return (self.saved_bytes / self.before_bytes * 100.0) if self.before_bytes else 0.0
+
+
+def _known_columns(df: pd.DataFrame) -> Set[str]:
+    cols = resolve_columns(df)
+    return {*cols.names.values(), *cols.zakat_assets, *cols.zakat_liabilities,
+            *(c for c in df.columns if str(c).strip().lower() in _DERIVED)}
+
+
+def compact_frame(
+    df: pd.DataFrame,
+    amounts: Optional[str] = None,
+    drop_unused: bool = True,
+    keep: Iterable[str] = (),
+    max_category_ratio: float = 0.5,
+) -> Tuple[pd.DataFrame, CompactReport]:
+    """
+    وضع مضغوط اختياري لإطارات المحرك (قبل/بعد compute_core):
+    - المبالغ تبقى float64 افتراضيًا (النتائج مطابقة للإطار الأصلي)؛ amounts="float32"
+      اختياري صريح (~7 أرقام معنوية: تضيع الهللات فوق ~100 ألف ريال)
+    - الأعداد الصحيحة -> أصغر نوع صحيح يسعها
+    - أعمدة النصوص قليلة التكرار (المنشأة، الفئة...) -> Categorical
+    - حذف الأعمدة التي لا تطابق أي اسم يعرفه المحرك (drop_unused)
+
+    الناتج يُمرر كما هو إلى taxes و forecasting_core و export.
+    """
+    if amounts not in (None, "float64", "float32"):
+        raise ValueError(f"Unknown amounts mode: {amounts!r} (expected None, 'float64' or 'float32')")
+    before = int(df.memory_usage(deep=True).sum())
+
+    dropped: Tuple[str, ...] = ()
+    if drop_unused:
+        wanted = {str(k).strip().lower() for k in keep}
+        known = _known_columns(df)
+        dropped = tuple(c for c in df.columns
+                        if c not in known and str(c).strip().lower() not in wanted)
+        df = df.drop(columns=list(dropped))
+
+    out = {}
+    n = len(df)
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_float_dtype(s.dtype):
+            out[col] = s.astype(np.float32) if amounts == "float32" else s
+        elif pd.api.types.is_integer_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+            out[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype):
+            if n and s.nunique(dropna=True) <= max_category_ratio * n:
+                out[col] = s.astype("category")
+            else:
+                out[col] = s
+        else:
+            out[col] = s
+    compacted = pd.DataFrame(out, index=df.index)
+
+    after = int(compacted.memory_usage(deep=True).sum())
+    return compacted, CompactReport(before_bytes=before, after_bytes=after, dropped=dropped)
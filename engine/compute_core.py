@@ -1,25 +1,33 @@
 # engine/compute_core.py
-from engine.config import DEFAULT_ENGINE_CONFIG as CFG
+from __future__ import annotations
+from typing import Optional
+from engine.columns import ColumnBinding, resolve_columns
 import pandas as pd
 import numpy as np
 
-def _pick_series(df: pd.DataFrame, name: str, aliases) -> pd.Series:
+def _pick_series(df: pd.DataFrame, name: str, binding: ColumnBinding) -> pd.Series:
     """
-    Return the first matching column among [name] + aliases; otherwise a NaN series.
+    Return the column bound to the canonical name; otherwise a NaN series.
     """
-    for c in (name, *aliases):
-        if c in df.columns:
-            return df[c]
+    col = binding.get(name)
+    if col is not None:
+        return df[col]
     # no match -> NaN series (will be handled downstream)
     return pd.Series(np.nan, index=df.index)
 
-def compute_core(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    colmap = CFG.colmap
+def compute_core(df: pd.DataFrame, binding: Optional[ColumnBinding] = None,
+                 copy: bool = True) -> pd.DataFrame:
+    """
+    copy=False: نسخة سطحية تشارك أعمدة الإدخال بدل نسخها بالكامل. كل الأعمدة
+    المشتقة تُسند كأعمدة كاملة (لا كتابة داخلية)، فالإطار الأصلي لا يتغير —
+    نفس ضمان copy-on-write في pandas.
+    """
+    out = df.copy(deep=copy)
+    cols = resolve_columns(out, binding)
 
     # read with aliases (supports: revenue/sales/turnover ... etc)
-    rev = _pick_series(out, "revenue", colmap.revenue)
-    exp = _pick_series(out, "expenses", colmap.expenses)
+    rev = _pick_series(out, "revenue", cols)
+    exp = _pick_series(out, "expenses", cols)
 
     # coerce to numeric safely (strings -> numbers; invalid -> NaN)
     rev = pd.to_numeric(rev, errors="coerce")
@@ -43,9 +51,9 @@ def compute_core(df: pd.DataFrame) -> pd.DataFrame:
     )
 
     # cash flow (if opening/closing provided) else fallback to profit
-    if "opening_cash" in out.columns and "closing_cash" in out.columns:
-        oc = pd.to_numeric(out["opening_cash"], errors="coerce").fillna(0)
-        cc = pd.to_numeric(out["closing_cash"], errors="coerce").fillna(0)
+    if "opening_cash" in cols and "closing_cash" in cols:
+        oc = pd.to_numeric(out[cols["opening_cash"]], errors="coerce").fillna(0)
+        cc = pd.to_numeric(out[cols["closing_cash"]], errors="coerce").fillna(0)
         out["cash_flow"] = cc - oc
     else:
         out["cash_flow"] = out["profit"].fillna(0)
@@ -1,6 +1,13 @@
 from __future__ import annotations
+import os
 from dataclasses import dataclass, field
-from typing import Tuple
+from typing import Dict, Tuple
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """تفعيل خيار من متغير بيئة (1/true/yes) بدون تعديل DEFAULT_ENGINE_CONFIG المجمّد."""
+    value = os.getenv(name, "").strip().lower()
+    return default if not value else value in ("1", "true", "yes", "on")
 
 @dataclass(frozen=True)
 class ColumnMap:
@@ -12,22 +19,162 @@ class ColumnMap:
     opening_cash: Tuple[str, ...] = ("opening_cash", "cash_opening", "begin_cash", "الرصيد_الافتتاحي")
     closing_cash: Tuple[str, ...] = ("closing_cash", "cash_closing", "end_cash", "الرصيد_الختامي")
     zakat_base: Tuple[str, ...] = ("zakat_base", "zakatable_base", "الوعاء_الزكوي")
+    entity: Tuple[str, ...] = ("entity_name", "company", "company_name", "entity",
+                               "اسم_الشركة", "المنشأة", "المنشاة", "الكيان")
 
 DEFAULT_COL_MAP = ColumnMap()
 
+# Zakat alias tables (أصول زكوية / خصوم متداولة)
+ZAKATABLE_ASSETS: Dict[str, Tuple[str, ...]] = {
+    "cash": (
+        "cash","bank","cash_and_equivalents","cash_equivalents",
+        "النقد","النقدية","نقد","سيولة","البنوك","حسابات بنكية"
+    ),
+    "ar": (
+        "accounts_receivable","trade_receivables","receivables",
+        "العملاء","الذمم المدينة","مدينون"
+    ),
+    "inventory": (
+        "inventory","stock","المخزون"
+    ),
+    "prepaid_oca": (
+        "prepaid_expenses","other_current_assets",
+        "مصروفات مدفوعة مقدماً","أصول متداولة أخرى","اصول متداولة اخرى"
+    ),
+}
+CURRENT_LIABILITIES: Dict[str, Tuple[str, ...]] = {
+    "ap": (
+        "accounts_payable","trade_payables","payables",
+        "الدائنون","الذمم الدائنة","موردون"
+    ),
+    "st_loans": (
+        "short_term_loans","short_term_borrowings",
+        "قروض قصيرة الأجل","تسهيلات قصيرة الأجل"
+    ),
+    "accruals": (
+        "accrued_expenses","accruals","مصروفات مستحقة"
+    ),
+    "other_cl": (
+        "other_current_liabilities","خصوم متداولة أخرى","التزامات متداولة اخرى"
+    ),
+}
+
+# أعمدة سطور الفواتير (engine.vat_reconcile) — أسماء بديلة لكل حقل
+INVOICE_LINE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "date": ("invoice_date", "date", "issue_date", "تاريخ_الفاتورة", "تاريخ"),
+    "invoice": ("invoice_no", "invoice_number", "invoice_id", "رقم_الفاتورة"),
+    "kind": ("invoice_type", "type", "direction", "نوع_الفاتورة", "النوع"),
+    "amount": ("net_amount", "taxable_amount", "amount", "line_amount", "المبلغ_قبل_الضريبة", "المبلغ"),
+    "vat": ("vat_amount", "tax_amount", "vat", "مبلغ_الضريبة", "الضريبة"),
+    "rate": ("vat_rate", "tax_rate", "نسبة_الضريبة"),
+    "entity": ("entity_name", "company", "entity", "المنشأة", "الكيان"),
+}
+# نوع الفاتورة -> output (مبيعات) أو input (مشتريات)
+INVOICE_KINDS: Dict[str, str] = {
+    "sales": "output", "sale": "output", "output": "output", "مبيعات": "output", "بيع": "output",
+    "purchase": "input", "purchases": "input", "input": "input", "مشتريات": "input", "شراء": "input",
+}
+
 @dataclass(frozen=True)
 class TaxConfig:
     vat_rate: float = 0.15
     zakat_rate: float = 0.025
     zakat_mode: str = "base_if_available_else_zero"
+    # "float" (الافتراضي) أو "halala": مبالغ الضريبة/الزكاة بالهللة int64 بتقريب صريح
+    # RAKEEM_MONEY_MODE=halala يغيّر الافتراضي، و engine.money.money_mode(...) لنطاق محدد
+    money_mode: str = field(default_factory=lambda: os.getenv("RAKEEM_MONEY_MODE", "").strip() or "float")
+    rounding: str = "half_up"   # half_up | half_even | truncate
+    # الفرق المقبول (ريال) بين ضريبة سطر الفاتورة المذكورة والمحسوبة قبل اعتباره خطأ
+    vat_line_tolerance: float = 0.01
 
 DEFAULT_TAX = TaxConfig()
 
+# أعمدة ملف الرواتب (engine.gosi)
+PAYROLL_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "employee": ("employee_id", "emp_id", "employee_no", "رقم_الموظف", "الموظف"),
+    "month": ("month", "period", "payroll_month", "date", "الشهر", "الفترة"),
+    "wage": ("contributory_wage", "gosi_wage", "wage", "الأجر_الخاضع", "الأجر"),
+    "basic": ("basic_salary", "basic", "salary", "الراتب_الأساسي", "الراتب"),
+    "housing": ("housing_allowance", "housing", "بدل_السكن"),
+    "nationality": ("nationality", "الجنسية"),
+    "is_saudi": ("is_saudi", "saudi", "سعودي"),
+    "employer_rate": ("employer_rate", "نسبة_صاحب_العمل"),
+    "employee_rate": ("employee_rate", "نسبة_الموظف"),
+}
+
+@dataclass(frozen=True)
+class GosiConfig:
+    # اشتراكات التأمينات الاجتماعية (نسبة من الأجر الخاضع = الأساسي + السكن)
+    # السعودي: معاشات 9% + أخطار مهنية 2% + ساند 0.75% على صاحب العمل، ومعاشات 9% + ساند 0.75% على الموظف
+    saudi_employer_rate: float = 0.1175
+    saudi_employee_rate: float = 0.0975
+    # غير السعودي: أخطار مهنية فقط على صاحب العمل
+    non_saudi_employer_rate: float = 0.02
+    non_saudi_employee_rate: float = 0.0
+    wage_floor: float = 1_500.0
+    wage_cap: float = 45_000.0
+    saudi_labels: Tuple[str, ...] = ("saudi", "sa", "ksa", "saudi arabia", "سعودي", "سعودية", "السعودية")
+
+DEFAULT_GOSI = GosiConfig()
+
+# ضريبة الاستقطاع على المدفوعات لغير المقيمين (engine.withholding):
+# نوع الدفعة -> (النسبة, أسماء بديلة كما تظهر في دفاتر المدفوعات)
+WITHHOLDING_RATES: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "management_fees": (0.20, ("management fees", "management_fee", "أتعاب إدارة", "اتعاب ادارة")),
+    "royalties": (0.15, ("royalty", "royalties", "license fees", "إتاوات", "اتاوات", "ريع")),
+    "related_party_services": (0.15, ("head office services", "related party services",
+                                      "خدمات المركز الرئيسي", "خدمات طرف ذي علاقة")),
+    "rent": (0.05, ("rent", "rental", "إيجار", "ايجار")),
+    "technical_services": (0.05, ("technical services", "consulting", "consulting services",
+                                  "خدمات فنية", "خدمات استشارية", "استشارات")),
+    "tickets_freight": (0.05, ("air tickets", "freight", "shipping", "تذاكر طيران", "شحن")),
+    "telecom": (0.05, ("international telecom", "telecommunications", "اتصالات دولية")),
+    "dividends": (0.05, ("dividend", "dividends", "أرباح موزعة", "توزيعات أرباح")),
+    "loan_returns": (0.05, ("interest", "loan returns", "loan interest", "عوائد قروض", "فوائد")),
+    "insurance": (0.05, ("insurance", "reinsurance", "insurance premiums", "أقساط تأمين", "إعادة تأمين")),
+    "other": (0.15, ("other", "other payments", "أخرى", "مدفوعات أخرى")),
+}
+# نوع غير معروف يُعامل كـ "مدفوعات أخرى"
+WITHHOLDING_DEFAULT_TYPE = "other"
+
+# أعمدة دفتر المدفوعات
+PAYMENT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "date": ("payment_date", "date", "تاريخ_الدفع", "التاريخ"),
+    "payee": ("payee", "beneficiary", "vendor", "المستفيد"),
+    "payment_type": ("payment_type", "type", "category", "نوع_الدفعة", "نوع_المدفوعات", "النوع"),
+    "amount": ("amount", "gross_amount", "payment_amount", "المبلغ", "مبلغ_الدفعة"),
+    "is_resident": ("is_resident", "resident", "مقيم"),
+    "rate": ("withholding_rate", "treaty_rate", "نسبة_الاستقطاع"),
+}
+
+@dataclass(frozen=True)
+class CacheConfig:
+    # نسخة Parquet مطبّعة من الملفات المرفوعة (مفتاحها بصمة المحتوى)
+    enabled: bool = True
+    directory: str = ".rakeem_cache"
+    max_bytes: int = 512 * 1024 * 1024
+
+DEFAULT_CACHE = CacheConfig()
+
+@dataclass(frozen=True)
+class StoreConfig:
+    # مخزن SQLite دائم لدفاتر الشركات (engine.store) — العميل العائد يُقرأ دفتره بالمفتاح
+    enabled: bool = True
+    path: str = ".rakeem_store/ledgers.sqlite"
+
+DEFAULT_STORE = StoreConfig()
+
 @dataclass(frozen=True)
 class EngineConfig:
     colmap: ColumnMap = field(default_factory=lambda: DEFAULT_COL_MAP)
     taxes: TaxConfig = field(default_factory=lambda: DEFAULT_TAX)
+    cache: CacheConfig = field(default_factory=lambda: DEFAULT_CACHE)
+    store: StoreConfig = field(default_factory=lambda: DEFAULT_STORE)
+    gosi: GosiConfig = field(default_factory=lambda: DEFAULT_GOSI)
     required_min: Tuple[str, ...] = ("revenue", "expenses")
     date_col_fallback: str = "date"
+    # وضع مضغوط اختياري (float32 + Categorical) — انظر engine.compact
+    # RAKEEM_COMPACT_FRAMES=1 يفعّله، أو compact_frames في معاملات AnalysisPipeline
+    compact_frames: bool = field(default_factory=lambda: _env_flag("RAKEEM_COMPACT_FRAMES"))
 
 DEFAULT_ENGINE_CONFIG = EngineConfig()
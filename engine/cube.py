@@ -0,0 +1,291 @@
+# engine/cube.py
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import ColumnBinding, resolve_columns
+from engine.config import DEFAULT_ENGINE_CONFIG
+from engine.kpi import entity_keys, kpi_arrays
+
+CUBE_METRICS = (
+    "rows", "revenue", "expenses", "profit", "cash_flow",
+    "vat_output", "vat_input", "zakat_base", "zakat_assets", "zakat_liabilities",
+)
+GRAINS = ("month", "quarter", "fiscal_year")
+
+# مقاييس مشتقة تُحسب وقت الاستعلام (فرق مقياسين مخزنين)
+_DERIVED = {"net_vat": ("vat_output", "vat_input")}
+
+# يتغير عند تغيير شكل الملف أو منطق البناء
+_CUBE_VERSION = 1
+
+
+def _fold(month: np.ndarray, offset: int, width: int) -> np.ndarray:
+    """يجمع محور الأشهر إلى فترات بطول width تبدأ قبل أول شهر بـ offset شهر."""
+    m, e, t = month.shape
+    n = -(-(offset + t) // width)
+    padded = np.zeros((m, e, n * width), dtype=month.dtype)
+    padded[:, :, offset: offset + t] = month
+    return padded.reshape(m, e, n, width).sum(axis=3)
+
+
+def _from_month(metrics: Tuple[str, ...], entities: Tuple[str, ...], start: int,
+                fye: int, month: np.ndarray) -> "RollupCube":
+    m0 = start % 12                          # 0..11
+    return RollupCube(
+        metrics=metrics,
+        entities=entities,
+        start_month=start,
+        fiscal_year_end_month=fye,
+        month=month,
+        quarter=_fold(month, m0 % 3, 3),
+        fiscal_year=_fold(month, (m0 - fye) % 12, 12),
+    )
+
+
+@dataclass(frozen=True)
+class RollupCube:
+    """
+    مكعب تجميع: المقاييس × المنشأة × الفترة (شهر/ربع/سنة مالية) كمصفوفات NumPy
+    بالشكل (metric, entity, period). يُبنى مرة واحدة لكل بيانات ثم يُستعلم بدل groupby.
+    الأرباع تقويمية؛ السنة المالية تنتهي بـ fiscal_year_end_month وتُسمى بسنة نهايتها.
+    """
+    metrics: Tuple[str, ...]
+    entities: Tuple[str, ...]
+    start_month: int            # year*12 + month-1 لأول شهر
+    fiscal_year_end_month: int
+    month: np.ndarray
+    quarter: np.ndarray
+    fiscal_year: np.ndarray
+
+    # ---------- Periods ----------
+    def _first(self, grain: str) -> pd.Period:
+        y, m = divmod(self.start_month, 12)
+        first = pd.Period(year=y, month=m + 1, freq="M")
+        if grain == "month":
+            return first
+        if grain == "quarter":
+            return first.asfreq("Q")
+        if grain == "fiscal_year":
+            fye = self.fiscal_year_end_month
+            return pd.Period(year=y + (1 if m + 1 > fye else 0), freq="Y")
+        raise ValueError(f"Unknown grain: {grain!r} (expected one of {GRAINS})")
+
+    def _array(self, grain: str) -> np.ndarray:
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain: {grain!r} (expected one of {GRAINS})")
+        return getattr(self, grain)
+
+    def labels(self, grain: str = "month") -> List[str]:
+        n = self._array(grain).shape[2]
+        first = self._first(grain)
+        if grain == "fiscal_year":
+            return [f"FY{first.year + i}" for i in range(n)]
+        return [str(first + i) for i in range(n)]
+
+    def period_ends(self, grain: str = "month") -> pd.DatetimeIndex:
+        """تاريخ نهاية كل فترة (آخر يوم في الشهر/الربع/السنة المالية)."""
+        n = self._array(grain).shape[2]
+        first = self._first(grain)
+        if grain == "fiscal_year":
+            fye = self.fiscal_year_end_month
+            return pd.DatetimeIndex([
+                pd.Period(year=first.year + i, month=fye, freq="M").end_time.normalize()
+                for i in range(n)
+            ])
+        return pd.period_range(first, periods=n).end_time.normalize()
+
+    # ---------- Query ----------
+    def _metric(self, arr: np.ndarray, metric: str) -> np.ndarray:
+        if metric in _DERIVED:
+            a, b = _DERIVED[metric]
+            return self._metric(arr, a) - self._metric(arr, b)
+        try:
+            return arr[self.metrics.index(metric)]
+        except ValueError:
+            raise KeyError(f"Unknown cube metric: {metric!r}") from None
+
+    def values(self, metric: str, grain: str = "month", entity: Optional[str] = None) -> np.ndarray:
+        """قيم مقياس لكل فترة — لمنشأة واحدة، أو مجموع كل المنشآت عند entity=None."""
+        m = self._metric(self._array(grain), metric)
+        if entity is None:
+            return m.sum(axis=0)
+        try:
+            return m[self.entities.index(entity)]
+        except ValueError:
+            raise KeyError(f"Unknown entity: {entity!r}") from None
+
+    def frame(self, grain: str = "month", metrics: Optional[Sequence[str]] = None,
+              entity: Optional[str] = None, by_entity: bool = False) -> pd.DataFrame:
+        """جدول جاهز للرسم/التقارير: period, date (نهاية الفترة), [entity_name], المقاييس."""
+        metrics = tuple(metrics) if metrics else (*self.metrics, *_DERIVED)
+        labels, ends = self.labels(grain), self.period_ends(grain)
+        if not by_entity:
+            data = {"period": labels, "date": ends}
+            data.update({m: self.values(m, grain, entity) for m in metrics})
+            return pd.DataFrame(data)
+        arr = self._array(grain)
+        e, t = len(self.entities), len(labels)
+        data = {
+            "period": np.tile(np.asarray(labels, dtype=object), e),
+            "date": np.tile(ends.to_numpy(), e),
+            "entity_name": np.repeat(np.asarray(self.entities, dtype=object), t),
+        }
+        data.update({m: self._metric(arr, m).reshape(-1) for m in metrics})
+        return pd.DataFrame(data)
+
+    def combine(self, other: "RollupCube", sign: float = 1.0) -> "RollupCube":
+        """
+        يجمع مكعبين (sign=-1 للطرح) على اتحاد المنشآت والأشهر — للتحديث التزايدي:
+        المكعب القديم - صفوف محذوفة + صفوف مضافة. المنشآت/الأشهر التي لم يبقَ لها صفوف تُحذف.
+        """
+        if other.metrics != self.metrics or other.fiscal_year_end_month != self.fiscal_year_end_month:
+            raise ValueError("Cannot combine cubes with different metrics or fiscal year end")
+        parts = [(c, s) for c, s in ((self, 1.0), (other, sign)) if c.entities and c.month.shape[2]]
+        if not parts:
+            return self
+        entities = sorted({e for c, _ in parts for e in c.entities})
+        start = min(c.start_month for c, _ in parts)
+        end = max(c.start_month + c.month.shape[2] for c, _ in parts)
+        month = np.zeros((len(self.metrics), len(entities), end - start))
+        for c, s in parts:
+            ei = [entities.index(e) for e in c.entities]
+            off = c.start_month - start
+            month[:, ei, off: off + c.month.shape[2]] += s * c.month
+
+        rows = month[self.metrics.index("rows")]
+        keep = rows.sum(axis=1) > 0.5
+        month = month[:, keep]
+        active = np.flatnonzero(rows[keep].sum(axis=0) > 0.5)
+        if not active.size:
+            return _from_month(self.metrics, (), 0, self.fiscal_year_end_month,
+                               np.zeros((len(self.metrics), 0, 0)))
+        month = month[:, :, active[0]: active[-1] + 1]
+        return _from_month(self.metrics, tuple(e for e, k in zip(entities, keep) if k),
+                           start + int(active[0]), self.fiscal_year_end_month, month)
+
+    # ---------- Persistence ----------
+    def save(self, path: Union[str, Path]) -> Path:
+        """يحفظ المكعب كملف .npz (المصفوفات + وصف JSON) — كتابة ذرية."""
+        path = Path(path)
+        meta = {
+            "version": _CUBE_VERSION,
+            "metrics": list(self.metrics),
+            "entities": list(self.entities),
+            "start_month": self.start_month,
+            "fiscal_year_end_month": self.fiscal_year_end_month,
+        }
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as fh:
+                np.savez_compressed(fh, month=self.month, quarter=self.quarter,
+                                    fiscal_year=self.fiscal_year, meta=np.array(json.dumps(meta)))
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RollupCube":
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("version") != _CUBE_VERSION:
+                raise ValueError(f"Unsupported cube version: {meta.get('version')}")
+            return cls(
+                metrics=tuple(meta["metrics"]),
+                entities=tuple(meta["entities"]),
+                start_month=int(meta["start_month"]),
+                fiscal_year_end_month=int(meta["fiscal_year_end_month"]),
+                month=z["month"], quarter=z["quarter"], fiscal_year=z["fiscal_year"],
+            )
+
+
+def build_cube(df: pd.DataFrame, fiscal_year_end_month: int = 12,
+               entity_col: Optional[str] = None,
+               binding: Optional[ColumnBinding] = None) -> RollupCube:
+    """
+    يبني المكعب من ناتج compute_core في تمريرة واحدة (bincount على مفتاح منشأة×شهر)،
+    ثم يطوي الأشهر إلى أرباع وسنوات مالية بدون المرور على الصفوف مجددًا.
+    الصفوف بدون تاريخ صالح لا تدخل المكعب.
+    """
+    if not 1 <= int(fiscal_year_end_month) <= 12:
+        raise ValueError("fiscal_year_end_month must be between 1 and 12")
+    fye = int(fiscal_year_end_month)
+    cols = resolve_columns(df, binding)
+    date_col = cols.get("date")
+    k = len(CUBE_METRICS)
+
+    d = (pd.to_datetime(df[date_col], errors="coerce") if date_col is not None and not df.empty
+         else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]"))
+    valid = d.notna().to_numpy()
+    if not valid.any():
+        return _from_month(CUBE_METRICS, (), 0, fye, np.zeros((k, 0, 0)))
+
+    a = kpi_arrays(df, cols)
+    ords = (d.dt.year * 12 + d.dt.month - 1).to_numpy()[valid].astype(np.int64)
+    start = int(ords.min())
+    t = int(ords.max()) - start + 1
+
+    ent_codes, entities = pd.factorize(entity_keys(df, entity_col or cols.get("entity"))[valid], sort=True)
+    e = len(entities)
+    flat = ent_codes * t + (ords - start)
+
+    scale = a.vat_scale
+    rows = {
+        "rows": np.ones(len(df)),
+        "revenue": a.revenue,
+        "expenses": a.expenses,
+        "profit": a.profit,
+        "cash_flow": a.cash_flow,
+        "vat_output": a.vat_out * scale,
+        "vat_input": a.vat_in * scale,
+        "zakat_base": a.zakat_base,
+        "zakat_assets": a.assets_total(),
+        "zakat_liabilities": a.liabilities_total(),
+    }
+    month = np.stack([
+        np.bincount(flat, weights=np.nan_to_num(rows[m][valid]), minlength=e * t).reshape(e, t)
+        for m in CUBE_METRICS
+    ])
+
+    return _from_month(CUBE_METRICS, tuple(str(x) for x in entities), start, fye, month)
+
+
+def load_or_build_cube(df: pd.DataFrame, fiscal_year_end_month: int = 12,
+                       key: Optional[str] = None, use_cache: Optional[bool] = None) -> RollupCube:
+    """
+    نفس build_cube مع حفظ المكعب في كاش الدفاتر (.npz بجانب نسخ Parquet) حتى يبقى
+    بعد إعادة التشغيل. key اختياري (مثل بصمة الملف المرفوع)، وإلا بصمة الإطار.
+    """
+    from engine.io import frame_fingerprint, get_cache
+
+    enabled = DEFAULT_ENGINE_CONFIG.cache.enabled if use_cache is None else use_cache
+    if not enabled:
+        return build_cube(df, fiscal_year_end_month)
+
+    cache = get_cache()
+    name = f"{key or frame_fingerprint(df)}-cube-fy{int(fiscal_year_end_month)}-v{_CUBE_VERSION}"
+    path = cache.path_for(name, ".npz")
+    if path.exists():
+        try:
+            cube = RollupCube.load(path)
+            cache.touch(path)
+            return cube
+        except Exception:
+            pass  # ملف تالف أو نسخة قديمة — يُعاد بناؤه
+    cube = build_cube(df, fiscal_year_end_month)
+    try:
+        cube.save(path)
+        cache.touch(path, evict=True)
+    except OSError:
+        pass
+    return cube
+
@@ -0,0 +1,329 @@
+# engine/duckdb_backend.py
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from engine.columns import ColumnBinding, resolve_columns
+from engine.kpi import MOM_METRICS, KPIResult
+from engine.money import default_rounding, from_halalas, halala_mode, money_diff, money_rate
+from engine.taxes import _vat_rate, zakat_from_parts
+
+Source = Union[str, Path, Sequence[Union[str, Path]]]
+
+
+def duckdb_available() -> bool:
+    return importlib.util.find_spec("duckdb") is not None
+
+
+def _connect(database: str = ":memory:"):
+    if not duckdb_available():
+        raise ImportError("DuckDB backend requires the 'duckdb' package (pip install duckdb)")
+    import duckdb
+    return duckdb.connect(database)
+
+
+def _quote(name: Any) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(s: str) -> str:
+    return "'" + s.replace("'", "''") + "'"
+
+
+def _paths(source: Source) -> List[str]:
+    paths = [str(source)] if isinstance(source, (str, Path)) else [str(p) for p in source]
+    if not paths:
+        raise ValueError("No source files given")
+    return paths
+
+
+def _kind(paths: Sequence[str]) -> str:
+    suffixes = {Path(p).suffix.lower() for p in paths}
+    if suffixes <= {".parquet", ".pq"}:
+        return "parquet"
+    if suffixes <= {".csv", ".txt"}:
+        return "csv"
+    raise ValueError(f"Unsupported source type(s) for DuckDB backend: {sorted(suffixes)}")
+
+
+def _scan(source: Source) -> str:
+    """read_parquet / read_csv حسب الامتداد (يقبل مسارًا أو glob أو قائمة ملفات)."""
+    paths = _paths(source)
+    arg = "[" + ", ".join(_literal(p) for p in paths) + "]"
+    if _kind(paths) == "parquet":
+        return f"read_parquet({arg})"
+    return f"read_csv({arg}, header=true)"
+
+
+def _ordered_scan(source: Source) -> Tuple[str, str]:
+    """
+    (القراءة, تعبير ترتيب الملف) — row_number() OVER () لا يضمن ترتيب الملف مع القراءة المتوازية.
+    Parquet: file_row_number داخل كل ملف + ترتيب الملف (ترتيب القائمة، أو الاسم مع glob).
+    CSV (بدون file_row_number): قراءة متسلسلة parallel=false مع preserve_insertion_order.
+    """
+    paths = _paths(source)
+    arg = "[" + ", ".join(_literal(p) for p in paths) + "]"
+    if _kind(paths) == "csv":
+        return f"read_csv({arg}, header=true, parallel=false)", "row_number() OVER ()"
+    scan = f"read_parquet({arg}, filename=true, file_row_number=true)"
+    if len(paths) == 1 and not any(ch in paths[0] for ch in "*?["):
+        return scan, "file_row_number"
+    if any(ch in p for p in paths for ch in "*?["):
+        file_key = "filename"
+    else:
+        file_key = "CASE filename " + " ".join(
+            f"WHEN {_literal(p)} THEN {i}" for i, p in enumerate(paths)) + " END"
+    return scan, f"((dense_rank() OVER (ORDER BY {file_key})) << 40) + file_row_number"
+
+
+# صيغ نصية يقرؤها pd.to_datetime (dayfirst=False: الشهر أولًا ثم اليوم عند الغموض) +
+# YYYY-MM و YYYYMM كشهر (مثل engine.columns.month_ordinals)
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y",
+                 "%Y-%m", "%Y/%m", "%Y%m")
+
+
+def _date_sql(col: str, sql_type: str) -> str:
+    """تعبير TIMESTAMP لعمود التاريخ بنفس قواعد مسار pandas؛ غير الصالح -> NULL."""
+    t = sql_type.upper()
+    if t.startswith(("TIMESTAMP", "DATE")):
+        return f"CAST({col} AS TIMESTAMP)"
+    if t in ("BIGINT", "INTEGER", "HUGEINT", "SMALLINT", "UBIGINT", "UINTEGER", "DOUBLE", "FLOAT"):
+        # رقم YYYYMM (مثل 202401) = شهر، وليس ثوانٍ منذ 1970
+        v = f"TRY_CAST({col} AS BIGINT)"
+        return (f"CASE WHEN {v} BETWEEN 190001 AND 999912 AND {v} % 100 BETWEEN 1 AND 12 "
+                f"THEN make_timestamp({v} // 100, {v} % 100, 1, 0, 0, 0) END")
+    text = f"trim(CAST({col} AS VARCHAR))"
+    formats = "[" + ", ".join(_literal(f) for f in _DATE_FORMATS) + "]"
+    return f"coalesce(TRY_CAST({text} AS TIMESTAMP), try_strptime({text}, {formats}))"
+
+
+def _halalas_sql(expr: str, rounding: str) -> str:
+    """نفس engine.money.to_halalas: ×100 ثم تقريب لـ 6 خانات ثم قاعدة التقريب."""
+    s = f"round(coalesce({expr}, 0) * 100, 6)"
+    if rounding == "half_even":
+        r = f"round_even({s}, 0)"
+    elif rounding == "truncate":
+        r = f"trunc({s})"
+    else:
+        r = f"sign({s}) * floor(abs({s}) + 0.5)"
+    return f"CAST({r} AS BIGINT)"
+
+
+class DuckLedger:
+    """
+    نفس حسابات compute_core / compute_vat / compute_zakat / compute_kpis وتحضير السلسلة
+    الشهرية، لكن كاستعلامات SQL في DuckDB مباشرة على ملفات Parquet/CSV — الصفوف لا تُحمّل
+    في pandas، وفقط النتائج المجمّعة (صف واحد أو صف لكل شهر) تعود لبايثون.
+    المبالغ الضريبية/الزكوية تمر بنفس money_rate / zakat_from_parts، وفي halala_mode
+    تُجمع بالهللة داخل SQL فتطابق مسار pandas بالهللة تمامًا.
+    """
+
+    def __init__(self, source: Source, con: Any = None, binding: Optional[ColumnBinding] = None):
+        self.source = source
+        self.con = con if con is not None else _connect()
+        self._scan = _scan(source)
+        self._ordered, self._row_expr = _ordered_scan(source)
+        described = self.con.execute(f"DESCRIBE SELECT * FROM {self._scan}").fetchall()
+        self._types = {r[0]: str(r[1]) for r in described}
+        self.binding = resolve_columns([r[0] for r in described], binding)
+
+    # ---------- SQL ----------
+    def _num(self, name: Optional[str]) -> str:
+        if name is None:
+            return "CAST(NULL AS DOUBLE)"
+        # مثل pd.to_numeric(errors="coerce"): غير الرقمي -> NULL
+        return f"TRY_CAST({_quote(name)} AS DOUBLE)"
+
+    def core_sql(self, row_order: bool = True) -> str:
+        """
+        استعلام يعيد أعمدة compute_core (revenue, expenses, profit, profit_margin, cash_flow)
+        + __date و __row (ترتيب الملف) + الأعمدة الرقمية للضريبة والزكاة.
+        row_order=False: بدون __row — التجميعات لا تحتاج الترتيب فتبقى تمريرة متدفقة.
+        """
+        b = self.binding
+        date = b.get("date")
+        typed = [
+            f"{self._num(b.get('revenue'))} AS revenue",
+            f"{self._num(b.get('expenses'))} AS expenses",
+            f"{self._num(b.get('vat_collected'))} AS vat_collected",
+            f"{self._num(b.get('vat_paid'))} AS vat_paid",
+            f"{self._num(b.get('zakat_base'))} AS zakat_base",
+            f"{self._num(b.get('opening_cash'))} AS opening_cash",
+            f"{self._num(b.get('closing_cash'))} AS closing_cash",
+            (_date_sql(_quote(date), self._types.get(date, "VARCHAR")) if date is not None
+             else "CAST(NULL AS TIMESTAMP)")
+            + " AS __date",
+            (f"CAST({_quote(b['entity'])} AS VARCHAR)" if "entity" in b else "CAST(NULL AS VARCHAR)")
+            + " AS __entity",
+        ]
+        typed += [f"{self._num(c)} AS __asset_{i}" for i, c in enumerate(b.zakat_assets)]
+        typed += [f"{self._num(c)} AS __liab_{i}" for i, c in enumerate(b.zakat_liabilities)]
+
+        if "opening_cash" in b and "closing_cash" in b:
+            cash = "coalesce(closing_cash, 0) - coalesce(opening_cash, 0)"
+        else:
+            cash = "coalesce(revenue, 0) - coalesce(expenses, 0)"
+        return f"""
+            WITH src AS (SELECT *, {self._row_expr if row_order else "NULL"} AS __row
+                         FROM {self._ordered if row_order else self._scan}),
+            typed AS (SELECT __row, {", ".join(typed)} FROM src)
+            SELECT *,
+                   coalesce(revenue, 0) - coalesce(expenses, 0) AS profit,
+                   CASE WHEN revenue IS NULL OR revenue = 0 OR isnan(revenue) THEN 0.0
+                        ELSE (coalesce(revenue, 0) - coalesce(expenses, 0)) / revenue * 100 END
+                       AS profit_margin,
+                   {cash} AS cash_flow
+            FROM typed
+        """
+
+    def write_core(self, path: Union[str, Path]) -> Path:
+        """يكتب ناتج compute_core (المشتقات فقط) إلى Parquet بدون المرور بـ pandas."""
+        path = Path(path)
+        cols = "revenue, expenses, profit, profit_margin, cash_flow, __date AS date, __entity AS entity_name"
+        self.con.execute(f"COPY (SELECT {cols} FROM ({self.core_sql()}) ORDER BY __row) "
+                         f"TO {_literal(str(path))} (FORMAT PARQUET)")
+        return path
+
+    # ---------- Aggregates ----------
+    def _money_sum(self, expr: str) -> str:
+        if halala_mode():
+            return f"coalesce(sum({_halalas_sql(expr, default_rounding())}), 0)"
+        return f"coalesce(fsum({expr}), 0)"
+
+    def _totals(self) -> Dict[str, Any]:
+        b = self.binding
+        if "vat_collected" in b and "vat_paid" in b:
+            vat_out, vat_in = "vat_collected", "vat_paid"
+        else:
+            vat_out, vat_in = "revenue", "expenses"
+        money = {
+            "vat_out": vat_out,
+            "vat_in": vat_in,
+            "zakat_base": "zakat_base",
+            **{f"__asset_{i}": f"__asset_{i}" for i in range(len(b.zakat_assets))},
+            **{f"__liab_{i}": f"__liab_{i}" for i in range(len(b.zakat_liabilities))},
+        }
+        aggs = [
+            "count(*) AS rows",
+            "coalesce(fsum(revenue), 0) AS revenue",
+            "coalesce(fsum(expenses), 0) AS expenses",
+            "coalesce(fsum(profit), 0) AS profit",
+            "coalesce(fsum(cash_flow), 0) AS cash_flow",
+            "coalesce(avg(profit_margin), 0) AS margin",
+        ] + [f"{self._money_sum(expr)} AS {_quote(name)}" for name, expr in money.items()]
+        cur = self.con.execute(f"SELECT {', '.join(aggs)} FROM ({self.core_sql(row_order=False)})")
+        names = [d[0] for d in cur.description]
+        row = dict(zip(names, cur.fetchone()))
+
+        def total(name: str) -> float:
+            v = row[name]
+            return from_halalas(int(v)) if halala_mode() else float(v)
+
+        # مثل kpi._money: الضرب في النسبة بعد الجمع
+        scale = 1.0 if vat_out == "vat_collected" else _vat_rate()
+        out = {k: row[k] for k in ("rows", "revenue", "expenses", "profit", "cash_flow", "margin")}
+        for k in ("vat_out", "vat_in"):
+            out[k] = total(k) if scale == 1.0 else money_rate(total(k), scale)
+        out["zakat_base"] = total("zakat_base")
+        out["zakat_assets"] = sum(total(f"__asset_{i}") for i in range(len(b.zakat_assets)))
+        out["zakat_liabilities"] = sum(total(f"__liab_{i}") for i in range(len(b.zakat_liabilities)))
+        return out
+
+    def vat_parts(self) -> Tuple[float, float]:
+        t = self._totals()
+        return t["vat_out"], t["vat_in"]
+
+    def compute_vat(self) -> float:
+        return money_diff(*self.vat_parts())
+
+    def zakat_parts(self) -> Tuple[float, float, float]:
+        t = self._totals()
+        return t["zakat_base"], t["zakat_assets"], t["zakat_liabilities"]
+
+    def compute_zakat(self, rate: Optional[float] = None) -> float:
+        return zakat_from_parts(*self.zakat_parts(), rate=rate)
+
+    def _mom(self) -> Mapping[str, Mapping[str, float]]:
+        if "date" not in self.binding:
+            return MappingProxyType({})
+        cols = ", ".join(f"coalesce({m}, 0)" for m in MOM_METRICS)
+        rows = self.con.execute(
+            f"SELECT {cols} FROM ({self.core_sql()}) WHERE __date IS NOT NULL ORDER BY __row DESC LIMIT 2"
+        ).fetchall()
+        mom: Dict[str, Mapping[str, float]] = {}
+        if len(rows) == 2:
+            for k, name in enumerate(MOM_METRICS):
+                last, prev = float(rows[0][k]), float(rows[1][k])
+                delta = last - prev
+                pct = (delta / (prev if prev != 0 else 1)) * 100.0
+                mom[name] = MappingProxyType({"last": last, "prev": prev, "delta": delta, "pct": pct})
+        return MappingProxyType(mom)
+
+    def kpis(self, zakat_rate: Optional[float] = None) -> KPIResult:
+        """نفس compute_kpis(compute_core(df)) — تمريرة تجميع واحدة + صفّان للتغير الشهري."""
+        t = self._totals()
+        rev, profit = float(t["revenue"]), float(t["profit"])
+        base, assets, liab = t["zakat_base"], t["zakat_assets"], t["zakat_liabilities"]
+        return KPIResult(
+            rows=int(t["rows"]),
+            total_revenue=rev,
+            total_expenses=float(t["expenses"]),
+            total_profit=profit,
+            avg_profit_margin=float(t["margin"]),
+            profit_margin=(profit / rev * 100.0) if rev > 0 else 0.0,
+            total_cash_flow=float(t["cash_flow"]),
+            vat_output=t["vat_out"],
+            vat_input=t["vat_in"],
+            net_vat=money_diff(t["vat_out"], t["vat_in"]),
+            zakat_base=float(base if base > 0 else max(assets - liab, 0.0)),
+            zakat_due=zakat_from_parts(base, assets, liab, rate=zakat_rate),
+            mom=self._mom(),
+        )
+
+    # ---------- Monthly ----------
+    def monthly_series(self, value_col: str = "revenue", entity: Optional[str] = None) -> pd.Series:
+        """
+        نفس _prep_monthly_series في forecasting_core: آخر قيمة في كل شهر (نهاية الشهر)،
+        الأشهر الناقصة تُملأ بالقيمة السابقة ثم 0. التجميع في SQL، والملء على صف لكل شهر.
+        """
+        if value_col not in ("revenue", "expenses", "profit", "cash_flow", "profit_margin"):
+            raise ValueError(f"Unknown monthly series column: {value_col!r}")
+        where = "__date IS NOT NULL"
+        if entity is not None:
+            where += f" AND __entity = {_literal(entity)}"
+        rows = self.con.execute(f"""
+            SELECT last_day(__date) AS month, {value_col} AS value
+            FROM ({self.core_sql()})
+            WHERE {where}
+            QUALIFY row_number() OVER (PARTITION BY last_day(__date) ORDER BY __date DESC, __row DESC) = 1
+            ORDER BY month
+        """).fetchdf()
+        if rows.empty:
+            return pd.Series(dtype=float, name=value_col)
+        idx = pd.DatetimeIndex(pd.to_datetime(rows["month"]), name="date")
+        s = pd.Series(rows["value"].to_numpy(dtype=float, na_value=float("nan")), index=idx, name=value_col)
+        s = s.asfreq("ME")
+        return s.ffill().fillna(0.0).astype(float)
+
+    def monthly_totals(self, metrics: Sequence[str] = ("revenue", "expenses", "profit", "cash_flow")) -> pd.DataFrame:
+        """مجاميع كل شهر (GROUP BY في DuckDB) — مدخل الاتجاهات الشهرية بدون تحميل الصفوف."""
+        unknown: List[str] = [m for m in metrics if m not in ("revenue", "expenses", "profit", "cash_flow")]
+        if unknown:
+            raise ValueError(f"Unknown monthly metrics: {unknown}")
+        sums = ", ".join(f"coalesce(fsum({m}), 0) AS {m}" for m in metrics)
+        return self.con.execute(f"""
+            SELECT last_day(__date) AS date, {sums}
+            FROM ({self.core_sql(row_order=False)})
+            WHERE __date IS NOT NULL
+            GROUP BY 1 ORDER BY 1
+        """).fetchdf()
+
+
+def duckdb_kpis(source: Source, zakat_rate: Optional[float] = None) -> KPIResult:
+    """اختصار: KPIResult لملف Parquet/CSV عبر DuckDB."""
+    return DuckLedger(source).kpis(zakat_rate=zakat_rate)
@@ -1,22 +1,204 @@
+import json
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Tuple, Union
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
 from engine.schema import KPISummary, EngineOutput
-from engine.taxes import compute_vat, compute_zakat
-
-def build_summary(df: pd.DataFrame) -> KPISummary:
-    kpis = KPISummary(
-        total_revenue=float(df.get("revenue", 0).fillna(0).sum()),
-        total_expenses=float(df.get("expenses", 0).fillna(0).sum()),
-        total_profit=float(df.get("profit", 0).fillna(0).sum()),
-        avg_profit_margin=float(df.get("profit_margin", 0).replace([float("inf"), -float("inf")], 0).fillna(0).mean()),
-        total_cash_flow=float(df.get("cash_flow", 0).fillna(0).sum()),
-        net_vat=float(compute_vat(df)),
-        zakat_due=float(compute_zakat(df)),
-    )
-    return kpis
+from engine.compute_core import compute_core
+from engine.kpi import KPIResult, compute_kpis
+from engine.streaming import StreamSummary
+
+# مفتاح المؤشرات في metadata الجدول (Arrow/Parquet) — يُقرأ بدون قراءة الصفوف
+KPI_METADATA_KEY = b"rakeem.kpis"
+
+PathLike = Union[str, Path]
+# إطار كامل أو دفعات متتالية (مثل iter_csv_chunks) — الدفعات تبقي الذاكرة ثابتة
+Frames = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+BATCH_ROWS = 50_000
+# حد Excel: 1,048,576 صف للورقة = رأس + 1,048,575 صف بيانات
+XLSX_MAX_ROWS = 1_048_575
+
+KPI_LABELS = {
+    "total_revenue": "إجمالي الإيرادات",
+    "total_expenses": "إجمالي المصروفات",
+    "total_profit": "صافي الربح",
+    "avg_profit_margin": "متوسط هامش الربح %",
+    "total_cash_flow": "التدفق النقدي",
+    "net_vat": "صافي الضريبة (VAT)",
+    "zakat_due": "الزكاة المستحقة",
+}
+
+def build_summary(df: pd.DataFrame, kpis: Optional[KPIResult] = None) -> KPISummary:
+    return (kpis or compute_kpis(df)).to_summary()
 
-def to_json(df: pd.DataFrame, include_rows: bool = False) -> str:
+def to_json(df: pd.DataFrame, include_rows: bool = False, kpis: Optional[KPIResult] = None) -> str:
     out = EngineOutput(
-        kpis=build_summary(df),
+        kpis=build_summary(df, kpis),
         rows=df.to_dict(orient="records") if include_rows else None,
     )
     return out.model_dump_json(indent=2)
+
+
+# ----------------------------- Columnar ---------------------------------
+
+def _column_array(s: pd.Series) -> pa.Array:
+    try:
+        return pa.Array.from_pandas(s)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # عمود object بأنواع مختلطة (رقم ونص) — يُكتب كنص بدل إفشال التصدير
+        return pa.Array.from_pandas(s.astype("string"))
+
+def to_arrow_table(df: pd.DataFrame, kpis: Optional[KPIResult] = None) -> pa.Table:
+    """
+    الصفوف كأعمدة Arrow (بدون dict لكل صف) + KPISummary كـ JSON في metadata المخطط.
+    الأعمدة الرقمية تُنقل من NumPy بدون نسخ حيث أمكن.
+    """
+    summary = build_summary(df, kpis)
+    table = pa.Table.from_arrays([_column_array(df[c]) for c in df.columns],
+                                 names=[str(c) for c in df.columns])
+    meta = dict(table.schema.metadata or {})
+    meta[KPI_METADATA_KEY] = summary.model_dump_json().encode("utf-8")
+    return table.replace_schema_metadata(meta)
+
+def to_arrow_ipc(df: pd.DataFrame, path: Optional[PathLike] = None,
+                 kpis: Optional[KPIResult] = None) -> Union[Path, pa.Buffer]:
+    """
+    ملف Arrow IPC (Feather v2) غير مضغوط: قارئ في عملية أخرى يفتحه بـ memory_map
+    ويقرأ الأعمدة بدون نسخ (انظر read_arrow_ipc). path=None يرجع Buffer في الذاكرة.
+    """
+    table = to_arrow_table(df, kpis)
+    sink = pa.BufferOutputStream() if path is None else pa.OSFile(str(path), "wb")
+    try:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    finally:
+        if path is not None:
+            sink.close()
+    return sink.getvalue() if path is None else Path(path)
+
+def to_parquet(df: pd.DataFrame, path: PathLike, kpis: Optional[KPIResult] = None,
+               compression: str = "zstd") -> Path:
+    """Parquet مضغوط لمهام BI — نفس metadata المؤشرات."""
+    pq.write_table(to_arrow_table(df, kpis), str(path), compression=compression)
+    return Path(path)
+
+def _kpis_from_schema(schema: pa.Schema) -> Optional[KPISummary]:
+    raw = (schema.metadata or {}).get(KPI_METADATA_KEY)
+    return KPISummary(**json.loads(raw)) if raw else None
+
+def read_arrow_ipc(source: Union[PathLike, pa.Buffer],
+                   memory_map: bool = True) -> Tuple[pa.Table, Optional[KPISummary]]:
+    """
+    يقرأ ملف/Buffer Arrow IPC. memory_map=True: الأعمدة تشير لصفحات الملف مباشرة
+    (بدون نسخ، والذاكرة تُحمّل عند الوصول فقط).
+    """
+    if isinstance(source, pa.Buffer):
+        src = pa.BufferReader(source)
+    else:
+        src = pa.memory_map(str(source), "r") if memory_map else pa.OSFile(str(source), "rb")
+    table = ipc.open_file(src).read_all()
+    return table, _kpis_from_schema(table.schema)
+
+def read_export_kpis(path: PathLike) -> Optional[KPISummary]:
+    """المؤشرات فقط من ملف .arrow/.feather أو .parquet (قراءة المخطط بدون الصفوف)."""
+    path = Path(path)
+    if path.suffix.lower() == ".parquet":
+        return _kpis_from_schema(pq.read_schema(str(path)))
+    with pa.memory_map(str(path), "r") as src:
+        return _kpis_from_schema(ipc.open_file(src).schema)
+
+
+# ----------------------------- Streaming ---------------------------------
+
+def _batches(data: Frames, batch_rows: int) -> Iterator[pd.DataFrame]:
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), batch_rows):
+            yield data.iloc[start:start + batch_rows]
+    else:
+        for chunk in data:
+            for start in range(0, len(chunk), batch_rows):
+                yield chunk.iloc[start:start + batch_rows]
+
+class _KPITracker:
+    """مؤشرات الإطار الكامل، أو تراكمية عبر الدفعات (StreamSummary) بدون الاحتفاظ بالصفوف."""
+
+    def __init__(self, data: Frames, kpis: Optional[KPIResult]):
+        self.fixed = build_summary(data, kpis) if isinstance(data, pd.DataFrame) or kpis else None
+        self.acc = None if self.fixed is not None else StreamSummary()
+
+    def update(self, batch: pd.DataFrame) -> None:
+        if self.acc is not None:
+            core = batch if {"profit", "cash_flow", "profit_margin"} <= set(batch.columns) \
+                else compute_core(batch, copy=False)
+            self.acc.update(core)
+
+    def result(self) -> KPISummary:
+        return self.fixed if self.fixed is not None else self.acc.result()
+
+def to_ndjson(data: Frames, dest: Union[PathLike, IO[str]], batch_rows: int = BATCH_ROWS) -> int:
+    """
+    صف JSON لكل سطر، يُكتب دفعة بدفعة (الذاكرة = دفعة واحدة مهما كان عدد الصفوف).
+    dest: مسار أو ملف نصي مفتوح. يرجع عدد الصفوف.
+    """
+    fh = open(dest, "w", encoding="utf-8") if isinstance(dest, (str, Path)) else dest
+    rows = 0
+    try:
+        for batch in _batches(data, batch_rows):
+            if batch.empty:
+                continue
+            text = batch.to_json(orient="records", lines=True, date_format="iso",
+                                 force_ascii=False)
+            fh.write(text if text.endswith("\n") else text + "\n")
+            rows += len(batch)
+    finally:
+        if fh is not dest:
+            fh.close()
+    return rows
+
+def _xlsx_cells(batch: pd.DataFrame) -> Iterator[tuple]:
+    # NaN/NaT -> خلية فارغة؛ الأعمدة تتحول لكائنات بايثون دفعة بدفعة
+    clean = batch.astype(object).where(batch.notna(), None)
+    return clean.itertuples(index=False, name=None)
+
+def to_xlsx(data: Frames, path: PathLike, kpis: Optional[KPIResult] = None,
+            batch_rows: int = BATCH_ROWS, sheet_name: str = "البيانات") -> int:
+    """
+    XLSX بوضع openpyxl write_only (الصفوف تُبث للقرص، الذاكرة ثابتة) + ورقة "ملخص"
+    أولى بالمؤشرات. بعد 1,048,575 صف تُفتح ورقة جديدة (البيانات 2، 3، ...). يرجع عدد الصفوف.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    tracker = _KPITracker(data, kpis)
+    ws, header, in_sheet, sheets, rows = None, None, 0, 0, 0
+    for batch in _batches(data, batch_rows):
+        tracker.update(batch)
+        if header is None:
+            header = [str(c) for c in batch.columns]
+        cells = _xlsx_cells(batch)
+        remaining = len(batch)
+        while remaining:
+            if ws is None or in_sheet == XLSX_MAX_ROWS:
+                sheets += 1
+                ws = wb.create_sheet(sheet_name if sheets == 1 else f"{sheet_name} {sheets}")
+                ws.append(header)
+                in_sheet = 0
+            take = min(remaining, XLSX_MAX_ROWS - in_sheet)
+            for _ in range(take):
+                ws.append(next(cells))
+            in_sheet += take
+            remaining -= take
+            rows += take
+
+    summary = wb.create_sheet("ملخص", 0)
+    summary.append(["المؤشر", "القيمة"])
+    for key, value in tracker.result().model_dump().items():
+        summary.append([KPI_LABELS.get(key, key), value])
+    summary.append(["عدد الصفوف", rows])
+    wb.save(str(path))
+    return rows
@@ -2,30 +2,14 @@
 from __future__ import annotations
 
 import pandas as pd
-from typing import Iterable, Optional, List
+from typing import Optional, List
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 
-from engine.config import DEFAULT_ENGINE_CONFIG as CFG
+from engine.columns import ColumnBinding, resolve_columns
 
 
 # ----------------------------- Utilities ---------------------------------
 
-def _pick_col(df: pd.DataFrame, candidates: Iterable[str]) -> Optional[str]:
-    lower_map = {str(c).strip().lower(): c for c in df.columns}
-    for cand in candidates:
-        key = str(cand).strip().lower()
-        if key in lower_map:
-            return lower_map[key]
-    return None
-
-
-def _entity_candidates() -> List[str]:
-    return [
-        "entity_name", "company", "company_name", "entity",
-        "اسم_الشركة", "المنشأة", "المنشاة", "الكيان"
-    ]
-
-
 def _to_month_end_index(dt_like: pd.Series) -> pd.DatetimeIndex:
     dt = pd.to_datetime(dt_like, errors="coerce")
     
@@ -93,18 +77,20 @@ def build_revenue_forecast(
     df: pd.DataFrame,
     periods: int = 3,
     entity_col: Optional[str] = None,
+    binding: Optional[ColumnBinding] = None,
 ) -> pd.DataFrame:
 
     if df is None or df.empty:
         return pd.DataFrame(columns=["date", "entity_name", "forecast", "lower", "upper"])
 
-    date_col = _pick_col(df, ("date", "month", "period", *CFG.colmap.date)) or "date"
-    rev_col  = _pick_col(df, ("revenue", "sales", "turnover", *CFG.colmap.revenue)) or "revenue"
+    cols = resolve_columns(df, binding)
+    date_col = cols.get("date", "date")
+    rev_col  = cols.get("revenue", "revenue")
 
     if date_col not in df.columns or rev_col not in df.columns:
         return pd.DataFrame(columns=["date", "entity_name", "forecast", "lower", "upper"])
 
-    ent_col = entity_col or _pick_col(df, _entity_candidates())
+    ent_col = entity_col or cols.get("entity")
 
     if ent_col and ent_col in df.columns:
         entities = (
@@ -0,0 +1,133 @@
+# engine/gosi.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import TRUE_LABELS, is_truthy, month_ordinals, resolve_aliases, to_float_array
+from engine.config import DEFAULT_ENGINE_CONFIG, PAYROLL_COLUMNS, GosiConfig
+from engine.money import apply_rates, from_halalas, to_halalas
+from engine.vat_returns import month_periods, next_month_due
+
+# معرّف الموعد في saudi_deadlines_ar.json — السداد قبل يوم 15 من الشهر التالي
+GOSI_DEADLINE_ID = "gosi_monthly"
+GOSI_DUE_DAY = 15
+
+GOSI_COLUMNS = (
+    "employee_id", "month", "is_saudi", "wage", "contributory_wage",
+    "employer_rate", "employee_rate", "employer", "employee", "total", "due_date",
+)
+GOSI_TOTAL_COLUMNS = (
+    "month", "due_date", "deadline_id", "employees", "saudi_employees",
+    "contributory_wages", "employer", "employee", "total",
+)
+
+
+def _is_saudi(df: pd.DataFrame, cols: Dict[str, Any], cfg: GosiConfig) -> np.ndarray:
+    if "is_saudi" in cols:
+        return is_truthy(df[cols["is_saudi"]], TRUE_LABELS + tuple(cfg.saudi_labels))
+    if "nationality" in cols:
+        return is_truthy(df[cols["nationality"]], cfg.saudi_labels)
+    raise ValueError("Payroll needs a nationality or is_saudi column")
+
+
+def _rates(df: pd.DataFrame, col: Optional[Any], saudi: np.ndarray,
+           saudi_rate: float, other_rate: float) -> np.ndarray:
+    """نسبة الإعداد حسب الجنسية، أو نسبة الصف (0.02 أو 2) إن وُجد عمودها وقيمتها."""
+    rates = np.where(saudi, saudi_rate, other_rate)
+    if col is not None:
+        own = to_float_array(df[col])
+        own = np.where(own > 1.0, own / 100.0, own)
+        rates = np.where(np.isnan(own), rates, own)
+    return rates
+
+
+def compute_gosi(payroll: pd.DataFrame, months: Optional[Sequence[Any]] = None,
+                 config: Optional[GosiConfig] = None) -> pd.DataFrame:
+    """
+    اشتراكات GOSI لكل (موظف × شهر): الأجر الخاضع محصور بين wage_floor و wage_cap، والنسب
+    حسب الجنسية بالهللة. الأشهر من عمود month أو months؛ الشهر غير الصالح -> ValueError.
+    """
+    cfg = config or DEFAULT_ENGINE_CONFIG.gosi
+    cols = resolve_aliases(payroll, PAYROLL_COLUMNS)
+    if "wage" in cols:
+        wage = np.nan_to_num(to_float_array(payroll[cols["wage"]]))
+    elif "basic" in cols:
+        wage = np.nan_to_num(to_float_array(payroll[cols["basic"]]))
+        if "housing" in cols:
+            wage = wage + np.nan_to_num(to_float_array(payroll[cols["housing"]]))
+    else:
+        raise ValueError("Payroll needs a contributory_wage or basic_salary column")
+
+    n = len(payroll)
+    saudi = _is_saudi(payroll, cols, cfg)
+    employer_rate = _rates(payroll, cols.get("employer_rate"), saudi,
+                           cfg.saudi_employer_rate, cfg.non_saudi_employer_rate)
+    employee_rate = _rates(payroll, cols.get("employee_rate"), saudi,
+                           cfg.saudi_employee_rate, cfg.non_saudi_employee_rate)
+    emp = (payroll[cols["employee"]].to_numpy(dtype=object) if "employee" in cols
+           else np.arange(n))
+
+    if months is not None:
+        m_ords = month_ordinals(list(months))
+        if (m_ords < 0).any():
+            raise ValueError("months contains values that are not valid months")
+        rows = np.repeat(np.arange(n), len(m_ords))
+        ords = np.tile(m_ords, n)
+    elif "month" in cols:
+        ords = month_ordinals(payroll[cols["month"]].to_numpy())
+        bad = np.flatnonzero(ords < 0)
+        if bad.size:
+            raise ValueError(f"{bad.size:,} payroll rows have no valid month "
+                             f"(first: row {payroll.index[bad[0]]!r})")
+        rows = np.arange(n)
+    else:
+        raise ValueError("Payroll needs a month column, or pass months=")
+
+    wage = wage[rows]
+    contributory = np.where(wage > 0, np.clip(wage, cfg.wage_floor, cfg.wage_cap), 0.0)
+    h = to_halalas(contributory)
+    employer = apply_rates(h, employer_rate[rows])
+    employee = apply_rates(h, employee_rate[rows])
+
+    # تسمية الشهر وتاريخ الاستحقاق تُحسب للأشهر المميزة فقط ثم تُوزّع على الصفوف
+    uniq, inv = np.unique(ords, return_inverse=True)
+    months = month_periods(uniq)
+    due = next_month_due(months, day=GOSI_DUE_DAY).to_numpy()
+    labels = months.astype(str).to_numpy(dtype=object)
+
+    return pd.DataFrame({
+        "employee_id": emp[rows],
+        "month": labels[inv],
+        "is_saudi": saudi[rows],
+        "wage": wage,
+        "contributory_wage": from_halalas(h),
+        "employer_rate": employer_rate[rows],
+        "employee_rate": employee_rate[rows],
+        "employer": from_halalas(employer),
+        "employee": from_halalas(employee),
+        "total": from_halalas(employer + employee),
+        "due_date": due[inv],
+    })[list(GOSI_COLUMNS)]
+
+
+def gosi_totals(contributions: pd.DataFrame) -> pd.DataFrame:
+    """مجموع الاشتراكات لكل شهر (للتقويم والتقرير) — المبالغ تُجمع بالهللة."""
+    if contributions.empty:
+        return pd.DataFrame(columns=list(GOSI_TOTAL_COLUMNS))
+    money = {"contributory_wages": "contributory_wage", "employer": "employer",
+             "employee": "employee", "total": "total"}
+    parts = pd.DataFrame({
+        "month": contributions["month"],
+        "due_date": contributions["due_date"],
+        "employees": 1,
+        "saudi_employees": contributions["is_saudi"].astype(np.int64),
+        **{k: to_halalas(contributions[c]) for k, c in money.items()},
+    })
+    g = parts.groupby(["month", "due_date"], sort=True).sum().reset_index()
+    for k in money:
+        g[k] = from_halalas(g[k].to_numpy(dtype=np.int64))
+    g["deadline_id"] = GOSI_DEADLINE_ID
+    return g[list(GOSI_TOTAL_COLUMNS)]
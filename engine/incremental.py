@@ -0,0 +1,204 @@
+# engine/incremental.py
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import FrozenSet, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import resolve_columns
+from engine.compute_core import compute_core
+from engine.cube import RollupCube, build_cube, load_or_build_cube
+from engine.forecasting_core import build_revenue_forecast
+from engine.kpi import KPIResult, compute_kpis, entity_keys
+
+# فوق هذه النسبة من الصفوف المتغيرة تكون إعادة الحساب الكاملة أسرع من الدمج
+FULL_RECOMPUTE_RATIO = 0.5
+
+# أقصى عدد شركات تُحفظ حالتها (النواة + المكعب + التنبؤ) — الأقدم استخدامًا يُحذف أولاً
+MAX_STATES = 16
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    hash (uint64) لكل صف من الدفتر المطبّع — لا يعتمد على موقع الصف. الصفوف المكررة
+    تُميَّز بترتيب تكرارها حتى يبقى الفرق صحيحًا عند إضافة صف مطابق لصف موجود.
+    """
+    h = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    occ = pd.Series(h).groupby(h).cumcount().to_numpy().astype(np.uint64)
+    return h ^ (occ * _GOLDEN)
+
+
+@dataclass(frozen=True)
+class LedgerDiff:
+    added: np.ndarray          # مواقع الصفوف الجديدة/المعدلة في الإطار الجديد
+    removed: np.ndarray        # مواقع الصفوف المحذوفة/المعدلة في الإطار السابق
+    full: bool = False         # أول تشغيل أو تغير المخطط -> إعادة حساب كاملة
+
+    @property
+    def unchanged(self) -> bool:
+        return not self.full and not self.added.size and not self.removed.size
+
+
+@dataclass(frozen=True)
+class RunState:
+    """ناتج تشغيل كامل لشركة — يُحفظ ليُقارن به الرفع التالي لنفس الشركة."""
+    columns: Tuple[str, ...]
+    hashes: np.ndarray
+    core: pd.DataFrame
+    kpis: KPIResult
+    cube: RollupCube
+    forecast: pd.DataFrame
+    forecast_periods: int
+    fiscal_year_end_month: int
+    diff: LedgerDiff
+    affected_entities: FrozenSet[str] = frozenset()
+    affected_months: Tuple[str, ...] = ()
+
+    @property
+    def fingerprint(self) -> str:
+        """بصمة الدفتر من hashes المحسوبة مسبقًا (بدون تمريرة hash ثانية على الإطار)."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update("\x1f".join(self.columns).encode("utf-8"))
+        h.update(np.ascontiguousarray(self.hashes).tobytes())
+        return h.hexdigest()
+
+
+_STATES: "OrderedDict[str, RunState]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _remember(company: str, state: RunState) -> None:
+    with _LOCK:
+        _STATES[company] = state
+        _STATES.move_to_end(company)
+        while len(_STATES) > MAX_STATES:
+            _STATES.popitem(last=False)
+
+
+def _months(core: pd.DataFrame) -> set:
+    date_col = resolve_columns(core).get("date")
+    if date_col is None or core.empty:
+        return set()
+    d = pd.to_datetime(core[date_col], errors="coerce").dropna()
+    return set(d.dt.to_period("M").astype(str))
+
+
+def _full_run(raw: pd.DataFrame, hashes: np.ndarray, forecast_periods: int,
+              fiscal_year_end_month: int) -> RunState:
+    core = compute_core(raw, copy=False)
+    return RunState(
+        columns=tuple(map(str, raw.columns)),
+        hashes=hashes,
+        core=core,
+        kpis=compute_kpis(core),
+        cube=load_or_build_cube(core, fiscal_year_end_month),
+        forecast=build_revenue_forecast(core, periods=forecast_periods),
+        forecast_periods=forecast_periods,
+        fiscal_year_end_month=fiscal_year_end_month,
+        diff=LedgerDiff(np.arange(len(raw)), np.arange(0), full=True),
+    )
+
+
+def incremental_run(company: str, raw: pd.DataFrame, forecast_periods: int = 6,
+                    fiscal_year_end_month: int = 12) -> RunState:
+    """
+    يشغّل compute_core + المؤشرات + المكعب + التنبؤ على الدفتر المطبّع (ناتج load_*)،
+    ويعيد استخدام التشغيل السابق لنفس الشركة قدر الإمكان:
+    - صفوف compute_core غير المتغيرة تُنسخ، والجديدة فقط تُحسب
+    - المكعب = القديم - الصفوف المحذوفة + المضافة (الأشهر المتأثرة فقط)
+    - نماذج Holt تُعاد للمنشآت المتأثرة فقط
+    المؤشرات الإجمالية تُعاد من النواة المدمجة (تمريرة واحدة). نفس الملف -> نفس الحالة.
+    """
+    hashes = row_hashes(raw)
+    columns = tuple(map(str, raw.columns))
+    with _LOCK:
+        prev = _STATES.get(company)
+
+    if prev is None or prev.columns != columns:
+        state = _full_run(raw, hashes, forecast_periods, fiscal_year_end_month)
+    else:
+        state = _update(prev, raw, hashes, forecast_periods, fiscal_year_end_month)
+
+    _remember(company, state)
+    return state
+
+
+def _update(prev: RunState, raw: pd.DataFrame, hashes: np.ndarray,
+            forecast_periods: int, fiscal_year_end_month: int) -> RunState:
+    pos = pd.Index(prev.hashes).get_indexer(hashes)
+    kept = np.flatnonzero(pos >= 0)
+    added = np.flatnonzero(pos < 0)
+    removed = np.setdiff1d(np.arange(len(prev.hashes)), pos[kept], assume_unique=True)
+    diff = LedgerDiff(added, removed)
+
+    if diff.unchanged and prev.forecast_periods == forecast_periods \
+            and prev.fiscal_year_end_month == fiscal_year_end_month:
+        return replace(prev, diff=diff, affected_entities=frozenset(), affected_months=())
+
+    if added.size + removed.size > FULL_RECOMPUTE_RATIO * max(len(raw), 1):
+        return _full_run(raw, hashes, forecast_periods, fiscal_year_end_month)
+
+    # ---- compute_core للصفوف الجديدة فقط، بنفس ترتيب الإطار الجديد ----
+    fresh = compute_core(raw.iloc[added], copy=False)
+    old_rows = prev.core.iloc[pos[kept]]
+    core = pd.concat([old_rows, fresh])
+    core = core.iloc[np.argsort(np.concatenate([kept, added]), kind="stable")]
+    core.index = raw.index
+
+    gone = prev.core.iloc[removed]
+
+    # ---- المكعب: الأشهر المتأثرة فقط ----
+    if prev.fiscal_year_end_month == fiscal_year_end_month:
+        cube = (prev.cube.combine(build_cube(gone, fiscal_year_end_month), sign=-1.0)
+                         .combine(build_cube(fresh, fiscal_year_end_month)))
+    else:
+        cube = build_cube(core, fiscal_year_end_month)
+
+    # ---- التنبؤ: المنشآت المتأثرة فقط ----
+    ent_col = resolve_columns(core).get("entity")
+    affected = frozenset(entity_keys(fresh, ent_col)) | frozenset(entity_keys(gone, ent_col))
+    if prev.forecast_periods != forecast_periods or ent_col is None:
+        forecast = build_revenue_forecast(core, periods=forecast_periods)
+    else:
+        # نفس تطبيع entity_keys على الجهتين (مسافات، أسماء فارغة)
+        keep_fc = prev.forecast[~np.isin(entity_keys(prev.forecast, "entity_name"), list(affected))]
+        sub = core[np.isin(entity_keys(core, ent_col), list(affected))]
+        parts = [keep_fc]
+        if not sub.empty:
+            parts.append(build_revenue_forecast(sub, periods=forecast_periods, entity_col=ent_col))
+        forecast = pd.concat(parts, ignore_index=True)
+
+    return RunState(
+        columns=prev.columns,
+        hashes=hashes,
+        core=core,
+        kpis=compute_kpis(core),
+        cube=cube,
+        forecast=forecast,
+        forecast_periods=forecast_periods,
+        fiscal_year_end_month=fiscal_year_end_month,
+        diff=diff,
+        affected_entities=affected,
+        affected_months=tuple(sorted(_months(fresh) | _months(gone))),
+    )
+
+
+def previous_state(company: str) -> Optional[RunState]:
+    with _LOCK:
+        return _STATES.get(company)
+
+
+def forget(company: Optional[str] = None) -> None:
+    """يحذف الحالة المحفوظة لشركة (أو للجميع عند company=None)."""
+    with _LOCK:
+        if company is None:
+            _STATES.clear()
+        else:
+            _STATES.pop(company, None)
@@ -1,17 +1,271 @@
 from __future__ import annotations
-from typing import Union
+import hashlib
+import importlib.util
+import io
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
 import pandas as pd
 from engine.config import DEFAULT_ENGINE_CONFIG
+from engine.columns import DEFAULT_RESOLVER, norm_name as _norm_name
+
+# يتغير عند تغيير منطق التطبيع حتى لا تُقرأ نسخ قديمة من الكاش
+_CACHE_VERSION = 1
 
 def _normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
     if not hasattr(df, "columns"):
         raise TypeError("Expected DataFrame")
-    out = df.copy()
-    out.columns = [str(c).strip().lower().replace(" ", "_") for c in out.columns]
+    # نسخة سطحية: إعادة تسمية الأعمدة لا تحتاج نسخ البيانات
+    out = df.copy(deep=False)
+    out.columns = [_norm_name(c) for c in out.columns]
     return out
 
-def load_excel(path: str, sheet: Union[int, str, None] = 0) -> pd.DataFrame:
-    obj = pd.read_excel(path, sheet_name=sheet)
+
+# ----------------------------- Content cache ---------------------------------
+
+def _read_bytes(src: Any) -> bytes:
+    """يقرأ محتوى الملف من مسار أو كائن ملف (مثل UploadedFile في Streamlit)."""
+    if isinstance(src, (bytes, bytearray)):
+        return bytes(src)
+    if hasattr(src, "getvalue"):
+        return src.getvalue()
+    if hasattr(src, "read"):
+        pos = src.tell() if hasattr(src, "seek") else None
+        data = src.read()
+        if pos is not None:
+            src.seek(pos)
+        return data
+    with open(src, "rb") as fh:
+        return fh.read()
+
+
+def file_fingerprint(data: bytes) -> str:
+    """بصمة المحتوى (blake2b) — نفس الملف يعطي نفس البصمة مهما تغير اسمه."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """بصمة إطار مطبّع: أسماء الأعمدة + hash لكل صف (بدون الفهرس)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class LedgerCache:
+    """
+    كاش على القرص لنسخ Parquet من الدفاتر المطبّعة، مفتاحه بصمة المحتوى.
+    الحجم محدود بـ max_bytes ويُخلى الأقدم استخدامًا أولاً (LRU عبر mtime).
+    ملفات مشتقة (مثل مكعب التجميع .npz) تُحفظ بجانبها وتدخل نفس حد الحجم.
+    """
+
+    _PATTERNS = ("*.parquet", "*.npz")
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.parquet"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        p = self._path(key)
+        try:
+            df = pd.read_parquet(p)
+        except Exception:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(p, None)  # آخر استخدام -> ترتيب LRU
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        p = self._path(key)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, p)
+        except Exception:
+            # أعمدة بأنواع مختلطة لا تُكتب في Parquet — نكمل بدون كاش
+            tmp.unlink(missing_ok=True)
+            return False
+        self._evict()
+        return True
+
+    def path_for(self, key: str, suffix: str) -> Path:
+        """مسار ملف مشتق داخل مجلد الكاش (يُنشأ المجلد عند الحاجة)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f"{key}{suffix}"
+
+    def touch(self, path: Path, evict: bool = False) -> None:
+        """يحدّث ترتيب LRU لملف مشتق؛ evict=True بعد كتابته لتطبيق حد الحجم."""
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        if evict:
+            self._evict()
+
+    def _entries(self):
+        out = []
+        for p in (p for pat in self._PATTERNS for p in self.directory.glob(pat)):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[0])
+            total = sum(size for _, size, _ in entries)
+            while entries and total > self.max_bytes:
+                _, size, p = entries.pop(0)
+                try:
+                    p.unlink()
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        for _, _, p in self._entries():
+            p.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries() if self.directory.exists() else []
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+
+_CACHE: Optional[LedgerCache] = None
+
+def get_cache() -> LedgerCache:
+    global _CACHE
+    if _CACHE is None:
+        cfg = DEFAULT_ENGINE_CONFIG.cache
+        _CACHE = LedgerCache(cfg.directory, cfg.max_bytes)
+    return _CACHE
+
+
+def _load_cached(data: bytes, tag: str, parse: Callable[[bytes], pd.DataFrame],
+                 use_cache: Optional[bool]) -> pd.DataFrame:
+    enabled = DEFAULT_ENGINE_CONFIG.cache.enabled if use_cache is None else use_cache
+    if not enabled:
+        return parse(data)
+    cache = get_cache()
+    key = f"{file_fingerprint(data)}-{tag}-v{_CACHE_VERSION}"
+    df = cache.get(key)
+    if df is None:
+        df = parse(data)
+        cache.put(key, df)
+    return df
+
+
+# ----------------------------- Excel backends ---------------------------------
+
+def _read_excel_calamine(src: Any, sheet: Union[int, str, None]) -> Any:
+    return pd.read_excel(src, sheet_name=sheet, engine="calamine")
+
+def _read_excel_openpyxl(src: Any, sheet: Union[int, str, None]) -> Any:
+    return pd.read_excel(src, sheet_name=sheet, engine="openpyxl")
+
+def _read_excel_openpyxl_ro(src: Any, sheet: Union[int, str, None]) -> pd.DataFrame:
+    """openpyxl بوضع read-only: قيم الخلايا مباشرة بدون تحويل pandas لكل خلية."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(src, read_only=True, data_only=True, keep_links=False)
+    try:
+        if sheet is None or isinstance(sheet, int):
+            ws = wb.worksheets[sheet or 0]
+        else:
+            ws = wb[sheet]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        data = list(rows)
+    finally:
+        wb.close()
+    if header is None:
+        return pd.DataFrame()
+    # read-only يعيد الصفوف الفارغة في نهاية الورقة
+    while data and all(v is None for v in data[-1]):
+        data.pop()
+    cols = [h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+    return pd.DataFrame(data, columns=_dedupe_header(cols))
+
+def _dedupe_header(names: Sequence[Any]) -> List[Any]:
+    """
+    نفس معالجة read_excel للرؤوس المكررة: amount, amount.1, amount.2 ... مع تخطي
+    الأسماء الموجودة أصلًا في الرأس (amount, amount.1, amount -> amount.2).
+    """
+    names = list(names)
+    present = set(names)
+    counts: Dict[Any, int] = {}
+    for i, col in enumerate(names):
+        base = col
+        cur = counts.get(col, 0)
+        while cur > 0:
+            counts[base] = cur + 1
+            col = f"{base}.{cur}"
+            cur = cur + 1 if col in present else counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur + 1
+    return names
+
+# الأسرع أولاً؛ "auto" يختار أول واحد متاح
+_EXCEL_BACKENDS: Dict[str, Callable[[Any, Union[int, str, None]], Any]] = {
+    "calamine": _read_excel_calamine,
+    "openpyxl_ro": _read_excel_openpyxl_ro,
+    "openpyxl": _read_excel_openpyxl,
+}
+_EXCEL_BACKEND_MODULES = {
+    "calamine": "python_calamine",
+    "openpyxl_ro": "openpyxl",
+    "openpyxl": "openpyxl",
+}
+
+def excel_backends() -> List[str]:
+    """أسماء قارئات Excel المتاحة في هذه البيئة (بترتيب السرعة)."""
+    return [name for name, mod in _EXCEL_BACKEND_MODULES.items()
+            if importlib.util.find_spec(mod) is not None]
+
+def _pick_excel_backend(backend: str) -> str:
+    available = excel_backends()
+    if backend in ("auto", "parquet"):
+        if not available:
+            raise ImportError("No Excel reader available (install openpyxl or python-calamine)")
+        return available[0]
+    if backend not in _EXCEL_BACKENDS:
+        raise ValueError(f"Unknown Excel backend: {backend!r}")
+    if backend not in available:
+        raise ImportError(f"Excel backend {backend!r} is not installed")
+    return backend
+
+
+# ----------------------------- Loaders ---------------------------------
+
+def _parse_excel(src: Any, sheet: Union[int, str, None], backend: str = "openpyxl") -> pd.DataFrame:
+    obj = _EXCEL_BACKENDS[backend](src, sheet)
     if isinstance(obj, dict):
         obj = next(iter(obj.values()))
     df = _normalize_cols(obj)
@@ -24,6 +278,145 @@ def load_excel(path: str, sheet: Union[int, str, None] = 0) -> pd.DataFrame:
         df["date"] = pd.to_datetime(df["date"], errors="coerce")
     return df
 
-def load_csv(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    return _normalize_cols(df)
+def load_excel(path: Any, sheet: Union[int, str, None] = 0,
+               use_cache: Optional[bool] = None, backend: str = "auto") -> pd.DataFrame:
+    """
+    backend: "auto" (أسرع قارئ متاح) | "calamine" | "openpyxl_ro" | "openpyxl"
+             | "parquet" (يفرض الكاش: تحويل واحد ثم قراءة Parquet).
+    """
+    reader = _pick_excel_backend(backend)
+    if backend == "parquet":
+        use_cache = True
+    if use_cache is False:
+        return _parse_excel(path, sheet, reader)
+    data = _read_bytes(path)
+    # القارئ جزء من المفتاح: القارئات تختلف في الأنواع (التواريخ، الأعداد الصحيحة)
+    return _load_cached(data, f"xlsx-{reader}-{sheet}",
+                        lambda b: _parse_excel(io.BytesIO(b), sheet, reader), use_cache)
+
+_EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".xlsb", ".ods")
+
+def _excel_suffix(path: Any, data: bytes) -> str:
+    """امتداد الملف الأصلي (من الاسم، وإلا من توقيع البايتات: OLE -> .xls) للملف المؤقت."""
+    name = path if isinstance(path, (str, os.PathLike)) else getattr(path, "name", "")
+    suffix = os.path.splitext(str(name))[1].lower()
+    if suffix in _EXCEL_SUFFIXES:
+        return suffix
+    return ".xls" if data[:4] == b"\xd0\xcf\x11\xe0" else ".xlsx"
+
+def excel_sheet_names(path: Any) -> List[str]:
+    """أسماء الأوراق لأي صيغة (xlsx/xls/ods...): calamine إن وُجد، وإلا محرك pandas حسب الصيغة."""
+    src = io.BytesIO(path) if isinstance(path, (bytes, bytearray)) else path
+    engine = "calamine" if importlib.util.find_spec("python_calamine") is not None else None
+    with pd.ExcelFile(src, engine=engine) as book:
+        return [str(name) for name in book.sheet_names]
+
+def _parse_sheet(src: Any, sheet: str, backend: str) -> pd.DataFrame:
+    # دالة على مستوى الوحدة حتى تُرسل لعمليات ProcessPoolExecutor
+    return _parse_excel(src, sheet, backend)
+
+def _tag_sheet(df: pd.DataFrame, sheet: str) -> pd.DataFrame:
+    ent = DEFAULT_RESOLVER.resolve(df).get("entity")
+    if ent is None:
+        df["entity_name"] = sheet
+    elif ent != "entity_name":
+        df = df.rename(columns={ent: "entity_name"})
+    df["sheet"] = sheet
+    return df
+
+def _parse_sheets(src: Any, sheets: Sequence[str], backend: str,
+                  max_workers: Optional[int]) -> List[pd.DataFrame]:
+    workers = min(len(sheets), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [_parse_sheet(src, s, backend) for s in sheets]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_parse_sheet, [src] * len(sheets), sheets, [backend] * len(sheets)))
+    except (BrokenProcessPool, OSError):
+        # بيئات لا تسمح بإنشاء عمليات — نكمل بالتسلسل
+        return [_parse_sheet(src, s, backend) for s in sheets]
+
+def load_excel_sheets(path: Any, sheets: Optional[Sequence[str]] = None,
+                      max_workers: Optional[int] = None, use_cache: Optional[bool] = None,
+                      backend: str = "auto") -> pd.DataFrame:
+    """
+    يقرأ كل أوراق المصنف (ورقة لكل فرع/سنة) بالتوازي في ProcessPoolExecutor،
+    ويوسم كل صف بعمود sheet و entity_name (اسم الورقة إذا لم يوجد عمود منشأة)،
+    ثم يدمجها في إطار واحد جاهز لـ compute_core و build_revenue_forecast.
+    """
+    reader = _pick_excel_backend(backend)
+    if backend == "parquet":
+        use_cache = True
+    data = _read_bytes(path)
+
+    def parse(b: bytes) -> pd.DataFrame:
+        names = list(sheets) if sheets else excel_sheet_names(b)
+        if isinstance(path, (str, os.PathLike)):
+            frames = _parse_sheets(path, names, reader, max_workers)
+        else:
+            # العمليات تفتح الملف من القرص بدل نسخ البايتات لكل ورقة
+            with tempfile.TemporaryDirectory() as tmp:
+                src = os.path.join(tmp, "upload" + _excel_suffix(path, b))
+                with open(src, "wb") as fh:
+                    fh.write(b)
+                frames = _parse_sheets(src, names, reader, max_workers)
+        frames = [_tag_sheet(df, name) for df, name in zip(frames, names) if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    tag = f"xlsx-{reader}-sheets-" + (file_fingerprint(",".join(sheets).encode("utf-8")) if sheets else "all")
+    return _load_cached(data, tag, parse, use_cache)
+
+def load_csv(path: Any, use_cache: Optional[bool] = None) -> pd.DataFrame:
+    if use_cache is False:
+        return _normalize_cols(pd.read_csv(path))
+    data = _read_bytes(path)
+    return _load_cached(data, "csv", lambda b: _normalize_cols(pd.read_csv(io.BytesIO(b))), use_cache)
+
+
+# ----------------------------- Streaming CSV ---------------------------------
+
+def _stream_columns(header: Sequence[Any], extra: Sequence[str] = ()) -> Dict[Any, str]:
+    """
+    يطابق رؤوس الملف مع أسماء ColumnMap (وجداول الزكاة) ويرجع
+    {اسم العمود الأصلي: الاسم المطبّع} للأعمدة المفيدة فقط.
+    """
+    cols = DEFAULT_RESOLVER.resolve(header)
+    keep: Dict[Any, str] = {}
+    for name, orig in cols.names.items():
+        keep.setdefault(orig, "entity_name" if name == "entity" else name)
+    for orig in (*cols.zakat_assets, *cols.zakat_liabilities):
+        keep.setdefault(orig, _norm_name(orig))
+
+    wanted = {_norm_name(e) for e in extra}
+    for orig in header:
+        if _norm_name(orig) in wanted:
+            keep.setdefault(orig, _norm_name(orig))
+    return keep
+
+def iter_csv_chunks(path: Any, chunksize: int = 100_000,
+                    extra_columns: Sequence[str] = ()) -> Iterator[pd.DataFrame]:
+    """
+    قارئ CSV متدفق: يقرأ فقط الأعمدة التي تطابق أسماء ColumnMap (+ بنود الزكاة
+    و extra_columns)، ويرجع دفعات مطبّعة بأسماء موحّدة وتواريخ/أرقام محوّلة.
+    الذاكرة محكومة بحجم الدفعة وليس بحجم الملف.
+    """
+    if hasattr(path, "seek"):
+        path.seek(0)
+    header = pd.read_csv(path, nrows=0).columns
+    keep = _stream_columns(header, extra_columns)
+    if not keep:
+        raise ValueError("No recognised columns in CSV header")
+    if hasattr(path, "seek"):
+        path.seek(0)
+
+    text_cols = {"date", "entity_name"}
+    for chunk in pd.read_csv(path, usecols=list(keep), chunksize=chunksize):
+        chunk = chunk.rename(columns=keep)
+        for col in chunk.columns:
+            if col == "date":
+                chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+            elif col not in text_cols:
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        yield chunk
@@ -0,0 +1,322 @@
+# engine/kpi.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import ColumnBinding, resolve_columns
+from engine.money import (
+    apply_rate, from_halalas, halala_mode, money_diff, money_rate, money_total, to_halalas,
+)
+from engine.schema import KPISummary
+from engine.taxes import _vat_rate, _zakat_rate, zakat_from_parts
+
+MOM_METRICS = ("revenue", "expenses", "profit", "cash_flow")
+
+
+@dataclass(frozen=True)
+class KPIResult:
+    """
+    نتيجة مؤشرات موحّدة (غير قابلة للتعديل) يتشاركها كل المستهلكين:
+    لوحة التحكم، التقرير، build_summary، وحقائق المحادثة.
+    """
+    rows: int
+    total_revenue: float
+    total_expenses: float
+    total_profit: float
+    avg_profit_margin: float
+    profit_margin: float
+    total_cash_flow: float
+    vat_output: float
+    vat_input: float
+    net_vat: float
+    zakat_base: float
+    zakat_due: float
+    mom: Mapping[str, Mapping[str, float]] = field(default_factory=lambda: MappingProxyType({}))
+
+    def to_summary(self) -> KPISummary:
+        return KPISummary(
+            total_revenue=self.total_revenue,
+            total_expenses=self.total_expenses,
+            total_profit=self.total_profit,
+            avg_profit_margin=self.avg_profit_margin,
+            total_cash_flow=self.total_cash_flow,
+            net_vat=self.net_vat,
+            zakat_due=self.zakat_due,
+        )
+
+    def report_metrics(self) -> Dict[str, float]:
+        """المفاتيح التي يتوقعها generate_financial_report."""
+        return {
+            "total_revenue": self.total_revenue,
+            "total_expenses": self.total_expenses,
+            "total_profit": self.total_profit,
+            "total_cashflow": self.total_cash_flow,
+            "net_vat": self.net_vat,
+            "zakat_due": self.zakat_due,
+        }
+
+
+def _array(df: pd.DataFrame, col: Optional[str]) -> Optional[np.ndarray]:
+    if col is None or col not in df.columns:
+        return None
+    s = df[col]
+    if not pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+        s = pd.to_numeric(s, errors="coerce")
+    return s.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _total(a: Optional[np.ndarray]) -> float:
+    return float(np.nansum(a)) if a is not None else 0.0
+
+
+def _money(a: Optional[np.ndarray], scale: float = 1.0) -> float:
+    """مجموع مبلغ ضريبي/زكوي (دقيق بالهللة في halala_mode) مضروبًا في scale."""
+    total = money_total(a) if a is not None else 0.0
+    return total if scale == 1.0 else money_rate(total, scale)
+
+
+def _row_sum(arrays: Tuple[Optional[np.ndarray], ...], n: int) -> np.ndarray:
+    total = np.zeros(n)
+    for arr in arrays:
+        total = total + np.nan_to_num(arr)
+    return total
+
+
+@dataclass(frozen=True)
+class KPIArrays:
+    """
+    مصفوفات الصفوف التي تُبنى منها كل المؤشرات — كل عمود يُحوّل مرة واحدة فقط.
+    vat_out/vat_in هي أعمدة الضريبة، أو الإيرادات/المصروفات مع vat_scale=النسبة
+    (تُضرب بعد الجمع كما في taxes.vat_parts).
+    """
+    revenue: np.ndarray
+    expenses: np.ndarray
+    profit: np.ndarray
+    cash_flow: np.ndarray
+    margin: np.ndarray
+    vat_out: np.ndarray
+    vat_in: np.ndarray
+    vat_scale: float
+    zakat_base: np.ndarray
+    zakat_assets: Tuple[Optional[np.ndarray], ...]
+    zakat_liabilities: Tuple[Optional[np.ndarray], ...]
+    # أعمدة موجودة فعلاً في الإطار (للتغير الشهري) — None للمشتق
+    present: Mapping[str, Optional[np.ndarray]]
+
+    def __len__(self) -> int:
+        return len(self.revenue)
+
+    def assets_total(self) -> np.ndarray:
+        """مجموع الأصول الزكوية لكل صف (الفارغ = 0)."""
+        return _row_sum(self.zakat_assets, len(self))
+
+    def liabilities_total(self) -> np.ndarray:
+        """مجموع الخصوم المتداولة لكل صف (الفارغ = 0)."""
+        return _row_sum(self.zakat_liabilities, len(self))
+
+
+def kpi_arrays(df: pd.DataFrame, cols: Optional[ColumnBinding] = None) -> KPIArrays:
+    """يبني KPIArrays من ناتج compute_core (cols: binding محلول مسبقًا، وإلا يُحل من الإطار)."""
+    cols = resolve_columns(df, cols)
+    n = len(df)
+    cache: Dict[Optional[str], Optional[np.ndarray]] = {}
+
+    def col(name: Optional[str]) -> Optional[np.ndarray]:
+        if name not in cache:
+            cache[name] = _array(df, name)
+        return cache[name]
+
+    zeros = np.zeros(n)
+    rev = col(cols.get("revenue"))
+    exp = col(cols.get("expenses"))
+    rev0 = np.nan_to_num(rev) if rev is not None else zeros
+    exp0 = np.nan_to_num(exp) if exp is not None else zeros
+
+    profit_col = col("profit")
+    cash_col = col("cash_flow")
+    profit = profit_col if profit_col is not None else rev0 - exp0
+    cash = cash_col if cash_col is not None else profit
+
+    margin = col("profit_margin")
+    if margin is None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin = np.where(rev0 != 0, (rev0 - exp0) / rev0 * 100.0, 0.0)
+    margin = np.where(np.isfinite(margin), margin, 0.0)
+
+    out_col = cols.get("vat_collected")
+    in_col  = cols.get("vat_paid")
+    if out_col and in_col:
+        vat_out, vat_in, vat_scale = col(out_col), col(in_col), 1.0
+    else:
+        vat_out, vat_in, vat_scale = rev, exp, _vat_rate()
+
+    base = col(cols.get("zakat_base"))
+    return KPIArrays(
+        revenue=rev if rev is not None else zeros,
+        expenses=exp if exp is not None else zeros,
+        profit=profit,
+        cash_flow=cash,
+        margin=margin,
+        vat_out=vat_out if vat_out is not None else zeros,
+        vat_in=vat_in if vat_in is not None else zeros,
+        vat_scale=vat_scale,
+        zakat_base=base if base is not None else zeros,
+        zakat_assets=tuple(col(c) for c in cols.zakat_assets),
+        zakat_liabilities=tuple(col(c) for c in cols.zakat_liabilities),
+        present=MappingProxyType({"revenue": rev, "expenses": exp, "profit": profit_col,
+                                  "cash_flow": cash_col}),
+    )
+
+
+def compute_kpis(df: pd.DataFrame, zakat_rate: Optional[float] = None,
+                 binding: Optional[ColumnBinding] = None) -> KPIResult:
+    """
+    نواة مدمجة: تمر على أعمدة الإطار (ناتج compute_core) مرة واحدة كمصفوفات NumPy
+    وتحسب المجاميع، الهوامش، التدفق النقدي، صافي الضريبة، وعاء الزكاة، والتغير الشهري.
+    نفس نتائج build_summary و compute_vat و compute_zakat.
+    """
+    n = len(df)
+    cols = resolve_columns(df, binding)
+    a = kpi_arrays(df, cols)
+
+    total_rev = _total(a.revenue)
+    total_exp = _total(a.expenses)
+    total_profit = _total(a.profit)
+
+    # VAT — نفس منطق taxes.vat_parts
+    vat_out = _money(a.vat_out, a.vat_scale)
+    vat_in = _money(a.vat_in, a.vat_scale)
+
+    # Zakat — نفس منطق taxes.zakat_parts / zakat_from_parts
+    base_val = _money(a.zakat_base)
+    assets = sum(_money(x) for x in a.zakat_assets)
+    liabilities = sum(_money(x) for x in a.zakat_liabilities)
+    zakat_base = base_val if base_val > 0 else max(assets - liabilities, 0.0)
+    zakat_due = zakat_from_parts(base_val, assets, liabilities, rate=zakat_rate)
+
+    # التغير الشهري (آخر صف مقابل الذي قبله) على الصفوف ذات التاريخ الصالح
+    mom: Dict[str, Mapping[str, float]] = {}
+    date_col = cols.get("date")
+    if date_col is not None:
+        valid = pd.to_datetime(df[date_col], errors="coerce").notna().to_numpy()
+        for name in MOM_METRICS:
+            arr = a.present[name]
+            if arr is None:
+                continue
+            s = np.nan_to_num(arr[valid])
+            if s.size >= 2:
+                last, prev = float(s[-1]), float(s[-2])
+                delta = last - prev
+                pct = (delta / (prev if prev != 0 else 1)) * 100.0
+                mom[name] = MappingProxyType({"last": last, "prev": prev, "delta": delta, "pct": pct})
+
+    return KPIResult(
+        rows=n,
+        total_revenue=total_rev,
+        total_expenses=total_exp,
+        total_profit=total_profit,
+        avg_profit_margin=float(a.margin.mean()) if n else 0.0,
+        profit_margin=(total_profit / total_rev * 100.0) if total_rev > 0 else 0.0,
+        total_cash_flow=_total(a.cash_flow),
+        vat_output=vat_out,
+        vat_input=vat_in,
+        net_vat=money_diff(vat_out, vat_in),
+        zakat_base=float(zakat_base),
+        zakat_due=zakat_due,
+        mom=MappingProxyType(mom),
+    )
+
+
+ENTITY_KPI_COLUMNS = (
+    "entity_name", "rows", "total_revenue", "total_expenses", "total_profit",
+    "avg_profit_margin", "profit_margin", "total_cash_flow",
+    "vat_output", "vat_input", "net_vat", "zakat_base", "zakat_due",
+)
+
+
+def entity_keys(df: pd.DataFrame, ent_col: Optional[str]) -> np.ndarray:
+    """اسم المنشأة لكل صف: الفارغ -> "غير محدد"، وبدون عمود منشأة -> "All"."""
+    if ent_col is not None and ent_col in df.columns:
+        key = df[ent_col].astype("string").str.strip().replace("", pd.NA).fillna("غير محدد")
+        return key.to_numpy(dtype=object)
+    return np.full(len(df), "All", dtype=object)
+
+
+def compute_kpis_by_entity(df: pd.DataFrame, entity_col: Optional[str] = None,
+                           zakat_rate: Optional[float] = None,
+                           binding: Optional[ColumnBinding] = None) -> pd.DataFrame:
+    """
+    نفس مؤشرات compute_kpis لكل منشأة في تمريرة groupby واحدة — جدول مرتب
+    بصف لكل منشأة (نفس أسماء حقول KPIResult). قرار الزكاة (وعاء جاهز أو تقديري)
+    يؤخذ لكل منشأة على حدة.
+    """
+    cols = resolve_columns(df, binding)
+    ent_col = entity_col or cols.get("entity")
+    if df.empty:
+        return pd.DataFrame(columns=list(ENTITY_KPI_COLUMNS))
+
+    a = kpi_arrays(df, cols)
+    key = entity_keys(df, ent_col)
+
+    exact = halala_mode()
+    money = to_halalas if exact else (lambda x: x)
+    parts = pd.DataFrame({
+        "rows": 1,
+        "total_revenue": a.revenue,
+        "total_expenses": a.expenses,
+        "total_profit": a.profit,
+        "avg_profit_margin": a.margin,
+        "total_cash_flow": a.cash_flow,
+        "vat_output": money(a.vat_out),
+        "vat_input": money(a.vat_in),
+        "base": money(a.zakat_base),
+        "assets": money(a.assets_total()),
+        "liabilities": money(a.liabilities_total()),
+    })
+    g = parts.groupby(key, sort=True).agg({
+        "rows": "sum",
+        "total_revenue": "sum",
+        "total_expenses": "sum",
+        "total_profit": "sum",
+        "avg_profit_margin": "mean",
+        "total_cash_flow": "sum",
+        "vat_output": "sum",
+        "vat_input": "sum",
+        "base": "sum",
+        "assets": "sum",
+        "liabilities": "sum",
+    })
+
+    if exact:
+        # مجاميع int64 بالهللة -> نسبة بتقريب صريح -> ريال
+        vat = {}
+        for c in ("vat_output", "vat_input"):
+            h = g[c].to_numpy(dtype=np.int64)
+            vat[c] = apply_rate(h, a.vat_scale) if a.vat_scale != 1.0 else h
+            g[c] = from_halalas(vat[c])
+        g["net_vat"] = from_halalas(vat["vat_output"] - vat["vat_input"])
+        for c in ("base", "assets", "liabilities"):
+            g[c] = from_halalas(g[c].to_numpy(dtype=np.int64))
+    else:
+        g["vat_output"] *= a.vat_scale
+        g["vat_input"] *= a.vat_scale
+        g["net_vat"] = g["vat_output"] - g["vat_input"]
+    rev = g["total_revenue"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g["profit_margin"] = np.where(rev > 0, g["total_profit"].to_numpy() / rev * 100.0, 0.0)
+
+    base = g["base"].to_numpy()
+    estimated = np.maximum(g["assets"].to_numpy() - g["liabilities"].to_numpy(), 0.0)
+    g["zakat_base"] = np.where(base > 0, base, estimated)
+    if exact:
+        g["zakat_due"] = from_halalas(apply_rate(to_halalas(g["zakat_base"].to_numpy()), _zakat_rate(zakat_rate)))
+    else:
+        g["zakat_due"] = g["zakat_base"] * _zakat_rate(zakat_rate)
+
+    g.index.name = "entity_name"
+    return g.reset_index()[list(ENTITY_KPI_COLUMNS)]
@@ -0,0 +1,193 @@
+# engine/ledger.py
+from __future__ import annotations
+
+from typing import Dict, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import ColumnBinding, resolve_columns
+from engine.kpi import KPIResult, kpi_arrays
+from engine.money import money_diff, money_rate
+from engine.taxes import zakat_from_parts
+
+# مقاييس تراكمية لكل شهر — كافية لإعادة بناء KPIResult لأي نافذة
+LEDGER_METRICS = (
+    "rows", "revenue", "expenses", "profit", "cash_flow", "margin",
+    "vat_out", "vat_in", "zakat_base", "zakat_assets", "zakat_liabilities",
+)
+
+MonthLike = Union[str, pd.Timestamp, pd.Period, "np.datetime64"]
+
+
+def _month_ordinal(m: MonthLike) -> int:
+    p = pd.Period(m, freq="M")
+    return p.year * 12 + p.month - 1
+
+
+class RunningLedger:
+    """
+    دفتر تراكمي (prefix sums) لكل مقياس على فهرس الأشهر المتصل:
+    مجموع أي نافذة (آخر 3/6/12 شهر، منذ بداية السنة، مدى مخصص) = فرق صفين، أي O(1).
+    إضافة شهر جديد O(1) (مطفأة) بدل إعادة الحساب.
+    """
+
+    def __init__(self, vat_scale: float = 1.0, zakat_rate: Optional[float] = None, capacity: int = 64):
+        self.vat_scale = float(vat_scale)
+        self.zakat_rate = zakat_rate
+        self._start: Optional[int] = None           # ترتيب أول شهر (year*12 + month-1)
+        self._n = 0                                  # عدد الأشهر
+        self._cum = np.zeros((max(capacity, 1) + 1, len(LEDGER_METRICS)))
+        self._idx = {m: i for i, m in enumerate(LEDGER_METRICS)}
+
+    # ---------- Build ----------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, binding: Optional[ColumnBinding] = None,
+                   zakat_rate: Optional[float] = None) -> "RunningLedger":
+        """يبني الدفتر من ناتج compute_core (كل الصفوف ذات التاريخ الصالح، كل المنشآت)."""
+        cols = resolve_columns(df, binding)
+        a = kpi_arrays(df, cols)
+        ledger = cls(vat_scale=a.vat_scale, zakat_rate=zakat_rate)
+
+        date_col = cols.get("date")
+        if date_col is None or df.empty:
+            return ledger
+        d = pd.to_datetime(df[date_col], errors="coerce")
+        valid = d.notna().to_numpy()
+        if not valid.any():
+            return ledger
+
+        ords = (d.dt.year * 12 + d.dt.month - 1).to_numpy()[valid].astype(np.int64)
+        start = int(ords.min())
+        pos = ords - start
+        n = int(pos.max()) + 1
+
+        rows = {
+            "rows": np.ones(len(df)),
+            "revenue": np.nan_to_num(a.revenue),
+            "expenses": np.nan_to_num(a.expenses),
+            "profit": np.nan_to_num(a.profit),
+            "cash_flow": np.nan_to_num(a.cash_flow),
+            "margin": a.margin,
+            "vat_out": np.nan_to_num(a.vat_out),
+            "vat_in": np.nan_to_num(a.vat_in),
+            "zakat_base": np.nan_to_num(a.zakat_base),
+            "zakat_assets": a.assets_total(),
+            "zakat_liabilities": a.liabilities_total(),
+        }
+        monthly = np.column_stack([
+            np.bincount(pos, weights=rows[m][valid], minlength=n) for m in LEDGER_METRICS
+        ])
+        ledger._reserve(n)
+        ledger._cum[1:n + 1] = np.cumsum(monthly, axis=0)
+        ledger._start = start
+        ledger._n = n
+        return ledger
+
+    def _reserve(self, n: int) -> None:
+        if n + 1 > self._cum.shape[0]:
+            cap = max(n + 1, 2 * self._cum.shape[0])
+            grown = np.zeros((cap, self._cum.shape[1]))
+            grown[: self._n + 1] = self._cum[: self._n + 1]
+            self._cum = grown
+
+    def append(self, month: MonthLike, values: Mapping[str, float]) -> None:
+        """
+        يضيف مبالغ شهر (أو يضيفها على آخر شهر إن كان نفسه). الأشهر الفارغة بينهما تُملأ صفرًا.
+        الأشهر الأقدم من آخر شهر تحتاج إعادة بناء عبر from_frame.
+        """
+        o = _month_ordinal(month)
+        if self._start is None:
+            self._start = o
+        pos = o - self._start
+        if pos < self._n - 1 or pos < 0:
+            raise ValueError("RunningLedger.append only accepts the last month or later")
+
+        row = np.zeros(len(LEDGER_METRICS))
+        for k, v in values.items():
+            row[self._idx[k]] = float(v)
+
+        if pos == self._n - 1:
+            self._cum[self._n] += row
+            return
+        self._reserve(pos + 1)
+        last = self._cum[self._n]
+        self._cum[self._n + 1: pos + 1] = last        # أشهر بدون حركة
+        self._cum[pos + 1] = last + row
+        self._n = pos + 1
+
+    # ---------- Query ----------
+    @property
+    def size(self) -> int:
+        return self._n
+
+    def months(self) -> pd.PeriodIndex:
+        if self._start is None:
+            return pd.PeriodIndex([], freq="M")
+        first = pd.Period(year=self._start // 12, month=self._start % 12 + 1, freq="M")
+        return pd.period_range(first, periods=self._n, freq="M")
+
+    def _sums(self, i: int, j: int) -> Dict[str, float]:
+        """مجاميع الأشهر [i, j) بالفهرس الداخلي."""
+        i = min(max(i, 0), self._n)
+        j = min(max(j, i), self._n)
+        diff = self._cum[j] - self._cum[i]
+        return {m: float(diff[k]) for m, k in self._idx.items()}
+
+    def window(self, start: Optional[MonthLike] = None, end: Optional[MonthLike] = None) -> Dict[str, float]:
+        """مجاميع المقاييس من start إلى end (شاملة، بالأشهر)."""
+        if self._start is None:
+            return self._sums(0, 0)
+        i = 0 if start is None else _month_ordinal(start) - self._start
+        j = self._n if end is None else _month_ordinal(end) - self._start + 1
+        return self._sums(i, j)
+
+    def last(self, n: int) -> Dict[str, float]:
+        return self._sums(self._n - n, self._n)
+
+    def month(self, i: int) -> Dict[str, float]:
+        """قيم شهر واحد بالفهرس (يدعم السالب: -1 آخر شهر)."""
+        if i < 0:
+            i += self._n
+        return self._sums(i, i + 1)
+
+    def ytd(self, fiscal_year_end_month: int = 12) -> Dict[str, float]:
+        """من بداية السنة المالية الحالية (حسب آخر شهر في الدفتر) حتى آخر شهر."""
+        if self._start is None:
+            return self._sums(0, 0)
+        last = self._start + self._n - 1
+        month0 = last % 12                       # 0..11
+        fy_start = (fiscal_year_end_month % 12)  # أول شهر في السنة المالية (0..11)
+        back = (month0 - fy_start) % 12
+        return self._sums(self._n - 1 - back, self._n)
+
+    def kpis(self, sums: Mapping[str, float]) -> KPIResult:
+        """يحوّل مجاميع نافذة إلى KPIResult (بنفس قواعد الضريبة والزكاة)."""
+        rows = sums["rows"]
+        rev, profit = sums["revenue"], sums["profit"]
+        vat_out = money_rate(sums["vat_out"], self.vat_scale)
+        vat_in = money_rate(sums["vat_in"], self.vat_scale)
+        base, assets, liab = sums["zakat_base"], sums["zakat_assets"], sums["zakat_liabilities"]
+        return KPIResult(
+            rows=int(rows),
+            total_revenue=rev,
+            total_expenses=sums["expenses"],
+            total_profit=profit,
+            avg_profit_margin=(sums["margin"] / rows) if rows else 0.0,
+            profit_margin=(profit / rev * 100.0) if rev > 0 else 0.0,
+            total_cash_flow=sums["cash_flow"],
+            vat_output=vat_out,
+            vat_input=vat_in,
+            net_vat=money_diff(vat_out, vat_in),
+            zakat_base=base if base > 0 else max(assets - liab, 0.0),
+            zakat_due=zakat_from_parts(base, assets, liab, rate=self.zakat_rate),
+        )
+
+    def last_kpis(self, n: int) -> KPIResult:
+        return self.kpis(self.last(n))
+
+    def series(self, metric: str) -> pd.Series:
+        """قيمة المقياس لكل شهر (فرق المجاميع المتتالية)."""
+        k = self._idx[metric]
+        vals = np.diff(self._cum[: self._n + 1, k])
+        return pd.Series(vals, index=self.months(), name=metric)
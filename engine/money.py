@@ -0,0 +1,178 @@
+# engine/money.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.config import DEFAULT_ENGINE_CONFIG
+
+HALALAS_PER_SAR = 100
+ROUNDING_MODES = ("half_up", "half_even", "truncate")
+MONEY_MODES = ("float", "halala")
+
+# تجاوز TaxConfig.money_mode داخل نطاق money_mode(...) — لكل thread/مهمة على حدة
+_MODE: ContextVar[Optional[str]] = ContextVar("rakeem_money_mode", default=None)
+
+ArrayLike = Union[np.ndarray, pd.Series, float, int, Any]
+
+
+def _check_rounding(rounding: str) -> str:
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"Unknown rounding mode: {rounding!r} (expected one of {ROUNDING_MODES})")
+    return rounding
+
+
+def default_rounding() -> str:
+    return _check_rounding(getattr(DEFAULT_ENGINE_CONFIG.taxes, "rounding", "half_up"))
+
+
+def _check_money_mode(mode: str) -> str:
+    if mode not in MONEY_MODES:
+        raise ValueError(f"Unknown money mode: {mode!r} (expected one of {MONEY_MODES})")
+    return mode
+
+
+def halala_mode() -> bool:
+    """
+    الوضع الاختياري للحساب بالهللة (int64) بدل float64: نطاق money_mode(...) إن وُجد،
+    وإلا TaxConfig.money_mode (RAKEEM_MONEY_MODE).
+    """
+    mode = _MODE.get() or _check_money_mode(getattr(DEFAULT_ENGINE_CONFIG.taxes, "money_mode", "float"))
+    return mode == "halala"
+
+
+@contextmanager
+def money_mode(mode: str) -> Iterator[None]:
+    """
+    يشغّل كل حسابات المحرك داخل النطاق بوضع mode ("float" أو "halala") بدون تعديل
+    DEFAULT_ENGINE_CONFIG المجمّد:
+
+        with money_mode("halala"):
+            kpis = compute_kpis(core)
+    """
+    token = _MODE.set(_check_money_mode(mode))
+    try:
+        yield
+    finally:
+        _MODE.reset(token)
+
+
+# ----------------------------- Conversion ---------------------------------
+
+def to_halalas(values: ArrayLike, rounding: str | None = None) -> np.ndarray:
+    """
+    ريال (float/نص/Series) -> هللات int64. القيم غير الرقمية أو الفارغة -> 0.
+    الضرب في 100 يُقرّب أولاً لـ 6 خانات لإزالة خطأ التمثيل الثنائي (1.005*100 = 100.4999...).
+    """
+    rounding = _check_rounding(rounding or default_rounding())
+    if isinstance(values, pd.Series):
+        if not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            values = pd.to_numeric(values, errors="coerce")
+        arr = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        arr = np.asarray(values, dtype=np.float64)
+    scaled = np.round(np.nan_to_num(arr, nan=0.0, posinf=0.0, neginf=0.0) * HALALAS_PER_SAR, 6)
+    if rounding == "half_even":
+        out = np.rint(scaled)
+    elif rounding == "truncate":
+        out = np.trunc(scaled)
+    else:
+        out = np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)
+    return out.astype(np.int64)
+
+
+def from_halalas(halalas: ArrayLike) -> Union[np.ndarray, float]:
+    """هللات -> ريال (float64) للعرض والتصدير."""
+    h = np.asarray(halalas, dtype=np.int64)
+    out = h / HALALAS_PER_SAR
+    return float(out) if out.ndim == 0 else out
+
+
+# ----------------------------- Rates ---------------------------------
+
+@lru_cache(maxsize=64)
+def rate_fraction(rate: float) -> Tuple[int, int]:
+    """النسبة كبسط/مقام صحيحين (0.15 -> 3/20، 0.025 -> 1/40) — بدون أي float في الضرب."""
+    if rate < 0:
+        raise ValueError("rate must be non-negative")
+    f = Fraction(str(rate)).limit_denominator(10**9)
+    return f.numerator, f.denominator
+
+
+def _divide(p: np.ndarray, den: int, rounding: str) -> np.ndarray:
+    """قسمة صحيحة p/den بقاعدة تقريب صريحة (متجهة، int64 فقط)."""
+    negative = bool(p.size) and p.min() < 0
+    a = np.abs(p) if negative else p
+    if rounding == "half_up":
+        q = (2 * a + den) // (2 * den)
+    elif rounding == "truncate":
+        q = a // den
+    else:
+        q, r = np.divmod(a, den)
+        q = q + ((2 * r > den) | ((2 * r == den) & (q % 2 == 1)))
+    return (np.where(p < 0, -q, q) if negative else q).astype(np.int64, copy=False)
+
+
+def apply_rate(halalas: ArrayLike, rate: float, rounding: str | None = None) -> Union[np.ndarray, int]:
+    """
+    مبلغ × نسبة بالهللة: h * num / den بحساب صحيح دقيق ثم تقريب واحد حسب rounding
+    (half_up: النصف بعيدًا عن الصفر، half_even: تقريب البنوك، truncate: قطع نحو الصفر).
+    """
+    rounding = _check_rounding(rounding or default_rounding())
+    num, den = rate_fraction(float(rate))
+    h = np.asarray(halalas, dtype=np.int64)
+    limit = np.iinfo(np.int64).max // (2 * max(num, 1)) - den
+    if h.size and (h.max() > limit or h.min() < -limit):
+        raise OverflowError("amount too large for exact int64 rate application")
+    out = _divide(h * num, den, rounding)
+    return int(out) if out.ndim == 0 else out
+
+
+def apply_rates(halalas: ArrayLike, rates: ArrayLike, rounding: str | None = None) -> np.ndarray:
+    """
+    مثل apply_rate لكن بنسبة لكل عنصر: حساب متجه واحد لكل نسبة مميزة (عادةً نسبتان
+    أو ثلاث) بدل حلقة على العناصر.
+    """
+    h = np.asarray(halalas, dtype=np.int64)
+    r = np.round(np.asarray(rates, dtype=np.float64), 9)
+    codes, uniques = pd.factorize(r)
+    out = np.zeros(h.shape, dtype=np.int64)
+    for i, rate in enumerate(uniques):
+        mask = codes == i
+        out[mask] = apply_rate(h[mask], float(rate), rounding)
+    return out
+
+
+def exact_sum(values: ArrayLike, rounding: str | None = None) -> int:
+    """مجموع عمود بالهللة (كل صف يُقرّب لهللة ثم يُجمع بدقة int64)."""
+    return int(to_halalas(values, rounding).sum())
+
+
+# ----------------------------- Mode-aware helpers ---------------------------------
+
+def money_total(values: ArrayLike) -> float:
+    """مجموع بالريال — دقيق بالهللة في halala_mode، وإلا float64 كما كان."""
+    if halala_mode():
+        return from_halalas(exact_sum(values))
+    arr = values.to_numpy(dtype=np.float64, na_value=np.nan) if isinstance(values, pd.Series) else values
+    return float(np.nansum(np.asarray(arr, dtype=np.float64)))
+
+
+def money_diff(a: float, b: float) -> float:
+    """a - b — في halala_mode يُطرح بالهللة حتى لا يظهر 0.00000007 في صافي الضريبة."""
+    if halala_mode():
+        return from_halalas(int(to_halalas(a)) - int(to_halalas(b)))
+    return float(a - b)
+
+
+def money_rate(amount: float, rate: float) -> float:
+    """amount * rate — في halala_mode يُحسب بالهللة مع قاعدة التقريب المضبوطة."""
+    if halala_mode():
+        return from_halalas(apply_rate(to_halalas(amount), rate))
+    return float(amount * rate)
@@ -0,0 +1,294 @@
+# engine/pipeline.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from engine.compact import compact_frame
+from engine.compute_core import compute_core
+from engine.config import DEFAULT_ENGINE_CONFIG
+from engine.cube import build_cube
+from engine.forecasting_core import build_revenue_forecast
+from engine.io import frame_fingerprint
+from engine.kpi import compute_kpis, compute_kpis_by_entity
+from engine.ledger import RunningLedger
+from engine.rules_engine import build_alerts, generate_recommendations, report_recommendations
+from engine.reminder_core import CompanyProfile
+from engine.vat_returns import compute_vat_returns, vat_return_totals
+from engine.zakat_returns import compute_zakat_returns, zakat_return_totals
+
+# المدخل الخام (الدفتر المطبّع من load_*) — ليس عقدة تُحسب
+RAW = "raw"
+
+DEFAULT_PARAMS: Mapping[str, Any] = {
+    "forecast_periods": 6,
+    "fiscal_year_end_month": 12,
+    "fiscal_year_end_day": 31,
+    "zakat_rate": None,
+    "recent_months": 3,
+    "vat_frequency": "quarterly",
+    "compact_frames": DEFAULT_ENGINE_CONFIG.compact_frames,
+}
+
+MEMO_SIZE = 64
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    params: Tuple[str, ...] = ()
+
+
+NODES: Dict[str, Node] = {}
+
+
+def node(name: str, deps: Tuple[str, ...] = (), params: Tuple[str, ...] = ()):
+    """يسجّل دالة كعقدة: تستقبل قيم deps بالترتيب ثم params كوسائط مسماة."""
+    def register(fn: Callable[..., Any]) -> Callable[..., Any]:
+        for d in deps:
+            if d != RAW and d not in NODES:
+                raise ValueError(f"Node {name!r} depends on unknown node {d!r}")
+        unknown = [p for p in params if p not in DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"Node {name!r} uses unknown params: {unknown}")
+        NODES[name] = Node(name, fn, tuple(deps), tuple(params))
+        _closure.cache_clear()
+        return fn
+    return register
+
+
+@lru_cache(maxsize=None)
+def _closure(name: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(كل العقد السابقة, كل المعاملات المؤثرة) — المعاملات تدخل في مفتاح الذاكرة."""
+    n = NODES[name]
+    ancestors, params = set(n.deps) - {RAW}, set(n.params)
+    for d in n.deps:
+        if d != RAW:
+            a, p = _closure(d)
+            ancestors |= set(a)
+            params |= set(p)
+    return tuple(sorted(ancestors)), tuple(sorted(params))
+
+
+# ----------------------------- Nodes ---------------------------------
+
+@node("core", deps=(RAW,), params=("compact_frames",))
+def _core(raw, compact_frames):
+    core = compute_core(raw, copy=False)
+    if compact_frames:
+        # نفس ضغط النواة المزروعة من التطبيق — البصمة الواحدة لا تقابل نوعين مختلفين
+        core, _ = compact_frame(core)
+    return core
+
+
+@node("kpis", deps=("core",), params=("zakat_rate",))
+def _kpis(core, zakat_rate):
+    return compute_kpis(core, zakat_rate=zakat_rate)
+
+
+@node("kpis_by_entity", deps=("core",), params=("zakat_rate",))
+def _kpis_by_entity(core, zakat_rate):
+    return compute_kpis_by_entity(core, zakat_rate=zakat_rate)
+
+
+@node("taxes", deps=("kpis",))
+def _taxes(kpis):
+    return {
+        "vat_output": kpis.vat_output,
+        "vat_input": kpis.vat_input,
+        "net_vat": kpis.net_vat,
+        "zakat_base": kpis.zakat_base,
+        "zakat_due": kpis.zakat_due,
+    }
+
+
+@node("ledger", deps=("core",), params=("zakat_rate",))
+def _ledger(core, zakat_rate):
+    return RunningLedger.from_frame(core, zakat_rate=zakat_rate)
+
+
+@node("recent", deps=("ledger", "core"), params=("recent_months", "zakat_rate"))
+def _recent(ledger, core, recent_months, zakat_rate):
+    if ledger.size:
+        return ledger.last_kpis(recent_months)
+    return compute_kpis(core.tail(recent_months), zakat_rate=zakat_rate)
+
+
+@node("cube", deps=("core",), params=("fiscal_year_end_month",))
+def _cube(core, fiscal_year_end_month):
+    return build_cube(core, fiscal_year_end_month)
+
+
+@node("forecast", deps=("core",), params=("forecast_periods",))
+def _forecast(core, forecast_periods):
+    return build_revenue_forecast(core, periods=forecast_periods)
+
+
+@node("vat_returns", deps=("core",), params=("vat_frequency",))
+def _vat_returns(core, vat_frequency):
+    return compute_vat_returns(core, frequency=vat_frequency)
+
+
+@node("zakat_returns", deps=("core",),
+      params=("fiscal_year_end_month", "fiscal_year_end_day", "zakat_rate"))
+def _zakat_returns(core, fiscal_year_end_month, fiscal_year_end_day, zakat_rate):
+    profile = CompanyProfile(fiscal_year_end_month=fiscal_year_end_month,
+                             fiscal_year_end_day=fiscal_year_end_day)
+    return compute_zakat_returns(core, profile, rate=zakat_rate)
+
+
+@node("recommendations", deps=("core", "forecast", "ledger"))
+def _recommendations(core, forecast, ledger):
+    return generate_recommendations(core, forecast, ledger=ledger)
+
+
+@node("alerts", deps=("recent",))
+def _alerts(recent):
+    return build_alerts(recent)
+
+
+@node("report_recommendations", deps=("kpis",))
+def _report_recommendations(kpis):
+    return report_recommendations(kpis)
+
+
+@node("report_tables", deps=("cube", "vat_returns", "zakat_returns"))
+def _report_tables(cube, vat_returns, zakat_returns):
+    monthly = cube.frame("month", ["revenue", "expenses", "profit"])
+    quarterly = cube.frame("quarter", ["revenue", "expenses", "profit", "net_vat"])
+    yearly = cube.frame("fiscal_year", ["revenue", "expenses", "profit", "net_vat"])
+    return {
+        "الإيرادات": monthly[["date", "revenue"]],
+        "المصروفات": monthly[["date", "expenses"]],
+        "الأرباح": monthly[["date", "profit"]],
+        "ملخص ربع سنوي": quarterly.drop(columns="date"),
+        "ملخص السنة المالية": yearly.drop(columns="date"),
+        "إقرارات ضريبة القيمة المضافة": vat_return_totals(vat_returns)[
+            ["period", "due_date", "vat_output", "vat_input", "net_vat"]
+        ],
+        "الزكاة حسب السنة المالية": zakat_return_totals(zakat_returns)[
+            ["fiscal_year", "period_end", "due_date", "zakat_base", "zakat_due"]
+        ],
+    }
+
+
+@node("report", deps=("kpis", "report_recommendations", "report_tables"))
+def _report(kpis, recs, tables):
+    """وسائط generate_financial_report (بدون كتابة PDF)."""
+    return {"metrics": kpis.report_metrics(), "recommendations": recs, "data_tables": tables}
+
+
+# ----------------------------- Memo ---------------------------------
+
+class PipelineMemo:
+    """
+    LRU للأنابيب: (بصمة المدخل, العقدة, المعاملات المؤثرة) -> القيمة.
+    الذاكرة العامة مشتركة بين كل الأنابيب؛ التطبيق يمرر ذاكرة لكل جلسة (memo=)
+    حتى لا تُخرج ملفات مستخدم نتائج مستخدم آخر.
+    """
+
+    def __init__(self, maxsize: int = MEMO_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            if key not in self._data:
+                return False, None
+            self._data.move_to_end(key)
+            return True, self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MEMO = PipelineMemo()
+
+
+def clear_memo() -> None:
+    _MEMO.clear()
+
+
+# ----------------------------- Pipeline ---------------------------------
+
+class AnalysisPipeline:
+    """
+    أنبوب تحليل كسول: كل ناتج مشتق (النواة، المؤشرات، الضرائب، التنبؤ، التوصيات، التنبيهات،
+    التقرير) عقدة تُحسب عند أول طلب فقط ومرة واحدة لنفس البصمة والمعاملات.
+    timings: ثواني الحساب لكل عقدة (بدون وقت العقد السابقة)، hits: العقد المأخوذة من الذاكرة.
+    """
+
+    def __init__(self, raw: pd.DataFrame, params: Optional[Mapping[str, Any]] = None,
+                 fingerprint: Optional[str] = None, seed: Optional[Mapping[str, Any]] = None,
+                 memo: Optional[PipelineMemo] = None):
+        unknown = [k for k in (params or {}) if k not in DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"Unknown pipeline params: {unknown}")
+        self.raw = raw
+        self.params: Dict[str, Any] = {**DEFAULT_PARAMS, **(params or {})}
+        self.fingerprint = fingerprint or frame_fingerprint(raw)
+        self.timings: Dict[str, float] = {}
+        self.hits: set = set()
+        self.memo = _MEMO if memo is None else memo
+        for name, value in (seed or {}).items():
+            self.memo.put(self._key(name), value)
+
+    def _key(self, name: str) -> Tuple[Hashable, ...]:
+        if name not in NODES:
+            raise KeyError(f"Unknown pipeline node: {name!r}")
+        _, params = _closure(name)
+        return (self.fingerprint, name) + tuple((p, self.params[p]) for p in params)
+
+    def get(self, name: str) -> Any:
+        key = self._key(name)
+        found, value = self.memo.get(key)
+        if found:
+            self.hits.add(name)
+            return value
+        n = NODES[name]
+        args = [self.raw if d == RAW else self.get(d) for d in n.deps]
+        t0 = time.perf_counter()
+        value = n.fn(*args, **{p: self.params[p] for p in n.params})
+        self.timings[name] = time.perf_counter() - t0
+        self.memo.put(key, value)
+        return value
+
+    __getitem__ = get
+
+    def is_computed(self, name: str) -> bool:
+        return self.memo.get(self._key(name))[0]
+
+    def dependencies(self, name: str) -> Tuple[str, ...]:
+        """كل العقد التي تحتاجها العقدة (مباشرة أو غير مباشرة)."""
+        self._key(name)
+        return _closure(name)[0]
+
+    def with_params(self, **params: Any) -> "AnalysisPipeline":
+        """نفس المدخل بمعاملات مختلفة — العقد التي لا تتأثر بها تُعاد من الذاكرة."""
+        return AnalysisPipeline(self.raw, {**self.params, **params}, fingerprint=self.fingerprint,
+                                memo=self.memo)
+
+    def timings_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [{"node": k, "seconds": v} for k, v in self.timings.items()], columns=["node", "seconds"]
+        )
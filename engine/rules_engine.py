@@ -1,7 +1,9 @@
 # engine/rules_engine.py
-from future import annotations
+from __future__ import annotations
 import pandas as pd
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional
+
+from engine.ledger import RunningLedger
 
 def _pct_change(a: float, b: float) -> float:
     if b == 0:
@@ -11,22 +13,42 @@ def _pct_change(a: float, b: float) -> float:
     except Exception:
         return 0.0
 
+def _last_points(hist: pd.DataFrame, ledger: Optional[RunningLedger], metric: str, n: int = 3) -> List[float]:
+    """
+    آخر n قيم شهرية للمقياس من الدفتر التراكمي، وإلا آخر n صفوف. الأشهر بلا أي صف
+    تُتخطى — شهر أخير فارغ ليس "تراجعًا 100%".
+    """
+    if metric not in hist.columns:
+        return []
+    if ledger is not None and ledger.size:
+        filled = ledger.series("rows").to_numpy() > 0
+        return ledger.series(metric).to_numpy()[filled][-n:].tolist()
+    return hist[metric].dropna().tail(n).tolist()
+
 def generate_recommendations(
     history_df: pd.DataFrame,
     forecast_df: pd.DataFrame,
     metric: str = "revenue",
     entity_name: str | None = None,
+    ledger: Optional[RunningLedger] = None,
 ) -> List[str]:
+    """
+    ledger: دفتر تراكمي مبني مسبقًا لنفس history_df (عقدة "ledger" في الأنبوب) حتى لا
+    يُعاد بناؤه في كل استدعاء — يُتجاهل عند entity_name لأنه يغطي كل المنشآت.
+    """
 
     tips: List[str] = []
     hist = history_df.copy()
 
     if entity_name and "entity_name" in hist.columns:
         hist = hist[hist["entity_name"] == entity_name]
+        ledger = None
 
     # تجهيز تواريخ/أعمدة
     if "date" in hist.columns:
         hist = hist.sort_values("date")
+        if ledger is None:
+            ledger = RunningLedger.from_frame(hist)
 
     # أرقام أساسية
     rev = hist.get("revenue")
@@ -35,8 +57,8 @@ def generate_recommendations(
 
     # 1) الإيرادات – ميل آخر 3 أشهر + أول نقطة تنبؤ
     try:
-        if rev is not None and len(rev.dropna()) >= 3:
-            last3 = rev.dropna().tail(3).tolist()
+        last3 = _last_points(hist, ledger, "revenue")
+        if len(last3) >= 3:
             change3 = _pct_change(last3[-1], last3[0])
             if change3 <= -10:
                 tips.append(f"لوحظ تراجع في الإيرادات بنحو {abs(change3):.1f}% خلال آخر ثلاثة أشهر — راجع حملات التسويق والتسعير.")
@@ -54,8 +76,8 @@ def generate_recommendations(
 
     # 2) المصروفات – ارتفاع ≥15%
     try:
-        if exp is not None and len(exp.dropna()) >= 3:
-            last3e = exp.dropna().tail(3).tolist()
+        last3e = _last_points(hist, ledger, "expenses")
+        if len(last3e) >= 3:
             e_chg = _pct_change(last3e[-1], last3e[0])
             if e_chg >= 15:
                 tips.append(f"المصروفات ارتفعت بنحو {e_chg:.1f}% — ادرس عقود الموردين وخفض البنود غير الحرجة.")
@@ -85,3 +107,76 @@ def generate_recommendations(
     if not tips:
         tips.append("لا توجد إشارات خطرة حالياً — استمر على نفس النهج مع متابعة شهرية للمؤشرات.")
     return tips[:5]  # نعرض حتى 5 توصيات كحد أقصى
+
+
+# ===== تنبيهات لوحة التحكم (آخر 3 أشهر) =====
+def build_alerts(recent) -> List[Dict[str, Any]]:
+    """
+    قواعد التنبيه على مؤشرات نافذة الأشهر الأخيرة (KPIResult). كل تنبيه:
+    level / title / reason / recs — إعادة الصياغة بالنموذج تبقى في الواجهة.
+    """
+    rev = recent.total_revenue
+    alerts: List[Dict[str, Any]] = []
+
+    def add(level: str, title: str, reason: str, *recs: str) -> None:
+        alerts.append({"level": level, "title": title, "reason": reason, "recs": tuple(recs)})
+
+    # الربحية
+    profit_margin = (recent.total_profit / rev) if rev > 0 else 0
+    if profit_margin < 0.1:
+        add("high", "انخفاض حاد في هامش الربح (<10%)",
+            "التحليل يبين تراجعًا ملحوظًا في الربحية خلال آخر ثلاثة أشهر.",
+            "إعادة تقييم الأسعار وتحسين هوامش الربح.",
+            "تقليص المصروفات التشغيلية ذات التأثير المحدود.")
+    elif profit_margin < 0.2:
+        add("medium", "ضعف مستوى الربحية (<20%)",
+            "الربحية الحالية أقل من المستوى المتوقع للاستقرار المالي.",
+            "رفع كفاءة دورة الإيرادات عبر تعزيز المبيعات.",
+            "مراجعة المصروفات التشغيلية وتحسين كفاءتها.")
+
+    # التدفق النقدي
+    if recent.total_cash_flow < 0:
+        add("high", "تدفق نقدي سلبي",
+            "المتحصلات النقدية أقل من المصروفات خلال الفترة الأخيرة.",
+            "تعزيز التحصيل وتقليل آجال السداد.",
+            "إدارة الالتزامات قصيرة الأجل بشكل أكثر مرونة.")
+
+    # الزكاة
+    if recent.zakat_due > rev * 0.2:
+        add("medium", "ارتفاع نسبة الزكاة (>20%)",
+            "الزكاة المستحقة مرتفعة مقارنة بحجم الإيرادات.",
+            "مراجعة آلية احتساب الزكاة.",
+            "تقييم الأصول غير المستغلة لتقليل البنود الخاضعة.")
+
+    # ضريبة القيمة المضافة
+    if recent.net_vat > rev * 0.2:
+        add("medium", "ارتفاع ضريبة القيمة المضافة (>20%)",
+            "القيمة المسجلة للضريبة مرتفعة مقارنة بالإيرادات.",
+            "التحقق من دقة خصم ضريبة المدخلات.",
+            "مطابقة الإقرارات الضريبية مع حركة المبيعات.")
+    return alerts
+
+
+# ===== توصيات التقرير =====
+def report_recommendations(kpis) -> List[str]:
+    """توصيات ديناميكية للتقرير من المؤشرات الإجمالية (KPIResult)."""
+    rev, exp = kpis.total_revenue, kpis.total_expenses
+    recs: List[str] = []
+    profit_margin = (kpis.total_profit / rev) if rev > 0 else 0.0
+    if exp > rev * 0.7:
+        recs.append("خفض المصروفات التشغيلية التي زادت عن 70٪ من الإيرادات خلال الفترة.")
+    else:
+        recs.append("استمر في ضبط المصروفات التشغيلية عند مستوياتها الحالية.")
+
+    if profit_margin < 0.2:
+        recs.append("ارفع هوامش الربح بمراجعة التسعير أو تحسين مزيج المنتجات.")
+    else:
+        recs.append("حافظ على مستوى هوامش الربح الحالي مع مراقبة أي تراجع مفاجئ.")
+
+    if kpis.total_cash_flow < 0:
+        recs.append("حسّن دورة التحصيل النقدي وتقصير آجال المدينين لتحسين التدفق النقدي.")
+    else:
+        recs.append("استثمر جزءًا من التدفق النقدي الإيجابي في أنشطة توليد الإيرادات.")
+
+    recs.append("التأكد من مطابقة الإقرارات الضريبية والزكوية للبيانات المالية المعتمدة.")
+    return recs
@@ -0,0 +1,344 @@
+# engine/store.py
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import resolve_columns
+from engine.config import DEFAULT_ENGINE_CONFIG
+
+# يتغير عند تغيير المخطط — ملف بنسخة مختلفة يُرفض بدل قراءته خطأ
+_STORE_VERSION = 1
+
+# الأعمدة الرقمية الموحّدة المخزنة كأعمدة SQL (قابلة للتجميع في الاستعلام)
+STORE_METRICS = ("revenue", "expenses", "vat_collected", "vat_paid", "zakat_base",
+                 "opening_cash", "closing_cash")
+
+DateLike = Union[str, pd.Timestamp, None]
+
+# مفتاح القيمة الأصلية لعمود التاريخ داخل extra عندما لا يكون datetime (نص مثل "01/2024")
+_RAW_DATE = "\x00date"
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS companies (
+    company TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,          -- [[اسم العمود في الإطار, الاسم المخزن, dtype], ...] بالترتيب
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    fingerprint TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    stored_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger (
+    company TEXT NOT NULL,
+    entity TEXT NOT NULL,           -- '' بدون منشأة
+    date TEXT NOT NULL,             -- ISO 'YYYY-MM-DD[ HH:MM:SS]'، '' بدون تاريخ
+    seq INTEGER NOT NULL,           -- ترتيب الصف داخل (المنشأة، التاريخ)
+    pos INTEGER NOT NULL,           -- ترتيب الكتابة (ترتيب صفوف الملف)
+    {", ".join(f"{m} REAL" for m in STORE_METRICS)},
+    extra TEXT,                     -- بقية الأعمدة (JSON لكل صف)
+    PRIMARY KEY (company, entity, date, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ledger_company_date ON ledger (company, date);
+"""
+
+
+def _now() -> str:
+    return pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds")
+
+
+def _iso(value: DateLike) -> str:
+    ts = pd.Timestamp(value)
+    return ts.strftime("%Y-%m-%d %H:%M:%S") if (ts.hour or ts.minute or ts.second) else ts.strftime("%Y-%m-%d")
+
+
+def _date_text(s: pd.Series) -> np.ndarray:
+    d = pd.to_datetime(s, errors="coerce")
+    has_time = bool((d.dropna() != d.dropna().dt.normalize()).any())
+    text = d.dt.strftime("%Y-%m-%d %H:%M:%S" if has_time else "%Y-%m-%d")
+    return text.fillna("").to_numpy(dtype=object)
+
+
+def _restore(s: pd.Series, dtype: Optional[str]) -> pd.Series:
+    """يعيد dtype العمود الأصلي (int64 بدل REAL، str بدل object...) حتى يطابق hash الصفوف."""
+    if not dtype or str(s.dtype) == dtype:
+        return s
+    try:
+        target = pd.api.types.pandas_dtype(dtype)
+        if isinstance(target, pd.DatetimeTZDtype) or target.kind == "M":
+            return pd.to_datetime(s, errors="coerce").astype(target)
+        return s.astype(target)
+    except (TypeError, ValueError):
+        return s
+
+
+def _cell(v: Any) -> Any:
+    """قيمة SQLite: NaN/NA -> NULL، أنواع numpy -> بايثون."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _column(s: pd.Series) -> List[Any]:
+    """عمود كقائمة قيم SQLite — تحويل واحد للعمود الرقمي بدل _cell لكل خلية."""
+    if s.dtype.kind in "biuf":
+        values = s.to_numpy().tolist()
+        for i in np.flatnonzero(s.isna().to_numpy()):
+            values[i] = None
+        return values
+    return [_cell(v) for v in s.astype(object).to_numpy()]
+
+
+class LedgerStore:
+    """
+    مخزن محلي (SQLite) لدفاتر مطبّعة لعدة شركات، مفتاحه (الشركة، المنشأة، التاريخ، الترتيب):
+    - upsert/replace بالجملة من ناتج loaders في engine.io
+    - استعلامات مدى (منشأة، من/إلى) ومجاميع شهرية في SQL للوحة والتنبؤ والتقويم
+    - بصمة الملف المرفوع -> الدفتر المخزن، فالعميل العائد لا يُعاد تحليل ملفه
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._con:
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.executescript(_SCHEMA)
+            row = self._con.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+            if row is None:
+                self._con.execute("INSERT INTO meta VALUES ('version', ?)", (str(_STORE_VERSION),))
+            elif int(row[0]) != _STORE_VERSION:
+                raise ValueError(f"Ledger store {path} has version {row[0]}, expected {_STORE_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+    def __enter__(self) -> "LedgerStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------- Write ----------
+    def _columns(self, company: str) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+        row = self._con.execute("SELECT columns FROM companies WHERE company=?", (company,)).fetchone()
+        # مخازن أقدم بلا dtype -> None (بدون استعادة النوع)
+        return [(c[0], c[1], c[2] if len(c) > 2 else None) for c in json.loads(row[0])] if row else None
+
+    def _rows(self, company: str, df: pd.DataFrame,
+              offset: int = 0) -> Tuple[List[Sequence[Any]], List[Tuple[str, str, str]]]:
+        """أعمدة جدول ledger بترتيبه (قائمة لكل عمود) — executemany يمر عليها بـ zip."""
+        cols = resolve_columns(df)
+        mapping: Dict[Any, str] = {}
+        for name in STORE_METRICS:
+            if name in cols:
+                mapping[cols[name]] = name
+        ent_col, date_col = cols.get("entity"), cols.get("date")
+        if ent_col is not None:
+            mapping[ent_col] = "entity"
+        if date_col is not None:
+            mapping[date_col] = "date"
+        extra_cols = [c for c in df.columns if c not in mapping]
+        layout = [(str(c), mapping.get(c, str(c)), str(df[c].dtype)) for c in df.columns]
+
+        n = len(df)
+        entity = (df[ent_col].astype("string").fillna("").to_numpy(dtype=object)
+                  if ent_col is not None else np.full(n, "", dtype=object))
+        date = _date_text(df[date_col]) if date_col is not None else np.full(n, "", dtype=object)
+        seq = pd.DataFrame({"e": entity, "d": date}).groupby(["e", "d"], sort=False).cumcount().to_numpy()
+
+        metrics = [_column(df[cols[name]]) if name in cols else [None] * n for name in STORE_METRICS]
+        names = [str(c) for c in extra_cols]
+        # التاريخ النصي يُحفظ كما هو أيضًا — date المخزن مطبّع للاستعلام فقط
+        if date_col is not None and not pd.api.types.is_datetime64_any_dtype(df[date_col].dtype):
+            extra_cols = extra_cols + [date_col]
+            names.append(_RAW_DATE)
+        if extra_cols:
+            # json.dumps يحفظ float كاملاً (to_json يقطعه لـ 10 خانات)
+            extra = [json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str)
+                     for row in zip(*(_column(df[c]) for c in extra_cols))]
+        else:
+            extra = [None] * n
+
+        columns = [[company] * n, entity.tolist(), date.tolist(), seq.tolist(),
+                   range(offset, offset + n), *metrics, extra]
+        return columns, layout
+
+    def upsert(self, company: str, df: pd.DataFrame, fingerprint: Optional[str] = None,
+               replace: bool = False) -> int:
+        """
+        يكتب صفوف الإطار (ناتج load_excel/load_csv/load_excel_sheets) للشركة:
+        نفس (المنشأة، التاريخ، الترتيب) يُستبدل، والجديد يُضاف. replace=True يحذف دفتر الشركة أولاً.
+        fingerprint (بصمة الملف المرفوع) تربط الملف بهذه النسخة من الدفتر.
+        """
+        placeholders = ", ".join("?" * (6 + len(STORE_METRICS)))
+        with self._lock, self._con:
+            prev = None if replace else self._columns(company)
+            offset = 0 if replace else self._con.execute(
+                "SELECT coalesce(max(pos) + 1, 0) FROM ledger WHERE company=?", (company,)).fetchone()[0]
+            columns, layout = self._rows(company, df, offset)
+            if prev:
+                # اتحاد الأعمدة: القديمة بترتيبها ثم الجديدة
+                known = {c[0] for c in prev}
+                layout = prev + [c for c in layout if c[0] not in known]
+            if replace:
+                self._con.execute("DELETE FROM ledger WHERE company=?", (company,))
+            self._con.executemany(f"INSERT OR REPLACE INTO ledger VALUES ({placeholders})", zip(*columns))
+            self._con.execute(
+                "INSERT INTO companies VALUES (?, ?, 1, ?) ON CONFLICT(company) DO UPDATE SET "
+                "columns=excluded.columns, version=version + 1, updated_at=excluded.updated_at",
+                (company, json.dumps(layout, ensure_ascii=False), _now()),
+            )
+            if fingerprint is not None:
+                version = self._con.execute("SELECT version FROM companies WHERE company=?",
+                                            (company,)).fetchone()[0]
+                self._con.execute("INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?)",
+                                  (fingerprint, company, version, len(df), _now()))
+        return len(df)
+
+    def replace(self, company: str, df: pd.DataFrame, fingerprint: Optional[str] = None) -> int:
+        return self.upsert(company, df, fingerprint=fingerprint, replace=True)
+
+    def delete(self, company: str) -> None:
+        with self._lock, self._con:
+            for table in ("ledger", "uploads", "companies"):
+                self._con.execute(f"DELETE FROM {table} WHERE company=?", (company,))
+
+    # ---------- Read ----------
+    def lookup(self, fingerprint: str) -> Optional[str]:
+        """الشركة التي يطابق دفترها الحالي هذا الملف بالضبط (وإلا None)."""
+        with self._lock:
+            row = self._con.execute(
+                "SELECT u.company FROM uploads u JOIN companies c USING (company) "
+                "WHERE u.fingerprint=? AND u.version=c.version", (fingerprint,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load_upload(self, fingerprint: str) -> Optional[pd.DataFrame]:
+        """الدفتر المخزن لهذا الملف بنفس أعمدته وأنواعها (وإلا None)."""
+        company = self.lookup(fingerprint)
+        return self.load(company) if company is not None else None
+
+    def _where(self, company: str, entity: Optional[str], start: DateLike,
+               end: DateLike) -> Tuple[str, List[Any]]:
+        where, args = ["company=?"], [company]
+        if entity is not None:
+            where.append("entity=?")
+            args.append(entity)
+        if start is not None:
+            where.append("date >= ?")
+            args.append(_iso(start))
+        if end is not None:
+            # end شامل لليوم كله
+            where.append("date < ?")
+            args.append(_iso(pd.Timestamp(end).normalize() + pd.Timedelta(days=1)))
+        if start is not None or end is not None:
+            where.append("date != ''")
+        return " AND ".join(where), args
+
+    def load(self, company: str, entity: Optional[str] = None,
+             start: DateLike = None, end: DateLike = None) -> pd.DataFrame:
+        """
+        دفتر الشركة بنفس أعمدة الإطار المرفوع وترتيبها (اختياريًا منشأة ومدى تواريخ شامل).
+        الصفوف بترتيب الكتابة (ترتيب الملف بعد replace).
+        """
+        with self._lock:
+            layout = self._columns(company)
+            if layout is None:
+                raise KeyError(f"Unknown company in ledger store: {company!r}")
+            where, args = self._where(company, entity, start, end)
+            # أعمدة المقاييس الموجودة في دفتر الشركة فقط
+            metrics = [m for m in STORE_METRICS if any(name == m for _, name, _ in layout)]
+            cur = self._con.execute(
+                f"SELECT {', '.join(['entity', 'date', *metrics, 'extra'])} FROM ledger "
+                f"WHERE {where} ORDER BY pos", args)
+            data = cur.fetchall()
+
+        stored = pd.DataFrame.from_records(data, columns=["entity", "date", *metrics, "extra"])
+        # استدعاء json.loads واحد لكل الصفوف (بدل استدعاء لكل صف) ثم عمود عمود
+        blobs = stored["extra"].fillna("{}").to_numpy(dtype=object)
+        records = json.loads("[" + ",".join(blobs) + "]") if len(blobs) else []
+        seen = set().union(*records) if records else set()
+
+        def extra(name: str) -> pd.Series:
+            if name not in seen:
+                return pd.Series(None, index=stored.index, dtype=object)
+            return pd.Series([r.get(name) for r in records], index=stored.index, dtype=object)
+
+        out = {}
+        for orig, name, dtype in layout:
+            if name == "date":
+                col = (extra(_RAW_DATE) if _RAW_DATE in seen
+                       else pd.to_datetime(stored["date"].replace("", None), errors="coerce"))
+            elif name == "entity":
+                col = stored["entity"].replace("", None)
+            elif name in STORE_METRICS:
+                col = stored[name]
+            else:
+                col = extra(name)
+            out[orig] = _restore(col, dtype)
+        return pd.DataFrame(out, index=pd.RangeIndex(len(stored)))
+
+    def monthly(self, company: str, metrics: Sequence[str] = ("revenue", "expenses"),
+                entity: Optional[str] = None, start: DateLike = None, end: DateLike = None,
+                by_entity: bool = False) -> pd.DataFrame:
+        """مجاميع شهرية (GROUP BY في SQL) — date = نهاية الشهر، مثل engine.cube."""
+        unknown = [m for m in metrics if m not in STORE_METRICS]
+        if unknown:
+            raise ValueError(f"Unknown store metrics: {unknown}")
+        where, args = self._where(company, entity, start, end)
+        keys = ("entity, " if by_entity else "") + "substr(date, 1, 7) AS month"
+        sums = ", ".join(f"total({m}) AS {m}" for m in metrics)
+        with self._lock:
+            cur = self._con.execute(
+                f"SELECT {keys}, {sums} FROM ledger WHERE {where} AND date != '' "
+                f"GROUP BY {'entity, ' if by_entity else ''}month ORDER BY month", args)
+            names = [d[0] for d in cur.description]
+            out = pd.DataFrame.from_records(cur.fetchall(), columns=names)
+        out.insert(0, "date", pd.PeriodIndex(out.pop("month"), freq="M").to_timestamp(how="end").normalize())
+        if by_entity:
+            out = out.rename(columns={"entity": "entity_name"})
+        return out
+
+    def companies(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._con.execute("SELECT company FROM companies ORDER BY company")]
+
+    def entities(self, company: str) -> List[str]:
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT DISTINCT entity FROM ledger WHERE company=? ORDER BY entity", (company,))
+            return [r[0] for r in rows]
+
+    def date_range(self, company: str, entity: Optional[str] = None) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        where, args = self._where(company, entity, None, None)
+        with self._lock:
+            lo, hi = self._con.execute(
+                f"SELECT min(date), max(date) FROM ledger WHERE {where} AND date != ''", args).fetchone()
+        return (pd.Timestamp(lo) if lo else None, pd.Timestamp(hi) if hi else None)
+
+
+_STORE: Optional[LedgerStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> LedgerStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = LedgerStore(DEFAULT_ENGINE_CONFIG.store.path)
+        return _STORE
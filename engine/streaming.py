@@ -0,0 +1,172 @@
+# engine/streaming.py
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import DEFAULT_RESOLVER
+from engine.compute_core import compute_core
+from engine.money import money_diff
+from engine.schema import KPISummary
+from engine.taxes import vat_parts, zakat_parts, zakat_from_parts
+
+
+class StreamSummary:
+    """
+    يجمع مؤشرات KPISummary عبر دفعات متتالية (مثل iter_csv_chunks)
+    دون الاحتفاظ بالصفوف — كل المجاميع قابلة للجمع عبر الدفعات.
+    """
+
+    def __init__(self, zakat_rate: Optional[float] = None):
+        self.zakat_rate = zakat_rate
+        self.rows = 0
+        self.revenue = 0.0
+        self.expenses = 0.0
+        self.profit = 0.0
+        self.cash_flow = 0.0
+        self.margin_sum = 0.0
+        self.vat_out = 0.0
+        self.vat_in = 0.0
+        self.zakat_base = 0.0
+        self.zakat_assets = 0.0
+        self.zakat_liabilities = 0.0
+
+    def update(self, core: pd.DataFrame) -> None:
+        """core: ناتج compute_core لدفعة واحدة."""
+        self.rows += len(core)
+        self.revenue += float(core["revenue"].fillna(0).sum())
+        self.expenses += float(core["expenses"].fillna(0).sum())
+        self.profit += float(core["profit"].fillna(0).sum())
+        self.cash_flow += float(core["cash_flow"].fillna(0).sum())
+        margin = core["profit_margin"].replace([np.inf, -np.inf], 0).fillna(0)
+        self.margin_sum += float(margin.sum())
+
+        v_out, v_in = vat_parts(core)
+        self.vat_out += v_out
+        self.vat_in += v_in
+
+        base, assets, liab = zakat_parts(core)
+        self.zakat_base += base
+        self.zakat_assets += assets
+        self.zakat_liabilities += liab
+
+    def result(self) -> KPISummary:
+        return KPISummary(
+            total_revenue=self.revenue,
+            total_expenses=self.expenses,
+            total_profit=self.profit,
+            avg_profit_margin=(self.margin_sum / self.rows) if self.rows else 0.0,
+            total_cash_flow=self.cash_flow,
+            net_vat=money_diff(self.vat_out, self.vat_in),
+            zakat_due=zakat_from_parts(self.zakat_base, self.zakat_assets,
+                                       self.zakat_liabilities, rate=self.zakat_rate),
+        )
+
+
+def summarize_chunks(chunks: Iterable[pd.DataFrame], zakat_rate: Optional[float] = None) -> KPISummary:
+    """يمرر كل دفعة على compute_core ثم يجمع المؤشرات تدريجيًا."""
+    acc = StreamSummary(zakat_rate=zakat_rate)
+    for chunk in chunks:
+        acc.update(compute_core(chunk))
+    return acc.result()
+
+
+# ----------------------------- Transactions -> monthly ---------------------------------
+
+MONTHLY_METRICS: Tuple[str, ...] = ("revenue", "expenses", "vat_collected", "vat_paid")
+
+
+@dataclass
+class StreamStats:
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+class MonthlyAggregator:
+    """
+    يحوّل قيود اليومية (صف لكل حركة) إلى الإطار الشهري الذي يتوقعه المحرك:
+    صف لكل (منشأة، شهر) بأعمدة MONTHLY_METRICS الموجودة في القيود فقط — المقياس
+    الغائب لا يُملأ بصفر حتى يبقى بديل compute_vat (الإيراد × النسبة) فعّالًا.
+
+    مجاميع كل دفعة (hash groupby) تُجمع في قائمة وتُدمج بـ concat + groupby واحد
+    عند result (أو كل _FOLD_EVERY دفعة لإبقاء الذاكرة بحجم عدد المجموعات)،
+    والصفوف الخام لا تُحفظ أبدًا.
+    """
+
+    _FOLD_EVERY = 64
+
+    def __init__(self, entity_col: str = "entity_name", default_entity: str = "All"):
+        self.entity_col = entity_col
+        self.default_entity = default_entity
+        self.stats = StreamStats()
+        self._parts: List[pd.DataFrame] = []
+        self._metrics: List[str] = []
+
+    def feed(self, chunk: pd.DataFrame) -> None:
+        # نفس الأسماء البديلة التي يقبلها compute_core (sales, output_vat, تاريخ، المنشأة...)
+        cols = DEFAULT_RESOLVER.resolve(chunk)
+        date_col = cols.get("date")
+        if date_col is None:
+            raise ValueError("Transaction chunk has no date column")
+        t0 = time.perf_counter()
+
+        month = pd.to_datetime(chunk[date_col], errors="coerce").dt.to_period("M")
+        ent_col = self.entity_col if self.entity_col in chunk.columns else cols.get("entity")
+        if ent_col is not None:
+            entity = chunk[ent_col].astype("string").fillna(self.default_entity)
+        else:
+            entity = pd.Series(self.default_entity, index=chunk.index, dtype="string")
+
+        present = [m for m in MONTHLY_METRICS if m in cols]
+        self._metrics += [m for m in present if m not in self._metrics]
+        vals = pd.DataFrame({m: pd.to_numeric(chunk[cols[m]], errors="coerce").fillna(0.0)
+                             for m in present}, index=chunk.index)
+        vals["entity_name"] = entity
+        vals["month"] = month
+        vals = vals[month.notna()]
+
+        self._parts.append(vals.groupby(["entity_name", "month"], sort=False)[present].sum())
+        if len(self._parts) >= self._FOLD_EVERY:
+            self._parts = [self._fold()]
+
+        self.stats.rows += len(chunk)
+        self.stats.chunks += 1
+        self.stats.seconds += time.perf_counter() - t0
+
+    def _fold(self) -> pd.DataFrame:
+        # المقياس الغائب عن بعض الدفعات = NaN في concat -> يُجمع كصفر مع الموجود
+        merged = pd.concat(self._parts)
+        return merged.groupby(level=[0, 1], sort=False)[self._metrics].sum()
+
+    def result(self) -> pd.DataFrame:
+        cols = ["entity_name", "date", *(m for m in MONTHLY_METRICS if m in self._metrics)]
+        acc = self._fold() if self._parts else None
+        if acc is None or acc.empty:
+            return pd.DataFrame(columns=cols)
+        out = acc.sort_index().reset_index()
+        out["date"] = pd.PeriodIndex(out.pop("month")).to_timestamp(how="end").normalize()
+        return out[cols]
+
+
+def aggregate_transactions(chunks: Iterable[pd.DataFrame],
+                           entity_col: str = "entity_name") -> Tuple[pd.DataFrame, StreamStats]:
+    """
+    يمرر دفعات القيود (مثل iter_csv_chunks) على MonthlyAggregator ويرجع
+    (الإطار الشهري الجاهز لـ compute_core, إحصاءات الإنتاجية rows/sec).
+    """
+    agg = MonthlyAggregator(entity_col=entity_col)
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        agg.feed(chunk)
+    # الزمن الكلي يشمل القراءة/التحويل في المصدر وليس التجميع فقط
+    agg.stats.seconds = time.perf_counter() - t0
+    return agg.result(), agg.stats
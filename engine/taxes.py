@@ -1,98 +1,82 @@
 # engine/taxes.py
 from __future__ import annotations
 import pandas as pd
-from typing import Iterable, Optional, Dict
+from typing import Iterable, Optional, Tuple
 from engine.config import DEFAULT_ENGINE_CONFIG
+from engine.columns import ColumnBinding, resolve_columns
+from engine.money import halala_mode, money_diff, money_rate, money_total
 
 CFG = DEFAULT_ENGINE_CONFIG
 
-def _first_existing(df: pd.DataFrame, names: Iterable[str]) -> Optional[str]:
-    """يرجع أول عمود مطابق (case-insensitive) من قائمة أسماء محتملة."""
-    lower_map = {c.lower(): c for c in df.columns}
-    for n in names:
-        if n.lower() in lower_map:
-            return lower_map[n.lower()]
-    return None
-
-def _sum_cols(df: pd.DataFrame, groups: Dict[str, Iterable[str]]) -> float:
+def _col_total(df: pd.DataFrame, col: str) -> float:
+    s = pd.to_numeric(df[col], errors="coerce")
+    if halala_mode():
+        return money_total(s)
+    return float(s.fillna(0.0).sum())
 
+def _sum_cols(df: pd.DataFrame, cols: Iterable[str]) -> float:
     total = 0.0
-    for _, candidates in groups.items():
-        col = _first_existing(df, candidates)
-        if col is not None:
-            total += pd.to_numeric(df[col], errors="coerce").fillna(0.0).sum()
+    for col in cols:
+        total += _col_total(df, col)
     return float(total)
 
 
+def _vat_rate() -> float:
+    return getattr(getattr(CFG, "taxes", object()), "vat_rate", 0.15) or 0.15
+
+def _zakat_rate(rate: Optional[float] = None) -> float:
+    return float(rate if rate is not None else getattr(getattr(CFG, "taxes", object()), "zakat_rate", 0.025) or 0.025)
+
+
 # VAT
-def compute_vat(df: pd.DataFrame) -> float:
- 
-    
-    out_col = _first_existing(df, ["vat_collected","vat_output","vat_out","ضريبة المخرجات"])
-    in_col  = _first_existing(df, ["vat_paid","vat_input","vat_in","ضريبة المدخلات"])
+def vat_parts(df: pd.DataFrame, binding: Optional[ColumnBinding] = None) -> Tuple[float, float]:
+    """
+    (ضريبة المخرجات, ضريبة المدخلات) للإطار — قابلة للجمع عبر الدفعات.
+    """
+    cols = resolve_columns(df, binding)
+    out_col = cols.get("vat_collected")
+    in_col  = cols.get("vat_paid")
     if out_col and in_col:
-        out_sum = pd.to_numeric(df[out_col], errors="coerce").fillna(0.0).sum()
-        in_sum  = pd.to_numeric(df[in_col],  errors="coerce").fillna(0.0).sum()
-        return float(out_sum - in_sum)
+        return _col_total(df, out_col), _col_total(df, in_col)
 
     # fallback
-    rev_col = _first_existing(df, ["revenue","sales","الإيرادات","المبيعات"])
-    exp_col = _first_existing(df, ["expenses","expense","المصروفات","تكاليف"])
-    vat_rate = getattr(getattr(CFG, "taxes", object()), "vat_rate", 0.15) or 0.15
-    vat_out = (pd.to_numeric(df[rev_col], errors="coerce").fillna(0.0).sum() * vat_rate) if rev_col else 0.0
-    vat_in  = (pd.to_numeric(df[exp_col], errors="coerce").fillna(0.0).sum() * vat_rate) if exp_col else 0.0
-    return float(vat_out - vat_in)
+    rev_col = cols.get("revenue")
+    exp_col = cols.get("expenses")
+    vat_rate = _vat_rate()
+    vat_out = money_rate(_col_total(df, rev_col), vat_rate) if rev_col else 0.0
+    vat_in  = money_rate(_col_total(df, exp_col), vat_rate) if exp_col else 0.0
+    return float(vat_out), float(vat_in)
+
+def compute_vat(df: pd.DataFrame, binding: Optional[ColumnBinding] = None) -> float:
+    vat_out, vat_in = vat_parts(df, binding)
+    return money_diff(vat_out, vat_in)
 
 # Zakat
-def compute_zakat(df: pd.DataFrame, rate: Optional[float] = None) -> float:
- 
-    # نسبة الزكاة
-    zakat_rate = float(rate if rate is not None else getattr(getattr(CFG, "taxes", object()), "zakat_rate", 0.025) or 0.025)
+def zakat_parts(df: pd.DataFrame, binding: Optional[ColumnBinding] = None) -> Tuple[float, float, float]:
+    """
+    (مجموع الوعاء الجاهز, الأصول الزكوية, الخصوم المتداولة) — قابلة للجمع عبر الدفعات.
+    """
+    cols = resolve_columns(df, binding)
+    base_col = cols.get("zakat_base")
+    base_val = _col_total(df, base_col) if base_col else 0.0
+    return (
+        float(base_val),
+        _sum_cols(df, cols.zakat_assets),
+        _sum_cols(df, cols.zakat_liabilities),
+    )
+
+def zakat_from_parts(base_val: float, zakatable_assets: float, current_liabilities: float,
+                     rate: Optional[float] = None) -> float:
+    zakat_rate = _zakat_rate(rate)
 
     # 1) استخدام وعاء جاهز إذا موجود وله قيمة
-    base_col = _first_existing(df, ["zakat_base", "وعاء الزكاة"])
-    if base_col:
-        base_val = pd.to_numeric(df[base_col], errors="coerce").fillna(0.0).sum()
-        if base_val > 0:
-            return float(base_val * zakat_rate)
+    if base_val > 0:
+        return money_rate(base_val, zakat_rate)
 
     # 2) احتساب وعاء تقديري تلقائي
-    zakatable_assets_map = {
-        "cash": [
-            "cash","bank","cash_and_equivalents","cash_equivalents",
-            "النقد","النقدية","نقد","سيولة","البنوك","حسابات بنكية"
-        ],
-        "ar": [
-            "accounts_receivable","trade_receivables","receivables",
-            "العملاء","الذمم المدينة","مدينون"
-        ],
-        "inventory": [
-            "inventory","stock","المخزون"
-        ],
-        "prepaid_oca": [
-            "prepaid_expenses","other_current_assets",
-            "مصروفات مدفوعة مقدماً","أصول متداولة أخرى","اصول متداولة اخرى"
-        ],
-    }
-    current_liab_map = {
-        "ap": [
-            "accounts_payable","trade_payables","payables",
-            "الدائنون","الذمم الدائنة","موردون"
-        ],
-        "st_loans": [
-            "short_term_loans","short_term_borrowings",
-            "قروض قصيرة الأجل","تسهيلات قصيرة الأجل"
-        ],
-        "accruals": [
-            "accrued_expenses","accruals","مصروفات مستحقة"
-        ],
-        "other_cl": [
-            "other_current_liabilities","خصوم متداولة أخرى","التزامات متداولة اخرى"
-        ],
-    }
-
-    zakatable_assets = _sum_cols(df, zakatable_assets_map)
-    current_liabilities = _sum_cols(df, current_liab_map)
-
     zakat_base = max(zakatable_assets - current_liabilities, 0.0)
-    return float(zakat_base * zakat_rate)
+    return money_rate(zakat_base, zakat_rate)
+
+def compute_zakat(df: pd.DataFrame, rate: Optional[float] = None,
+                  binding: Optional[ColumnBinding] = None) -> float:
+    return zakat_from_parts(*zakat_parts(df, binding), rate=rate)
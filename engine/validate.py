@@ -1,19 +1,162 @@
-from typing import List
+from __future__ import annotations
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Sequence
+
+import numpy as np
 import pandas as pd
-from engine.config import DEFAULT_ENGINE_CONFIG
+from engine.columns import ColumnBinding, resolve_columns
 
 def validate_columns(df: pd.DataFrame) -> List[str]:
-    colmap = DEFAULT_ENGINE_CONFIG.colmap
-    aliases = {
-        "revenue": colmap.revenue,
-        "expenses": colmap.expenses,
-    }
+    cols = resolve_columns(df)
     found, missing = [], []
-    for key, alist in aliases.items():
-        if any(a in df.columns for a in alist) or key in df.columns:
+    for key in ("revenue", "expenses"):
+        if key in cols:
             found.append(key)
         else:
             missing.append(key)
     if missing:
         raise ValueError(f"Missing required columns: {missing}")
     return found
+
+
+# ----------------------------- Row-level rules ---------------------------------
+
+# بت لكل قاعدة — قناع الصف = OR للقواعد التي فشل فيها
+NON_NUMERIC      = 1 << 0   # مبلغ نصي لا يتحول لرقم (كان سيصبح NaN بصمت)
+NEGATIVE_REVENUE = 1 << 1
+BAD_DATE         = 1 << 2   # تاريخ موجود لكن غير قابل للقراءة
+MISSING_DATE     = 1 << 3
+DUPLICATE_MONTH  = 1 << 4   # نفس المنشأة ونفس الشهر مكرر (التنبؤ يأخذ آخر صف فقط)
+DUPLICATE_ROW    = 1 << 5   # صف مطابق تمامًا لصف سابق
+
+RULES = {
+    "non_numeric": NON_NUMERIC,
+    "negative_revenue": NEGATIVE_REVENUE,
+    "bad_date": BAD_DATE,
+    "missing_date": MISSING_DATE,
+    "duplicate_month": DUPLICATE_MONTH,
+    "duplicate_row": DUPLICATE_ROW,
+}
+
+RULE_LABELS = {
+    "non_numeric": "قيم غير رقمية في أعمدة المبالغ",
+    "negative_revenue": "إيرادات سالبة",
+    "bad_date": "تواريخ غير صالحة",
+    "missing_date": "تواريخ مفقودة",
+    "duplicate_month": "أشهر مكررة لنفس المنشأة",
+    "duplicate_row": "صفوف مكررة",
+}
+
+# أعمدة المبالغ التي يحوّلها المحرك بـ to_numeric(errors="coerce")
+_AMOUNT_FIELDS = ("revenue", "expenses", "vat_collected", "vat_paid", "zakat_base",
+                  "opening_cash", "closing_cash")
+
+
+@dataclass(frozen=True)
+class ValidationReport:
+    """قناع uint8 لكل صف + عدد الصفوف المخالفة لكل قاعدة."""
+    rows: int
+    mask: np.ndarray
+    counts: Mapping[str, int]
+
+    @property
+    def ok(self) -> bool:
+        return not any(self.counts.values())
+
+    @property
+    def bad_rows(self) -> int:
+        return int(np.count_nonzero(self.mask))
+
+    def rows_with(self, rule: str) -> np.ndarray:
+        """مواقع الصفوف (iloc) المخالفة لقاعدة."""
+        return np.flatnonzero(self.mask & RULES[rule])
+
+    def summary(self) -> str:
+        parts = [f"{RULE_LABELS[r]}: {n:,}" for r, n in self.counts.items() if n]
+        return "، ".join(parts) if parts else "لا توجد مشاكل في جودة البيانات."
+
+
+def _non_numeric(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+        return np.zeros(len(s), dtype=bool)
+    cand = (pd.to_numeric(s, errors="coerce").isna() & s.notna()).to_numpy(copy=True)
+    if cand.any():
+        # النص الفارغ يعامل كقيمة مفقودة لا كخطأ
+        idx = np.flatnonzero(cand)
+        cand[idx] = s.iloc[idx].astype("string").str.strip().ne("").fillna(False).to_numpy(dtype=bool)
+    return cand
+
+
+def validate_frame(df: pd.DataFrame, mode: str = "report",
+                   rules: Optional[Sequence[str]] = None,
+                   binding: Optional[ColumnBinding] = None) -> ValidationReport:
+    """
+    فحص جودة البيانات على الصفوف بتمريرة متجهة واحدة لكل عمود (بدون حلقات على الصفوف).
+    mode="report": يرجع التقرير دائمًا. mode="fail_fast": ValueError عند أول قاعدة مخالفة
+    (القواعد التالية لا تُحسب).
+    """
+    if mode not in ("report", "fail_fast"):
+        raise ValueError(f"Unknown validation mode: {mode!r}")
+    active = tuple(rules) if rules is not None else tuple(RULES)
+    unknown = [r for r in active if r not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown validation rules: {unknown}")
+
+    cols = resolve_columns(df, binding)
+    n = len(df)
+    mask = np.zeros(n, dtype=np.uint8)
+    counts = {}
+
+    def record(rule: str, hit: np.ndarray) -> None:
+        c = int(np.count_nonzero(hit))
+        counts[rule] = c
+        mask[hit] |= RULES[rule]
+        if c and mode == "fail_fast":
+            raise ValueError(f"Data validation failed: {RULE_LABELS[rule]} ({c:,} rows, "
+                             f"first at row {int(np.flatnonzero(hit)[0])})")
+
+    date_col = cols.get("date")
+    dates = None
+    if date_col is not None and ({"bad_date", "missing_date", "duplicate_month"} & set(active)):
+        raw = df[date_col]
+        dates = pd.to_datetime(raw, errors="coerce")
+        nat = dates.isna().to_numpy()
+        empty = raw.isna().to_numpy(copy=True)
+        if nat.any() and not pd.api.types.is_datetime64_any_dtype(raw.dtype):
+            idx = np.flatnonzero(nat & ~empty)
+            empty[idx] = raw.iloc[idx].astype("string").str.strip().eq("").fillna(True).to_numpy(dtype=bool)
+
+    for rule in active:
+        if rule == "non_numeric":
+            hit = np.zeros(n, dtype=bool)
+            for f in _AMOUNT_FIELDS:
+                c = cols.get(f)
+                if c is not None:
+                    hit |= _non_numeric(df[c])
+            record(rule, hit)
+        elif rule == "negative_revenue":
+            c = cols.get("revenue")
+            hit = (pd.to_numeric(df[c], errors="coerce") < 0).to_numpy() if c is not None \
+                else np.zeros(n, dtype=bool)
+            record(rule, hit)
+        elif rule == "bad_date":
+            record(rule, (nat & ~empty) if dates is not None else np.zeros(n, dtype=bool))
+        elif rule == "missing_date":
+            record(rule, empty if dates is not None else np.zeros(n, dtype=bool))
+        elif rule == "duplicate_month":
+            hit = np.zeros(n, dtype=bool)
+            if dates is not None:
+                valid = ~nat
+                ords = dates.to_numpy()[valid].astype("datetime64[M]").astype(np.int64)
+                ent_col = cols.get("entity")
+                ent = pd.factorize(df[ent_col])[0][valid] if ent_col is not None \
+                    else np.zeros(int(valid.sum()), dtype=np.int64)
+                key = ent.astype(np.int64) * 1_000_000 + (ords - ords.min() if ords.size else ords)
+                hit[np.flatnonzero(valid)] = pd.Series(key).duplicated().to_numpy()
+            record(rule, hit)
+        elif rule == "duplicate_row":
+            record(rule, pd.util.hash_pandas_object(df, index=False).duplicated().to_numpy())
+
+    return ValidationReport(rows=n, mask=mask, counts=MappingProxyType(counts))
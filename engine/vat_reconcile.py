@@ -0,0 +1,201 @@
+# engine/vat_reconcile.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import resolve_aliases, to_float_array
+from engine.config import DEFAULT_ENGINE_CONFIG, INVOICE_KINDS, INVOICE_LINE_COLUMNS
+from engine.kpi import entity_keys
+from engine.money import apply_rate, apply_rates, from_halalas, to_halalas
+from engine.taxes import _vat_rate
+from engine.vat_returns import _frequency, period_calendar, period_ordinals
+
+# إطار كامل أو دفعات متتالية (مثل pd.read_csv(..., chunksize=...))
+Lines = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+# أقصى عدد سطور مخالفة تُحفظ في النتيجة (العدد الكلي يبقى في mismatched_lines)
+MAX_MISMATCHES = 10_000
+
+RECONCILE_COLUMNS = (
+    "entity_name", "period", "period_start", "period_end", "due_date", "deadline_id",
+    "lines", "mismatched_lines",
+    "output_stated", "output_expected", "input_stated", "input_expected",
+    "net_vat_stated", "net_vat_expected", "difference",
+)
+
+_SUMS = ("lines", "mismatched_lines", "stated", "expected")
+
+
+@dataclass(frozen=True)
+class VATReconciliation:
+    """
+    periods: صف لكل (منشأة × فترة إقرار) بالضريبة المذكورة مقابل المحسوبة.
+    mismatches: السطور التي تتجاوز فروقها الحد المسموح (أول MAX_MISMATCHES).
+    unassigned_lines: سطور بلا تاريخ صالح أو بنوع فاتورة غير معروف (لا تدخل الفترات).
+    """
+    periods: pd.DataFrame
+    mismatches: pd.DataFrame
+    lines: int
+    mismatched_lines: int
+    unassigned_lines: int
+
+
+def resolve_line_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """الحقل الموحّد (date, kind, amount, vat, ...) -> اسم العمود في الإطار، حسب INVOICE_LINE_COLUMNS."""
+    return resolve_aliases(df, INVOICE_LINE_COLUMNS)
+
+
+def _directions(df: pd.DataFrame, col: Optional[Any], direction: Optional[str]) -> np.ndarray:
+    """output/input لكل سطر — factorize ثم تصنيف القيم المميزة فقط (غير المعروف -> "")."""
+    if direction is not None:
+        if direction not in ("output", "input"):
+            raise ValueError("direction must be 'output' or 'input'")
+        return np.full(len(df), direction, dtype=object)
+    if col is None:
+        raise ValueError("Invoice lines need a type column (sales/purchase) or an explicit direction")
+    codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+    kinds = np.array([INVOICE_KINDS.get(str(u).strip().lower(), "") for u in uniques] + [""], dtype=object)
+    return kinds[codes]  # -1 (فارغ) -> آخر عنصر ""
+
+
+def _expected_vat(amount_h: np.ndarray, rates: Optional[np.ndarray], default_rate: float) -> np.ndarray:
+    """ضريبة كل سطر بالهللة: المبلغ × النسبة بتقريب لكل سطر. نسبة السطر (0.15 أو 15) إن وُجدت."""
+    if rates is None:
+        return apply_rate(amount_h, default_rate)
+    r = np.where(np.isnan(rates), default_rate, rates)
+    return apply_rates(amount_h, np.where(r > 1.0, r / 100.0, r))
+
+
+def _check(df: pd.DataFrame, rate: Optional[float], tolerance: Optional[float],
+           direction: Optional[str], frequency: str) -> Dict[str, np.ndarray]:
+    """مصفوفات السطور: الاتجاه، ترتيب الفترة، الضريبة المذكورة والمحسوبة بالهللة، والمخالفة."""
+    frequency = _frequency(frequency, None)
+    cols = resolve_line_columns(df)
+    missing = [c for c in ("amount", "vat") if c not in cols]
+    if missing:
+        raise ValueError(f"Invoice lines are missing required columns: {missing}")
+    tol = DEFAULT_ENGINE_CONFIG.taxes.vat_line_tolerance if tolerance is None else tolerance
+
+    amount_h = to_halalas(to_float_array(df[cols["amount"]]))
+    stated_h = to_halalas(to_float_array(df[cols["vat"]]))
+    rates = to_float_array(df[cols["rate"]]) if "rate" in cols else None
+    expected_h = _expected_vat(amount_h, rates, _vat_rate() if rate is None else rate)
+    diff_h = stated_h - expected_h
+    return {
+        "entity_name": entity_keys(df, cols.get("entity")),
+        "direction": _directions(df, cols.get("kind"), direction),
+        "period_ord": (period_ordinals(df[cols["date"]], frequency) if "date" in cols
+                       else np.full(len(df), -1, dtype=np.int64)),
+        "stated": stated_h,
+        "expected": expected_h,
+        "difference": diff_h,
+        "mismatch": np.abs(diff_h) > int(to_halalas(tol)),
+    }
+
+
+def reconcile_lines(df: pd.DataFrame, rate: Optional[float] = None,
+                    tolerance: Optional[float] = None, direction: Optional[str] = None,
+                    frequency: str = "quarterly") -> pd.DataFrame:
+    """السطور مع direction و expected_vat (بالهللة وتقريب لكل سطر) و vat_difference و mismatch."""
+    c = _check(df, rate, tolerance, direction, frequency)
+    return df.assign(
+        direction=c["direction"],
+        expected_vat=from_halalas(c["expected"]),
+        vat_difference=from_halalas(c["difference"]),
+        mismatch=c["mismatch"],
+    )
+
+
+def _period_sums(c: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """مجاميع int64 بالهللة لكل (منشأة, فترة, اتجاه) — صغيرة، تُجمع عبر الدفعات."""
+    assigned = (c["period_ord"] >= 0) & (c["direction"] != "")
+    parts = pd.DataFrame({
+        "entity_name": c["entity_name"][assigned],
+        "period_ord": c["period_ord"][assigned],
+        "direction": c["direction"][assigned],
+        "lines": np.ones(int(assigned.sum()), dtype=np.int64),
+        "mismatched_lines": c["mismatch"][assigned].astype(np.int64),
+        "stated": c["stated"][assigned],
+        "expected": c["expected"][assigned],
+    })
+    return parts.groupby(["entity_name", "period_ord", "direction"], sort=False)[list(_SUMS)].sum()
+
+
+def _period_table(sums: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    if sums.empty:
+        return pd.DataFrame(columns=list(RECONCILE_COLUMNS))
+    wide = sums.unstack("direction", fill_value=0)
+    wide.columns = [f"{d}_{m}" for m, d in wide.columns]
+    for c in ("output_stated", "output_expected", "input_stated", "input_expected",
+              "output_lines", "input_lines", "output_mismatched_lines", "input_mismatched_lines"):
+        if c not in wide.columns:
+            wide[c] = 0
+    wide = wide.sort_index().reset_index()
+
+    ords = wide["period_ord"].to_numpy(dtype=np.int64)
+    start = int(ords.min())
+    cal = period_calendar(start, int(ords.max()) - start + 1, frequency).iloc[ords - start]
+
+    h = {c: wide[c].to_numpy(dtype=np.int64) for c in
+         ("output_stated", "output_expected", "input_stated", "input_expected")}
+    net_stated = h["output_stated"] - h["input_stated"]
+    net_expected = h["output_expected"] - h["input_expected"]
+    out = pd.DataFrame({
+        "entity_name": wide["entity_name"].to_numpy(dtype=object),
+        **{c: cal[c].to_numpy() for c in cal.columns},
+        "lines": (wide["output_lines"] + wide["input_lines"]).to_numpy(dtype=np.int64),
+        "mismatched_lines": (wide["output_mismatched_lines"]
+                             + wide["input_mismatched_lines"]).to_numpy(dtype=np.int64),
+        **{c: from_halalas(v) for c, v in h.items()},
+        "net_vat_stated": from_halalas(net_stated),
+        "net_vat_expected": from_halalas(net_expected),
+        "difference": from_halalas(net_stated - net_expected),
+    })
+    return out[list(RECONCILE_COLUMNS)]
+
+
+def reconcile_invoices(data: Lines, rate: Optional[float] = None,
+                       tolerance: Optional[float] = None, direction: Optional[str] = None,
+                       frequency: str = "quarterly",
+                       max_mismatches: int = MAX_MISMATCHES) -> VATReconciliation:
+    """
+    مطابقة ضريبة سطور المبيعات والمشتريات لكل (منشأة × فترة إقرار)، من إطار أو دفعات.
+    المجاميع بالهللة int64 فلا تتغير بتقسيم الدفعات؛ الفترات ومواعيدها من period_calendar.
+    """
+    frequency = _frequency(frequency, None)
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    sums: List[pd.DataFrame] = []
+    bad: List[pd.DataFrame] = []
+    kept = total = mismatched = assigned = 0
+    for chunk in frames:
+        if chunk.empty:
+            continue
+        c = _check(chunk, rate, tolerance, direction, frequency)
+        part = _period_sums(c)
+        sums.append(part)
+        total += len(chunk)
+        assigned += int(part["lines"].sum())
+        flags = c["mismatch"]
+        mismatched += int(flags.sum())
+        if kept < max_mismatches and flags.any():
+            idx = np.flatnonzero(flags)[: max_mismatches - kept]
+            bad.append(chunk.iloc[idx].assign(
+                expected_vat=from_halalas(c["expected"][idx]),
+                vat_difference=from_halalas(c["difference"][idx]),
+            ))
+            kept += len(idx)
+
+    merged = (pd.concat(sums).groupby(level=[0, 1, 2], sort=False).sum() if sums
+              else pd.DataFrame(columns=list(_SUMS)))
+    mismatches = pd.concat(bad, ignore_index=True) if bad else pd.DataFrame()
+    return VATReconciliation(
+        periods=_period_table(merged, frequency),
+        mismatches=mismatches,
+        lines=total,
+        mismatched_lines=mismatched,
+        unassigned_lines=total - assigned,
+    )
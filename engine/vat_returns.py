@@ -0,0 +1,174 @@
+# engine/vat_returns.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import ColumnBinding, resolve_columns
+from engine.kpi import entity_keys, kpi_arrays
+from engine.money import apply_rate, from_halalas, halala_mode, to_halalas
+from engine.reminder_core import CompanyProfile
+
+# تكرار الإقرار -> (معرّف الموعد في saudi_deadlines_ar.json, عدد الأشهر في الفترة, تردد pandas)
+VAT_FREQUENCIES = {
+    "monthly": ("vat_monthly", 1, "M"),
+    "quarterly": ("vat_quarterly", 3, "Q"),
+}
+
+VAT_RETURN_COLUMNS = (
+    "entity_name", "period", "period_start", "period_end", "due_date", "deadline_id",
+    "rows", "vat_output", "vat_input", "net_vat",
+)
+
+
+def _frequency(frequency: Optional[str], profile: Optional[CompanyProfile]) -> str:
+    freq = frequency or (profile or CompanyProfile()).vat_frequency
+    if freq not in VAT_FREQUENCIES:
+        raise ValueError(f"Unknown VAT frequency: {freq!r} (expected one of {tuple(VAT_FREQUENCIES)})")
+    return freq
+
+
+def period_ordinals(dates: pd.Series, frequency: str) -> np.ndarray:
+    """ترتيب فترة الإقرار لكل تاريخ: (سنة*12 + شهر-1) // عدد أشهر الفترة — الأرباع تقويمية. NaT -> -1."""
+    width = VAT_FREQUENCIES[frequency][1]
+    d = pd.to_datetime(dates, errors="coerce")
+    ords = (d.dt.year * 12 + d.dt.month - 1).to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(ords), -1, ords // width).astype(np.int64)
+
+
+def month_periods(ords: np.ndarray) -> pd.PeriodIndex:
+    """ترتيب الشهر (سنة*12 + شهر-1، كما في month_ordinals) -> فترات شهرية."""
+    return pd.PeriodIndex.from_ordinals(np.asarray(ords, dtype=np.int64) - 1970 * 12, freq="M")
+
+
+def next_month_due(periods: pd.PeriodIndex, day: Optional[int] = None) -> pd.DatetimeIndex:
+    """موعد في الشهر التالي لنهاية كل فترة: اليوم day، أو آخر يوم فيه عند None."""
+    following = periods.asfreq("M", how="end") + 1
+    if day is None:
+        return following.end_time.normalize()
+    return following.start_time + pd.Timedelta(days=day - 1)
+
+
+def period_calendar(start: int, t: int, frequency: str) -> pd.DataFrame:
+    """t فترات متتالية من الترتيب start: period, period_start, period_end, due_date, deadline_id."""
+    deadline_id, width, pd_freq = VAT_FREQUENCIES[frequency]
+    periods = pd.period_range(month_periods([start * width])[0].asfreq(pd_freq), periods=t)
+    return pd.DataFrame({
+        "period": periods.astype(str).to_numpy(dtype=object),
+        "period_start": periods.start_time,
+        "period_end": periods.end_time.normalize(),
+        "due_date": next_month_due(periods),
+        "deadline_id": deadline_id,
+    })
+
+
+@dataclass(frozen=True)
+class EntityPeriodSums:
+    """جدول (منشأة × فترة) كامل: e*t صف بترتيب المنشأة ثم الفترة، والخلايا بلا صفوف أصفار."""
+    entities: np.ndarray
+    start: int
+    t: int
+    sums: pd.DataFrame
+
+    def entity_column(self) -> np.ndarray:
+        return np.repeat(self.entities, self.t)
+
+    def per_period(self, values) -> np.ndarray:
+        """قيمة لكل فترة (t قيمة) مكررة لكل منشأة."""
+        return np.tile(np.asarray(values), len(self.entities))
+
+
+def entity_period_sums(entities: np.ndarray, ords: np.ndarray,
+                       sums: Mapping[str, np.ndarray],
+                       closing: Optional[Mapping[str, np.ndarray]] = None,
+                       order: Optional[np.ndarray] = None) -> EntityPeriodSums:
+    """
+    groupby واحد على مفتاح منشأة×فترة (ords صالحة >= 0): sums تُجمع، و rows عدد الصفوف.
+    closing أرصدة تؤخذ من آخر صف في الخلية حسب order (التاريخ)، والتعادل لآخر صف في الملف.
+    """
+    start = int(ords.min())
+    t = int(ords.max()) - start + 1
+    codes, uniques = pd.factorize(entities, sort=True)
+    cells = np.arange(len(uniques) * t)
+    flat = codes * t + (ords - start)
+    parts = pd.DataFrame({"rows": np.ones(len(flat), dtype=np.int64), **sums})
+    table = parts.groupby(flat, sort=False).sum().reindex(cells, fill_value=0)
+    if closing:
+        pos = np.arange(len(flat))
+        by = np.lexsort((pos, pos if order is None else order, flat))
+        last = by[np.r_[flat[by][1:] != flat[by][:-1], True]]
+        stocks = pd.DataFrame({c: np.asarray(v)[last] for c, v in closing.items()}, index=flat[last])
+        table = table.join(stocks.reindex(cells, fill_value=0))
+    return EntityPeriodSums(np.asarray(uniques, dtype=object), start, t, table)
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(VAT_RETURN_COLUMNS))
+
+
+def compute_vat_returns(df: pd.DataFrame, frequency: Optional[str] = None,
+                        profile: Optional[CompanyProfile] = None,
+                        entity_col: Optional[str] = None,
+                        binding: Optional[ColumnBinding] = None) -> pd.DataFrame:
+    """
+    إقرار لكل (منشأة × فترة) شهرية أو ربع سنوية، والفترات بلا صفوف إقرار صفري.
+    نفس منطق الضريبة في compute_kpis (وبالهللة في halala_mode).
+    """
+    freq = _frequency(frequency, profile)
+    cols = resolve_columns(df, binding)
+    date_col = cols.get("date")
+    if df.empty or date_col is None:
+        return _empty()
+
+    ords = period_ordinals(df[date_col], freq)
+    valid = ords >= 0
+    if not valid.any():
+        return _empty()
+
+    a = kpi_arrays(df, cols)
+    exact = halala_mode()
+    money = to_halalas if exact else np.nan_to_num
+    grid = entity_period_sums(
+        entity_keys(df, entity_col or cols.get("entity"))[valid], ords[valid],
+        {"vat_output": money(a.vat_out[valid]), "vat_input": money(a.vat_in[valid])},
+    )
+    g = grid.sums
+
+    scale = a.vat_scale
+    out, inp = g["vat_output"].to_numpy(), g["vat_input"].to_numpy()
+    if exact:
+        if scale != 1.0:
+            out, inp = apply_rate(out, scale), apply_rate(inp, scale)
+        net = from_halalas(out - inp)
+        out, inp = from_halalas(out), from_halalas(inp)
+    else:
+        out, inp = out * scale, inp * scale
+        net = out - inp
+
+    cal = period_calendar(grid.start, grid.t, freq)
+    return pd.DataFrame({
+        "entity_name": grid.entity_column(),
+        **{c: grid.per_period(cal[c].to_numpy()) for c in cal.columns},
+        "rows": g["rows"].to_numpy(dtype=np.int64),
+        "vat_output": out,
+        "vat_input": inp,
+        "net_vat": net,
+    })[list(VAT_RETURN_COLUMNS)]
+
+
+def vat_return_totals(returns: pd.DataFrame) -> pd.DataFrame:
+    """مجموع كل المنشآت لكل فترة إقرار (للتقرير والتقويم) — مرتب بالفترة."""
+    if returns.empty:
+        return returns.drop(columns="entity_name")
+    keys = ["period", "period_start", "period_end", "due_date", "deadline_id"]
+    money = ["vat_output", "vat_input", "net_vat"]
+    if halala_mode():
+        parts = returns[keys].assign(rows=returns["rows"], **{c: to_halalas(returns[c]) for c in money})
+        g = parts.groupby(keys, sort=True).sum().reset_index()
+        for c in money:
+            g[c] = from_halalas(g[c].to_numpy(dtype=np.int64))
+        return g
+    return returns.groupby(keys, sort=True)[["rows", *money]].sum().reset_index()
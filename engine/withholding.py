@@ -0,0 +1,144 @@
+# engine/withholding.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import is_truthy, month_ordinals, norm_name, resolve_aliases, to_float_array
+from engine.config import PAYMENT_COLUMNS, WITHHOLDING_DEFAULT_TYPE, WITHHOLDING_RATES
+from engine.money import apply_rates, from_halalas, to_halalas
+from engine.vat_returns import month_periods, next_month_due
+
+# معرّف الموعد في saudi_deadlines_ar.json — خلال 10 أيام من نهاية الشهر
+WITHHOLDING_DEADLINE_ID = "withholding_tax"
+WITHHOLDING_DUE_DAYS = 10
+
+WITHHOLDING_COLUMNS = (
+    "month", "payment_type", "rate", "amount", "withholding", "net_payment", "due_date",
+)
+WITHHOLDING_TOTAL_COLUMNS = (
+    "month", "due_date", "deadline_id", "payments", "amount", "withholding",
+)
+
+# سبب استبعاد الصف في WithholdingResult.rejected
+INVALID_DATE = "invalid_date"
+INVALID_AMOUNT = "invalid_amount"
+
+
+@dataclass(frozen=True)
+class WithholdingResult:
+    """
+    payments: صف لكل دفعة صالحة (WITHHOLDING_COLUMNS).
+    rejected: الصفوف المستبعدة من الملف كما هي + عمود reason (invalid_date / invalid_amount).
+    """
+    payments: pd.DataFrame
+    rejected: pd.DataFrame
+
+    @property
+    def invalid_dates(self) -> int:
+        return int((self.rejected["reason"] == INVALID_DATE).sum()) if len(self.rejected) else 0
+
+    @property
+    def invalid_amounts(self) -> int:
+        return int((self.rejected["reason"] == INVALID_AMOUNT).sum()) if len(self.rejected) else 0
+
+
+@lru_cache(maxsize=1)
+def _rate_table() -> Tuple[Dict[str, str], Dict[str, float]]:
+    """(الاسم المطبّع -> نوع الدفعة, نوع الدفعة -> النسبة) — يُبنى مرة واحدة من WITHHOLDING_RATES."""
+    types: Dict[str, str] = {}
+    rates: Dict[str, float] = {}
+    for kind, (rate, aliases) in WITHHOLDING_RATES.items():
+        rates[kind] = float(rate)
+        for name in (kind, *aliases):
+            types.setdefault(norm_name(name), kind)
+    return types, rates
+
+
+def classify_payments(types: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(نوع الدفعة الموحّد, النسبة) لكل صف — البحث للقيم المميزة فقط. غير المعروف -> WITHHOLDING_DEFAULT_TYPE."""
+    names, rates = _rate_table()
+    codes, uniques = pd.factorize(types)
+    kinds = [names.get(norm_name(u), WITHHOLDING_DEFAULT_TYPE) for u in uniques] + [WITHHOLDING_DEFAULT_TYPE]
+    kind_arr = np.array(kinds, dtype=object)
+    rate_arr = np.array([rates[k] for k in kinds], dtype=np.float64)
+    return kind_arr[codes], rate_arr[codes]
+
+
+def compute_withholding(payments: pd.DataFrame) -> WithholdingResult:
+    """
+    ضريبة الاستقطاع لكل دفعة: النسبة من نوع الدفعة أو عمود withholding_rate، وصفر للمقيمين.
+    الصفوف بلا تاريخ صالح أو بمبلغ غير رقمي تُرجع في rejected.
+    """
+    cols = resolve_aliases(payments, PAYMENT_COLUMNS)
+    missing = [c for c in ("date", "amount") if c not in cols]
+    if missing:
+        raise ValueError(f"Payments are missing required columns: {missing}")
+
+    ords = month_ordinals(payments[cols["date"]].to_numpy())
+    amount = to_float_array(payments[cols["amount"]])
+    reason = np.where(ords < 0, INVALID_DATE, np.where(np.isnan(amount), INVALID_AMOUNT, ""))
+    rows = np.flatnonzero(reason == "")
+    bad = np.flatnonzero(reason != "")
+    rejected = payments.iloc[bad].assign(reason=reason[bad])
+    ords = ords[rows]
+    df = payments.iloc[rows]
+
+    n = len(df)
+    if "payment_type" in cols:
+        kind, rate = classify_payments(df[cols["payment_type"]])
+    else:
+        kind = np.full(n, WITHHOLDING_DEFAULT_TYPE, dtype=object)
+        rate = np.full(n, _rate_table()[1][WITHHOLDING_DEFAULT_TYPE])
+    if "rate" in cols:
+        own = to_float_array(df[cols["rate"]])
+        own = np.where(own > 1.0, own / 100.0, own)
+        rate = np.where(np.isnan(own), rate, own)
+    if "is_resident" in cols:
+        rate = np.where(is_truthy(df[cols["is_resident"]]), 0.0, rate)
+
+    h = to_halalas(amount[rows])
+    wht = apply_rates(h, rate)
+
+    # تسمية الشهر وتاريخ الاستحقاق للأشهر المميزة فقط
+    uniq, inv = np.unique(ords, return_inverse=True)
+    months = month_periods(uniq)
+    # نهاية الشهر + 10 أيام = يوم 10 من الشهر التالي
+    due = next_month_due(months, day=WITHHOLDING_DUE_DAYS).to_numpy()
+
+    out = pd.DataFrame({
+        "month": months.astype(str).to_numpy(dtype=object)[inv],
+        "payment_type": kind,
+        "rate": rate,
+        "amount": from_halalas(h),
+        "withholding": from_halalas(wht),
+        "net_payment": from_halalas(h - wht),
+        "due_date": due[inv],
+    }, index=df.index)
+    if "payee" in cols:
+        out.insert(0, "payee", df[cols["payee"]].to_numpy())
+    return WithholdingResult(payments=out, rejected=rejected)
+
+
+def withholding_totals(withholding: pd.DataFrame, by_type: bool = False) -> pd.DataFrame:
+    """مجموع الاستقطاع لكل شهر (أو شهر × نوع دفعة عند by_type) — المبالغ تُجمع بالهللة."""
+    keys = ["month", "due_date"] + (["payment_type"] if by_type else [])
+    columns = list(WITHHOLDING_TOTAL_COLUMNS)
+    if by_type:
+        columns.insert(3, "payment_type")
+    if withholding.empty:
+        return pd.DataFrame(columns=columns)
+    parts = withholding[keys].assign(
+        payments=1,
+        amount=to_halalas(withholding["amount"]),
+        withholding=to_halalas(withholding["withholding"]),
+    )
+    g = parts.groupby(keys, sort=True).sum().reset_index()
+    for c in ("amount", "withholding"):
+        g[c] = from_halalas(g[c].to_numpy(dtype=np.int64))
+    g["deadline_id"] = WITHHOLDING_DEADLINE_ID
+    return g[columns]
@@ -0,0 +1,135 @@
+# engine/zakat_returns.py
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from engine.columns import ColumnBinding, resolve_columns
+from engine.kpi import entity_keys, kpi_arrays
+from engine.money import apply_rate, from_halalas, halala_mode, to_halalas
+from engine.reminder_core import CompanyProfile
+from engine.taxes import _zakat_rate
+from engine.vat_returns import entity_period_sums
+
+# معرّف الموعد في saudi_deadlines_ar.json — خلال 120 يومًا من نهاية السنة المالية
+ZAKAT_DEADLINE_ID = "zakat_annual"
+ZAKAT_DUE_DAYS = 120
+
+ZAKAT_RETURN_COLUMNS = (
+    "entity_name", "fiscal_year", "period_start", "period_end", "due_date", "deadline_id",
+    "rows", "base", "assets", "liabilities", "zakat_base", "zakat_due",
+)
+
+
+def _fye_dates(years: np.ndarray, month: int, day: int) -> pd.DatetimeIndex:
+    """نهاية السنة المالية لكل سنة (اليوم يُقص لآخر الشهر: 29/2 -> 28/2 في السنوات البسيطة)."""
+    first = pd.to_datetime(pd.DataFrame({"year": years, "month": month, "day": 1}))
+    days = np.minimum(day, first.dt.days_in_month.to_numpy())
+    return pd.DatetimeIndex(first + pd.to_timedelta(days - 1, unit="D"))
+
+
+def fiscal_years(dates: pd.Series, fiscal_year_end_month: int = 12,
+                 fiscal_year_end_day: int = 31) -> np.ndarray:
+    """
+    السنة المالية لكل تاريخ (تُسمى بسنة نهايتها، كما في RollupCube): التاريخ حتى نهاية
+    السنة المالية لنفس السنة الميلادية يتبعها، وما بعده يتبع السنة التالية. NaT -> -1.
+    """
+    d = pd.to_datetime(dates, errors="coerce")
+    valid = d.notna().to_numpy()
+    out = np.full(len(d), -1, dtype=np.int64)
+    if not valid.any():
+        return out
+    dv = d[valid]
+    years = dv.dt.year.to_numpy(dtype=np.int64)
+    fye = _fye_dates(years, fiscal_year_end_month, fiscal_year_end_day)
+    out[valid] = years + (dv.dt.normalize().to_numpy() > fye.to_numpy())
+    return out
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(ZAKAT_RETURN_COLUMNS))
+
+
+def compute_zakat_returns(df: pd.DataFrame, profile: Optional[CompanyProfile] = None,
+                          rate: Optional[float] = None,
+                          entity_col: Optional[str] = None,
+                          binding: Optional[ColumnBinding] = None) -> pd.DataFrame:
+    """
+    الزكاة لكل (منشأة × سنة مالية): الوعاء والأصول والخصوم أرصدة، فتؤخذ من آخر صف
+    مؤرخ في السنة (رصيد الإقفال) لا مجموع أشهرها. due_date = نهاية السنة + 120 يومًا.
+    """
+    profile = profile or CompanyProfile()
+    fye_m, fye_d = int(profile.fiscal_year_end_month), int(profile.fiscal_year_end_day)
+    if not 1 <= fye_m <= 12 or not 1 <= fye_d <= 31:
+        raise ValueError("fiscal year end must be a valid month (1-12) and day (1-31)")
+    cols = resolve_columns(df, binding)
+    date_col = cols.get("date")
+    if df.empty or date_col is None:
+        return _empty()
+
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    fy = fiscal_years(dates, fye_m, fye_d)
+    valid = fy >= 0
+    if not valid.any():
+        return _empty()
+
+    a = kpi_arrays(df, cols)
+    exact = halala_mode()
+    money = to_halalas if exact else np.nan_to_num
+    grid = entity_period_sums(
+        entity_keys(df, entity_col or cols.get("entity"))[valid], fy[valid], {},
+        closing={
+            "base": money(a.zakat_base[valid]),
+            "assets": money(a.assets_total()[valid]),
+            "liabilities": money(a.liabilities_total()[valid]),
+        },
+        order=dates.to_numpy()[valid],
+    )
+    g, start, t = grid.sums, grid.start, grid.t
+
+    base, assets, liabilities = (g[c].to_numpy() for c in ("base", "assets", "liabilities"))
+    zakat_base = np.where(base > 0, base, np.maximum(assets - liabilities, 0))
+    zrate = _zakat_rate(rate)
+    if exact:
+        zakat_due = from_halalas(apply_rate(zakat_base, zrate))
+        base, assets, liabilities, zakat_base = (
+            from_halalas(x) for x in (base, assets, liabilities, zakat_base)
+        )
+    else:
+        zakat_due = zakat_base * zrate
+
+    years = np.arange(start, start + t)
+    ends = _fye_dates(years, fye_m, fye_d)
+    starts = _fye_dates(years - 1, fye_m, fye_d) + pd.Timedelta(days=1)
+    due = ends + pd.Timedelta(days=ZAKAT_DUE_DAYS)
+    return pd.DataFrame({
+        "entity_name": grid.entity_column(),
+        "fiscal_year": grid.per_period(np.array([f"FY{y}" for y in years], dtype=object)),
+        "period_start": grid.per_period(starts.to_numpy()),
+        "period_end": grid.per_period(ends.to_numpy()),
+        "due_date": grid.per_period(due.to_numpy()),
+        "deadline_id": ZAKAT_DEADLINE_ID,
+        "rows": g["rows"].to_numpy(dtype=np.int64),
+        "base": base,
+        "assets": assets,
+        "liabilities": liabilities,
+        "zakat_base": zakat_base,
+        "zakat_due": zakat_due,
+    })[list(ZAKAT_RETURN_COLUMNS)]
+
+
+def zakat_return_totals(returns: pd.DataFrame) -> pd.DataFrame:
+    """مجموع زكاة كل المنشآت لكل سنة مالية (الوعاء يُحسب لكل منشأة قبل الجمع)."""
+    if returns.empty:
+        return returns.drop(columns="entity_name")
+    keys = ["fiscal_year", "period_start", "period_end", "due_date", "deadline_id"]
+    money = ["zakat_base", "zakat_due"]
+    if halala_mode():
+        parts = returns[keys].assign(rows=returns["rows"], **{c: to_halalas(returns[c]) for c in money})
+        g = parts.groupby(keys, sort=True).sum().reset_index()
+        for c in money:
+            g[c] = from_halalas(g[c].to_numpy(dtype=np.int64))
+        return g
+    return returns.groupby(keys, sort=True)[["rows", *money]].sum().reset_index()
@@ -23,12 +23,6 @@ except Exception:
 # =========================
 # Helpers: DF facts & periods
 # =========================
-def _safe_sum(series) -> float:
-    try:
-        return float(pd.to_numeric(series, errors="coerce").fillna(0).sum())
-    except Exception:
-        return 0.0
-
 def _fmt_sar(x: float) -> str:
     try:
         return f"{float(x):,.0f} ريال"
@@ -44,53 +38,44 @@ def _company_period(df: pd.DataFrame) -> str:
         return ""
     return f"{d.min().date()} → {d.max().date()}"
 
-def _df_facts(df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+def _df_facts(df: Optional[pd.DataFrame], kpis=None, cube=None) -> Dict[str, Any]:
     if df is None or df.empty:
         return {}
+    from engine.kpi import compute_kpis
+    k = kpis or compute_kpis(df)
     facts: Dict[str, Any] = {}
-    c = {c.lower().strip(): c for c in df.columns}
-    rev = df[c.get("revenue")] if "revenue" in c else None
-    exp = df[c.get("expenses")] if "expenses" in c else None
-    pro = df[c.get("profit")] if "profit" in c else None
-    cf  = df[c.get("cash_flow")] if "cash_flow" in c else None
-
-    facts["total_revenue"]  = _safe_sum(rev) if rev is not None else 0.0
-    facts["total_expenses"] = _safe_sum(exp) if exp is not None else 0.0
-    facts["total_profit"]   = _safe_sum(pro) if pro is not None else 0.0
-    facts["total_cashflow"] = _safe_sum(cf)  if cf  is not None else 0.0
+    facts["total_revenue"]  = k.total_revenue
+    facts["total_expenses"] = k.total_expenses
+    facts["total_profit"]   = k.total_profit if "profit" in df.columns else 0.0
+    facts["total_cashflow"] = k.total_cash_flow if "cash_flow" in df.columns else 0.0
     facts["period"] = _company_period(df)
 
-    if "date" in df.columns:
-        d = df[["date"]].copy()
-        d["date"] = pd.to_datetime(d["date"], errors="coerce")
-        d = d[d["date"].notna()]
-        if not d.empty:
-            df2 = df.copy()
-            df2["date"] = pd.to_datetime(df2["date"], errors="coerce")
-            df2 = df2[df2["date"].notna()]
-            for col in ["revenue", "expenses", "profit", "cash_flow"]:
-                if col in df2.columns:
-                    s = pd.to_numeric(df2[col], errors="coerce").fillna(0)
-                    if len(s) >= 2:
-                        last = float(s.iloc[-1])
-                        prev = float(s.iloc[-2])
-                        delta = last - prev
-                        pct = (delta / (prev if prev != 0 else 1)) * 100.0
-                        facts[f"mom_{col}"] = {"last": last, "prev": prev, "delta": delta, "pct": pct}
+    for col, mom in k.mom.items():
+        facts[f"mom_{col}"] = dict(mom)
+
+    # ملخصات الفترات من مكعب التجميع (بدون groupby على التاريخ)
+    if cube is not None:
+        for grain, n in (("quarter", 4), ("fiscal_year", 2)):
+            f = cube.frame(grain, ["revenue", "profit"]).tail(n)
+            facts[f"by_{grain}"] = {
+                r.period: {"revenue": float(r.revenue), "profit": float(r.profit)}
+                for r in f.itertuples(index=False)
+            }
     return facts
 
 
 # =========================
 # Forecast: Holt (من engine)
 # =========================
-def _forecast_snapshot(df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+def _forecast_snapshot(df: Optional[pd.DataFrame], fc: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
     out = {"ok": False}
     if df is None or df.empty:
         return out
     try:
-        from engine.forecasting_core import build_revenue_forecast
         target_col = "profit" if "profit" in df.columns else "revenue"
-        fc = build_revenue_forecast(df, periods=3)
+        if fc is None:
+            from engine.forecasting_core import build_revenue_forecast
+            fc = build_revenue_forecast(df, periods=3)
         if fc is None or fc.empty:
             return out
         last_actual = float(pd.to_numeric(df[target_col], errors="coerce").fillna(0).iloc[-1])
@@ -339,6 +324,9 @@ class RakeemChatEngine:
                 mom = facts.get(f"mom_{key}")
                 if mom:
                     lines.append(f"- التغير الشهري {key}: {mom['delta']:+.0f} ({mom['pct']:+.2f}%)")
+            for grain, label in (("by_quarter", "الربع"), ("by_fiscal_year", "السنة المالية")):
+                for period, v in facts.get(grain, {}).items():
+                    lines.append(f"- {label} {period}: إيرادات {_fmt_sar(v['revenue'])}، ربح {_fmt_sar(v['profit'])}")
         if fc.get("ok"):
             lines.append(f"- تنبؤ {fc['target']}: {_fmt_sar(fc['next_pred'])} ({fc['trend']}, {abs(fc['change_pct']):.2f}%)")
         return "\n".join(lines) if lines else "لا توجد قيم مسموح بها حالياً."
@@ -376,14 +364,20 @@ class RakeemChatEngine:
 
     # ---------- Public ----------
     def answer(self, question: str, df: Optional[pd.DataFrame] = None,
-               company_name: str = "شركة غير محددة") -> Dict[str, Any]:
+               company_name: str = "شركة غير محددة", kpis=None, cube=None,
+               pipeline=None) -> Dict[str, Any]:
         if not question:
             return {"html": "لم أتلقَّ سؤالًا.", "sources": [], "is_first": False}
 
         low = question.strip().lower()
         is_first = len([m for m in self.history if m["role"] == "assistant"]) == 0
-        facts = _df_facts(df) if df is not None else {}
-        fc    = _forecast_snapshot(df) if df is not None else {"ok": False}
+        fc_df = None
+        if pipeline is not None:
+            # المشتقات من الأنبوب: تُحسب مرة لكل ملف لا مرة لكل سؤال
+            df, kpis, cube = pipeline["core"], pipeline["kpis"], pipeline["cube"]
+            fc_df = pipeline.with_params(forecast_periods=3)["forecast"]
+        facts = _df_facts(df, kpis, cube) if df is not None else {}
+        fc    = _forecast_snapshot(df, fc_df) if df is not None else {"ok": False}
 
         if any(w in low for w in ["مصادر", "المراجع", "source", "sources"]):
             _, rag_srcs = _retrieve_context(self.retriever, question)
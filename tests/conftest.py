@@ -0,0 +1,71 @@
+# tests/conftest.py
+"""
+إطارات صغيرة مشتركة للاختبارات. كل منشأة لها صف واحد لكل شهر متتالٍ
+(شرط _to_month_end_index في forecasting_core) حتى تعمل المسارات التي تبني التنبؤ.
+"""
+from __future__ import annotations
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import engine.io as engine_io  # noqa: E402
+
+
+def make_ledger(months: int = 24, entities=("الرياض", "جدة"), vat: bool = True,
+                seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-31", periods=months, freq="ME")
+    parts = []
+    for ent in entities:
+        revenue = np.round(rng.uniform(50_000, 150_000, months), 2)
+        expenses = np.round(rng.uniform(20_000, 90_000, months), 2)
+        frame = {
+            "date": dates,
+            "entity_name": ent,
+            "revenue": revenue,
+            "expenses": expenses,
+            "cash": np.round(rng.uniform(10_000, 40_000, months), 2),
+            "accounts_payable": np.round(rng.uniform(1_000, 9_000, months), 2),
+        }
+        if vat:
+            frame["vat_collected"] = np.round(revenue * 0.15, 2)
+            frame["vat_paid"] = np.round(expenses * 0.15, 2)
+        parts.append(pd.DataFrame(frame))
+    return pd.concat(parts, ignore_index=True)
+
+
+def upload(data: bytes, name: str) -> io.BytesIO:
+    """كائن ملف مثل UploadedFile في Streamlit (getvalue + name)."""
+    buf = io.BytesIO(data)
+    buf.name = name
+    return buf
+
+
+def csv_upload(df: pd.DataFrame, name: str = "ledger.csv") -> io.BytesIO:
+    return upload(df.to_csv(index=False).encode("utf-8"), name)
+
+
+@pytest.fixture
+def ledger() -> pd.DataFrame:
+    return make_ledger()
+
+
+@pytest.fixture
+def ledger_no_vat() -> pd.DataFrame:
+    return make_ledger(vat=False)
+
+
+@pytest.fixture(autouse=True)
+def ledger_cache(tmp_path, monkeypatch) -> engine_io.LedgerCache:
+    """كاش Parquet في مجلد مؤقت لكل اختبار بدل .rakeem_cache في المستودع."""
+    cache = engine_io.LedgerCache(tmp_path / "cache", 64 * 1024 * 1024)
+    monkeypatch.setattr(engine_io, "_CACHE", cache)
+    return cache
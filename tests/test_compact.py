@@ -0,0 +1,58 @@
+# tests/test_compact.py
+"""الوضع المضغوط يقلل الذاكرة دون تغيير المؤشرات أو الضرائب."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compact import compact_frame
+from engine.compute_core import compute_core
+from engine.kpi import compute_kpis, compute_kpis_by_entity
+
+from tests.conftest import make_ledger
+
+
+def _big_ledger() -> pd.DataFrame:
+    # مبالغ بالملايين بهللات: float32 لا يحفظها
+    df = make_ledger(months=24)
+    df["revenue"] = df["revenue"] * 37 + 0.37
+    df["vat_collected"] = np.round(df["revenue"] * 0.15, 2)
+    return df.assign(memo="ملاحظة", row_id=np.arange(len(df)))
+
+
+def test_compact_kpis_equal_uncompacted():
+    raw = _big_ledger()
+    compacted, report = compact_frame(raw)
+    assert set(report.dropped) == {"memo", "row_id"}
+    assert report.after_bytes < report.before_bytes
+    assert isinstance(compacted["entity_name"].dtype, pd.CategoricalDtype)
+    assert compacted["revenue"].dtype == np.float64
+
+    assert compute_kpis(compute_core(compacted)) == compute_kpis(compute_core(raw.drop(columns=["memo", "row_id"])))
+    pd.testing.assert_frame_equal(
+        compute_kpis_by_entity(compute_core(compacted)),
+        compute_kpis_by_entity(compute_core(raw)),
+    )
+
+
+def test_compact_core_output_keeps_results():
+    core = compute_core(_big_ledger())
+    compacted, _ = compact_frame(core)
+    assert compute_kpis(compacted) == compute_kpis(core.drop(columns=["memo", "row_id"]))
+
+
+def test_float32_amounts_are_an_explicit_opt_in():
+    raw = _big_ledger()
+    small, _ = compact_frame(raw, amounts="float32")
+    assert small["revenue"].dtype == np.float32
+    # هذا بالضبط سبب عدم جعله الافتراضي
+    assert float(small["revenue"].astype(np.float64).sum()) != pytest.approx(raw["revenue"].sum(), abs=0.005)
+    with pytest.raises(ValueError):
+        compact_frame(raw, amounts="float16")
+
+
+def test_keep_protects_unknown_columns():
+    compacted, report = compact_frame(_big_ledger(), keep=["Memo"])
+    assert "memo" in compacted.columns
+    assert report.dropped == ("row_id",)
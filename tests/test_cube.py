@@ -0,0 +1,78 @@
+# tests/test_cube.py
+"""مكعب التجميع مقابل groupby مباشر، الجمع/الطرح التزايدي، والحفظ في .npz."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.cube import RollupCube, build_cube, load_or_build_cube
+
+
+@pytest.fixture
+def core(ledger) -> pd.DataFrame:
+    return compute_core(ledger)
+
+
+def _assert_same_cube(a: RollupCube, b: RollupCube) -> None:
+    assert a.entities == b.entities and a.start_month == b.start_month
+    for grain in ("month", "quarter", "fiscal_year"):
+        np.testing.assert_allclose(getattr(a, grain), getattr(b, grain), atol=1e-6)
+
+
+def test_month_and_quarter_match_groupby(core):
+    cube = build_cube(core)
+    month = cube.frame("month", by_entity=True).set_index(["entity_name", "period"])
+    direct = core.groupby(["entity_name", core["date"].dt.to_period("M").astype(str)])["revenue"].sum()
+    np.testing.assert_allclose(month.loc[direct.index, "revenue"].to_numpy(), direct.to_numpy())
+
+    quarter = cube.frame("quarter")
+    q = core.groupby(core["date"].dt.to_period("Q").astype(str))["vat_collected"].sum()
+    assert quarter["period"].tolist() == q.index.tolist()
+    np.testing.assert_allclose(quarter["vat_output"].to_numpy(), q.to_numpy())
+    np.testing.assert_allclose(quarter["net_vat"], quarter["vat_output"] - quarter["vat_input"])
+
+
+def test_fiscal_year_folds_on_the_year_end(core):
+    cube = build_cube(core, fiscal_year_end_month=6)
+    fy = cube.frame("fiscal_year")
+    assert fy["period"].tolist() == ["FY2023", "FY2024", "FY2025"]
+    assert fy["date"].tolist() == [pd.Timestamp(f"{y}-06-30") for y in (2023, 2024, 2025)]
+    assert fy["rows"].tolist() == [12, 24, 12]
+    with pytest.raises(ValueError):
+        build_cube(core, fiscal_year_end_month=13)
+
+
+def test_combine_adds_and_subtracts_rows(core):
+    old, new = core.iloc[:30], core.iloc[30:]
+    _assert_same_cube(build_cube(old).combine(build_cube(new)), build_cube(core))
+    _assert_same_cube(build_cube(core).combine(build_cube(new), sign=-1.0), build_cube(old))
+
+    # منشأة حُذفت كل صفوفها تختفي من المكعب
+    riyadh = core[core["entity_name"] == "الرياض"]
+    rest = build_cube(core).combine(build_cube(riyadh), sign=-1.0)
+    assert rest.entities == ("جدة",)
+
+
+def test_combine_rejects_different_fiscal_years(core):
+    with pytest.raises(ValueError):
+        build_cube(core).combine(build_cube(core, fiscal_year_end_month=3))
+
+
+def test_save_and_load_round_trip(core, tmp_path):
+    cube = build_cube(core, fiscal_year_end_month=3)
+    path = cube.save(tmp_path / "cube.npz")
+    back = RollupCube.load(path)
+    _assert_same_cube(back, cube)
+    assert back.metrics == cube.metrics and back.fiscal_year_end_month == 3
+    pd.testing.assert_frame_equal(back.frame("fiscal_year"), cube.frame("fiscal_year"))
+
+
+def test_load_or_build_cube_reuses_the_cached_file(core, ledger_cache):
+    first = load_or_build_cube(core, key="upload-1", use_cache=True)
+    (path,) = ledger_cache.directory.glob("upload-1-cube-*.npz")
+    mtime = path.stat().st_mtime_ns
+    second = load_or_build_cube(core.iloc[:0], key="upload-1", use_cache=True)
+    _assert_same_cube(second, first)          # من الملف وليس من الإطار الفارغ
+    assert path.stat().st_mtime_ns >= mtime
@@ -0,0 +1,96 @@
+# tests/test_export.py
+"""التصدير ذهابًا وإيابًا: Arrow IPC / Parquet مع مؤشرات metadata، وبث NDJSON / XLSX."""
+from __future__ import annotations
+
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import engine.export as export
+from engine.compute_core import compute_core
+from engine.export import (
+    KPI_LABELS, build_summary, read_arrow_ipc, read_export_kpis, to_arrow_ipc, to_arrow_table,
+    to_ndjson, to_parquet, to_xlsx,
+)
+from engine.kpi import compute_kpis
+
+
+@pytest.fixture
+def core(ledger) -> pd.DataFrame:
+    return compute_core(ledger)
+
+
+@pytest.mark.parametrize("memory_map", [True, False])
+def test_arrow_ipc_file_round_trip(core, tmp_path, memory_map):
+    path = to_arrow_ipc(core, tmp_path / "core.arrow")
+    table, kpis = read_arrow_ipc(path, memory_map=memory_map)
+    pd.testing.assert_frame_equal(table.to_pandas(), core, check_dtype=False)
+    assert kpis == build_summary(core)
+    assert read_export_kpis(path) == kpis
+
+
+def test_arrow_ipc_buffer_and_given_kpis(core):
+    kpis = compute_kpis(core)
+    table, summary = read_arrow_ipc(to_arrow_ipc(core, kpis=kpis))
+    assert table.num_rows == len(core)
+    assert summary == kpis.to_summary()
+
+
+def test_parquet_round_trip(core, tmp_path):
+    path = to_parquet(core, tmp_path / "core.parquet")
+    pd.testing.assert_frame_equal(pq.read_table(path).to_pandas(), core, check_dtype=False)
+    assert read_export_kpis(path) == build_summary(core)
+
+
+def test_mixed_object_column_is_written_as_text(core):
+    df = core.assign(ref=pd.Series([1, "A-2"] * (len(core) // 2), dtype=object))
+    table = to_arrow_table(df)
+    assert table.column("ref").to_pylist()[:2] == ["1", "A-2"]
+
+
+def test_ndjson_streams_batches(core, tmp_path):
+    path = tmp_path / "core.ndjson"
+    assert to_ndjson(core, path, batch_rows=7) == len(core)
+    back = pd.read_json(path, lines=True)
+    assert len(back) == len(core)
+    pd.testing.assert_series_equal(back["revenue"], core["revenue"])
+    assert pd.to_datetime(back["date"]).tolist() == core["date"].tolist()
+
+    # دفعات مولّدة + ملف مفتوح: نفس النص
+    buf = io.StringIO()
+    chunks = (core.iloc[i:i + 10] for i in range(0, len(core), 10))
+    assert to_ndjson(chunks, buf, batch_rows=4) == len(core)
+    assert buf.getvalue() == path.read_text(encoding="utf-8")
+
+
+def _sheet(path, name) -> pd.DataFrame:
+    return pd.read_excel(path, sheet_name=name, engine="openpyxl")
+
+
+def test_xlsx_has_summary_and_data(core, tmp_path):
+    path = tmp_path / "core.xlsx"
+    assert to_xlsx(core, path, batch_rows=9) == len(core)
+    data = _sheet(path, "البيانات")
+    assert list(data.columns) == [str(c) for c in core.columns]
+    pd.testing.assert_series_equal(data["revenue"], core["revenue"])
+
+    summary = _sheet(path, "ملخص").set_index("المؤشر")["القيمة"]
+    kpis = build_summary(core)
+    assert summary[KPI_LABELS["total_revenue"]] == pytest.approx(kpis.total_revenue)
+    assert summary[KPI_LABELS["net_vat"]] == pytest.approx(kpis.net_vat)
+    assert summary["عدد الصفوف"] == len(core)
+
+
+def test_xlsx_splits_sheets_and_tracks_streamed_kpis(core, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 20)
+    path = tmp_path / "core.xlsx"
+    chunks = (core.iloc[i:i + 15] for i in range(0, len(core), 15))
+    assert to_xlsx(chunks, path) == len(core)
+    sheets = pd.read_excel(path, sheet_name=None, engine="openpyxl")
+    assert list(sheets) == ["ملخص", "البيانات", "البيانات 2", "البيانات 3"]
+    assert [len(sheets[n]) for n in list(sheets)[1:]] == [20, 20, 8]
+    summary = sheets["ملخص"].set_index("المؤشر")["القيمة"]
+    # بدون الإطار الكامل: المؤشرات تراكمية عبر الدفعات
+    assert summary[KPI_LABELS["total_revenue"]] == pytest.approx(core["revenue"].sum())
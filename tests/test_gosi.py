@@ -0,0 +1,65 @@
+# tests/test_gosi.py
+"""اشتراكات GOSI لكل موظف × شهر: النسب حسب الجنسية، الحد الأدنى والأعلى، وصيغ الأشهر."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.gosi import compute_gosi, gosi_totals
+
+
+def _payroll() -> pd.DataFrame:
+    return pd.DataFrame({
+        "employee_id": ["E1", "E2", "E3", "E4"],
+        "basic_salary": [10_000.0, 50_000.0, 1_000.0, 8_000.0],
+        "housing_allowance": [2_500.0, 10_000.0, 0.0, 2_000.0],
+        "nationality": ["سعودي", "Saudi", "Egyptian", "Indian"],
+    })
+
+
+def test_rates_floor_and_cap_per_employee():
+    out = compute_gosi(_payroll(), months=["2024-01"])
+    assert out["is_saudi"].tolist() == [True, True, False, False]
+    assert out["contributory_wage"].tolist() == [12_500.0, 45_000.0, 1_500.0, 10_000.0]
+    expected_employer = [round(12_500 * 0.1175, 2), round(45_000 * 0.1175, 2), 30.0, 200.0]
+    expected_employee = [round(12_500 * 0.0975, 2), round(45_000 * 0.0975, 2), 0.0, 0.0]
+    np.testing.assert_allclose(out["employer"], expected_employer)
+    np.testing.assert_allclose(out["employee"], expected_employee)
+    assert (out["due_date"] == pd.Timestamp("2024-02-15")).all()
+
+
+def test_own_rates_and_zero_wage():
+    payroll = _payroll().assign(employer_rate=[np.nan, 12, np.nan, 0.05])
+    payroll.loc[2, "basic_salary"] = 0.0
+    out = compute_gosi(payroll, months=["2024-01"])
+    assert out["employer_rate"].tolist() == [0.1175, 0.12, 0.02, 0.05]
+    assert out.loc[2, ["contributory_wage", "total"]].tolist() == [0.0, 0.0]
+
+
+def test_months_repeat_payroll_and_totals_add_up():
+    out = compute_gosi(_payroll(), months=pd.period_range("2024-11", periods=3, freq="M"))
+    assert len(out) == 12
+    totals = gosi_totals(out)
+    assert totals["month"].tolist() == ["2024-11", "2024-12", "2025-01"]
+    assert totals["due_date"].tolist() == [pd.Timestamp(d) for d in ("2024-12-15", "2025-01-15", "2025-02-15")]
+    assert totals["employees"].tolist() == [4, 4, 4]
+    assert totals["saudi_employees"].tolist() == [2, 2, 2]
+    assert totals["total"].sum() == pytest.approx(out["total"].sum(), abs=1e-6)
+
+
+@pytest.mark.parametrize("month", [202403, "202403", "2024-03", pd.Timestamp("2024-03-20")])
+def test_month_column_formats(month):
+    out = compute_gosi(_payroll().assign(month=[month] * 4))
+    assert out["month"].unique().tolist() == ["2024-03"]
+    assert out["due_date"].unique().tolist() == [pd.Timestamp("2024-04-15")]
+
+
+def test_bad_months_are_errors_not_dropped_rows():
+    # regression: الأرقام 1..12 كانت تُقرأ كأشهر سنة 1970 أو تُستبعد بصمت
+    with pytest.raises(ValueError):
+        compute_gosi(_payroll().assign(month=[1, 2, 3, 4]))
+    with pytest.raises(ValueError, match="1 payroll rows"):
+        compute_gosi(_payroll().assign(month=["2024-01", "2024-01", "not a month", "2024-01"]))
+    with pytest.raises(ValueError):
+        compute_gosi(_payroll())
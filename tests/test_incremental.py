@@ -0,0 +1,78 @@
+# tests/test_incremental.py
+"""التشغيل التزايدي بعد إعادة رفع ملف محدّث مقابل تشغيل كامل من الصفر."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.incremental import forget, incremental_run, row_hashes
+from engine.kpi import compute_kpis
+
+from tests.conftest import make_ledger
+
+
+@pytest.fixture(autouse=True)
+def _clean_states():
+    forget()
+    yield
+    forget()
+
+
+def _full(raw: pd.DataFrame):
+    forget("fresh")
+    return incremental_run("fresh", raw)
+
+
+def _sorted_forecast(state) -> pd.DataFrame:
+    return state.forecast.sort_values(["entity_name", "date"]).reset_index(drop=True)
+
+
+def test_row_hashes_are_stable_and_content_based(ledger):
+    h = row_hashes(ledger)
+    assert len(h) == len(ledger)
+    np.testing.assert_array_equal(h, row_hashes(ledger.copy()))
+    changed = ledger.copy()
+    changed.loc[3, "revenue"] += 1
+    assert np.flatnonzero(row_hashes(changed) != h).tolist() == [3]
+
+
+def test_incremental_append_matches_full_run():
+    full = make_ledger(months=24)
+    first = full[full["date"] < "2024-10-01"].reset_index(drop=True)
+
+    assert incremental_run("acme", first).diff.full
+    state = incremental_run("acme", full)
+    assert not state.diff.full
+    assert len(state.diff.added) == len(full) - len(first)
+    assert len(state.diff.removed) == 0
+    assert state.affected_entities == frozenset({"الرياض", "جدة"})
+
+    baseline = compute_kpis(compute_core(full))
+    assert state.kpis.net_vat == pytest.approx(baseline.net_vat)
+    assert state.kpis.total_revenue == pytest.approx(baseline.total_revenue)
+    assert state.kpis.zakat_due == pytest.approx(baseline.zakat_due)
+
+    fresh = _full(full)
+    pd.testing.assert_frame_equal(state.cube.frame(), fresh.cube.frame())
+    pd.testing.assert_frame_equal(_sorted_forecast(state), _sorted_forecast(fresh))
+
+
+def test_padded_entity_names_replace_their_stale_forecast():
+    full = make_ledger(months=24)
+    full.loc[full["entity_name"] == "جدة", "entity_name"] = " جدة "
+    first = full[~((full["entity_name"] == " جدة ") & (full["date"] >= "2024-10-01"))]
+
+    incremental_run("acme", first.reset_index(drop=True))
+    state = incremental_run("acme", full)
+    assert state.affected_entities == frozenset({"جدة"})
+    assert state.forecast.groupby("entity_name").size().tolist() == [6, 6]
+    pd.testing.assert_frame_equal(_sorted_forecast(state), _sorted_forecast(_full(full)))
+
+
+def test_incremental_same_file_is_unchanged(ledger):
+    incremental_run("acme", ledger)
+    again = incremental_run("acme", ledger)
+    assert again.diff.unchanged
+    assert not again.diff.full
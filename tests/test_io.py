@@ -0,0 +1,204 @@
+# tests/test_io.py
+"""قراءة الملفات المرفوعة: كاش Parquet، القارئ المتدفق، وقارئات Excel."""
+from __future__ import annotations
+
+import io
+import os
+from typing import Optional
+
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.export import build_summary
+from engine.io import (
+    LedgerCache, _dedupe_header, excel_backends, file_fingerprint, iter_csv_chunks, load_csv,
+    _excel_suffix, excel_sheet_names, load_excel, load_excel_sheets,
+)
+from engine.streaming import summarize_chunks
+
+from tests.conftest import csv_upload, make_ledger, upload
+
+
+# ----------------------------- Content cache ---------------------------------------
+
+def test_load_csv_cached_equals_uncached(ledger, ledger_cache):
+    first = load_csv(csv_upload(ledger), use_cache=True)
+    again = load_csv(csv_upload(ledger, name="renamed.csv"), use_cache=True)
+    pd.testing.assert_frame_equal(first, load_csv(csv_upload(ledger), use_cache=False))
+    pd.testing.assert_frame_equal(first, again)
+    stats = ledger_cache.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (1, 1, 1)
+
+
+def test_cache_key_is_content_not_name(ledger):
+    a = csv_upload(ledger).getvalue()
+    assert file_fingerprint(a) == file_fingerprint(bytes(a))
+    assert file_fingerprint(a) != file_fingerprint(a + b"\n")
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    frames = {k: make_ledger(months=12, seed=i) for i, k in enumerate("abc")}
+    probe = LedgerCache(tmp_path / "probe", 1 << 30)
+    probe.put("x", frames["a"])
+    size = probe.stats()["bytes"]
+
+    cache = LedgerCache(tmp_path / "lru", int(size * 2.5))
+    cache.put("a", frames["a"])
+    cache.put("b", frames["b"])
+    assert cache.get("a") is not None      # a أحدث استخدامًا من b
+    # mtime بدقة الثانية في بعض الأنظمة — نثبّت الترتيب صراحة
+    os.utime(cache._path("b"), (1, 1))
+    cache.put("c", frames["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    assert stats["bytes"] <= cache.max_bytes
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_cache_put_of_unwritable_frame_is_skipped(tmp_path):
+    cache = LedgerCache(tmp_path / "c", 1 << 20)
+    mixed = pd.DataFrame({"x": [1, "a", 2.5, object()]})
+    assert cache.put("mixed", mixed) is False
+    assert cache.stats()["entries"] == 0
+
+
+# ----------------------------- Streaming CSV ---------------------------------
+
+def _wide_csv(ledger: pd.DataFrame) -> pd.DataFrame:
+    """أسماء بديلة (sales, Output VAT, المنشأة) + أعمدة لا يحتاجها المحرك."""
+    return ledger.rename(columns={
+        "revenue": "Sales", "vat_collected": "Output VAT", "entity_name": "المنشأة",
+    }).assign(memo="note", invoice_ref=range(len(ledger)), notes_2="x")
+
+
+def test_iter_csv_chunks_prunes_and_renames_columns(ledger):
+    chunks = list(iter_csv_chunks(csv_upload(_wide_csv(ledger)), chunksize=10))
+    assert len(chunks) == 5
+    first = chunks[0]
+    assert set(first.columns) == {"date", "entity_name", "revenue", "expenses",
+                                  "cash", "accounts_payable", "vat_collected", "vat_paid"}
+    assert pd.api.types.is_datetime64_any_dtype(first["date"])
+    full = pd.concat(chunks, ignore_index=True)
+    assert full["revenue"].sum() == pytest.approx(ledger["revenue"].sum())
+    assert full["entity_name"].tolist() == ledger["entity_name"].tolist()
+
+
+def test_iter_csv_chunks_keeps_extra_columns(ledger):
+    chunks = iter_csv_chunks(csv_upload(_wide_csv(ledger)), chunksize=100, extra_columns=["Memo"])
+    assert "memo" in next(chunks).columns
+
+
+def test_iter_csv_chunks_rejects_unrecognised_header():
+    with pytest.raises(ValueError):
+        next(iter_csv_chunks(upload(b"a,b\n1,2\n", "x.csv")))
+
+
+def test_summarize_chunks_matches_build_summary(ledger):
+    streamed = summarize_chunks(compute_core(c) for c in
+                                iter_csv_chunks(csv_upload(_wide_csv(ledger)), chunksize=7))
+    full = build_summary(compute_core(ledger))
+    assert streamed.total_revenue == pytest.approx(full.total_revenue)
+    assert streamed.total_profit == pytest.approx(full.total_profit)
+    assert streamed.net_vat == pytest.approx(full.net_vat)
+    assert streamed.zakat_due == pytest.approx(full.zakat_due)
+
+
+# ----------------------------- Excel backends ---------------------------------------
+
+def _xlsx(df: Optional[pd.DataFrame] = None, **sheets: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as xw:
+        if sheets:
+            for name, part in sheets.items():
+                part.to_excel(xw, sheet_name=name, index=False)
+        else:
+            df.to_excel(xw, index=False)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("backend", excel_backends())
+def test_excel_backends_return_the_same_frame(backend):
+    df = make_ledger(months=6).assign(units=range(12))
+    data = _xlsx(df)
+    expected = load_excel(upload(data, "ledger.xlsx"), backend="openpyxl", use_cache=False)
+    got = load_excel(upload(data, "ledger.xlsx"), backend=backend, use_cache=False)
+    pd.testing.assert_frame_equal(got, expected)
+    assert got["revenue"].sum() == pytest.approx(df["revenue"].sum())
+
+
+@pytest.mark.parametrize("header", [
+    ["amount", "amount", "amount"],
+    ["amount", "amount.1", "amount"],
+    ["a", "b", "a", "a.1", "b", "a"],
+])
+def test_dedupe_header_matches_pandas(header):
+    # read_csv و read_excel يشتركان في نفس معالجة الأسماء المكررة
+    text = ",".join(header) + "\n" + ",".join("1" * len(header)) + "\n"
+    assert _dedupe_header(header) == list(pd.read_csv(io.StringIO(text)).columns)
+
+
+def test_openpyxl_ro_duplicate_headers_match_openpyxl():
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["date", "amount", "amount", None])
+    ws.append(["2024-01-31", 1.0, 2.0, 3.0])
+    buf = io.BytesIO()
+    wb.save(buf)
+    data = buf.getvalue()
+    ro = load_excel(upload(data, "d.xlsx"), backend="openpyxl_ro", use_cache=False)
+    ref = load_excel(upload(data, "d.xlsx"), backend="openpyxl", use_cache=False)
+    assert list(ro.columns) == list(ref.columns)
+
+
+def test_excel_cache_is_keyed_by_reader(ledger_cache):
+    data = _xlsx(make_ledger(months=3))
+    for backend in excel_backends():
+        load_excel(upload(data, "ledger.xlsx"), backend=backend, use_cache=True)
+    assert ledger_cache.stats()["entries"] == len(excel_backends())
+
+
+def test_unknown_excel_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_excel(upload(b"", "x.xlsx"), backend="xlrd2")
+
+
+# ----------------------------- Multi-sheet workbooks ---------------------------------------
+
+def _branches():
+    riyadh = make_ledger(months=4, entities=("x",), seed=1).drop(columns="entity_name")
+    jeddah = make_ledger(months=4, entities=("x",), seed=2).drop(columns="entity_name")
+    return riyadh, jeddah
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_load_excel_sheets_tags_each_sheet(max_workers):
+    riyadh, jeddah = _branches()
+    data = _xlsx(الرياض=riyadh, جدة=jeddah)
+    assert excel_sheet_names(data) == ["الرياض", "جدة"]
+
+    df = load_excel_sheets(upload(data, "book.xlsx"), max_workers=max_workers, use_cache=False)
+    assert len(df) == 8
+    assert df["entity_name"].tolist() == ["الرياض"] * 4 + ["جدة"] * 4
+    assert df["sheet"].tolist() == df["entity_name"].tolist()
+    assert df["revenue"].sum() == pytest.approx(riyadh["revenue"].sum() + jeddah["revenue"].sum())
+
+
+def test_load_excel_sheets_subset_and_file_path(tmp_path):
+    riyadh, jeddah = _branches()
+    path = tmp_path / "book.xlsx"
+    path.write_bytes(_xlsx(الرياض=riyadh, جدة=jeddah.assign(company="فرع جدة")))
+    df = load_excel_sheets(str(path), sheets=["جدة"], use_cache=False)
+    # عمود المنشأة الموجود يُعاد تسميته ولا يُستبدل باسم الورقة
+    assert df["entity_name"].unique().tolist() == ["فرع جدة"]
+    assert df["sheet"].unique().tolist() == ["جدة"]
+
+
+def test_excel_suffix_from_name_or_signature():
+    assert _excel_suffix(upload(b"", "Book.XLSM"), b"PK") == ".xlsm"
+    assert _excel_suffix(upload(b"", "upload"), b"\xd0\xcf\x11\xe0rest") == ".xls"
+    assert _excel_suffix(upload(b"", "upload"), b"PK\x03\x04") == ".xlsx"
@@ -0,0 +1,78 @@
+# tests/test_kpi.py
+"""النواة المدمجة compute_kpis مقابل مسارات taxes/pandas الأصلية."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.export import build_summary
+from engine.kpi import compute_kpis, compute_kpis_by_entity, entity_keys, kpi_arrays
+from engine.taxes import compute_vat, compute_zakat
+
+
+def _baseline(core: pd.DataFrame):
+    """المسار القديم: مجاميع pandas + taxes.compute_vat/compute_zakat لكل مؤشر على حدة."""
+    return {
+        "total_revenue": core["revenue"].sum(),
+        "total_expenses": core["expenses"].sum(),
+        "total_profit": core["profit"].sum(),
+        "total_cash_flow": core["cash_flow"].sum(),
+        "net_vat": compute_vat(core),
+        "zakat_due": compute_zakat(core),
+    }
+
+
+@pytest.mark.parametrize("with_vat", [True, False])
+def test_compute_kpis_matches_baseline(ledger, ledger_no_vat, with_vat):
+    core = compute_core(ledger if with_vat else ledger_no_vat)
+    k = compute_kpis(core)
+    for name, expected in _baseline(core).items():
+        assert getattr(k, name) == pytest.approx(expected, abs=1e-6), name
+    assert k.rows == len(core)
+    assert k.net_vat == pytest.approx(k.vat_output - k.vat_input, abs=1e-6)
+    assert build_summary(core, k) == build_summary(core)
+
+
+def test_mom_compares_the_last_two_dated_rows(ledger):
+    core = compute_core(ledger)
+    core.loc[len(core) - 1, "date"] = pd.NaT   # صف بلا تاريخ لا يدخل التغير الشهري
+    k = compute_kpis(core)
+    last, prev = core["revenue"].iloc[-2], core["revenue"].iloc[-3]
+    assert k.mom["revenue"]["last"] == pytest.approx(last)
+    assert k.mom["revenue"]["prev"] == pytest.approx(prev)
+    assert k.mom["revenue"]["delta"] == pytest.approx(last - prev)
+
+
+def test_kpi_arrays_vat_fallback_and_zakat_columns(ledger_no_vat):
+    core = compute_core(ledger_no_vat)
+    a = kpi_arrays(core)
+    assert len(a) == len(core)
+    # بدون أعمدة الضريبة: الإيرادات/المصروفات × النسبة بعد الجمع
+    assert a.vat_scale == pytest.approx(0.15)
+    np.testing.assert_array_equal(a.vat_out, core["revenue"].to_numpy())
+    np.testing.assert_allclose(a.assets_total(), core["cash"].to_numpy())
+    np.testing.assert_allclose(a.liabilities_total(), core["accounts_payable"].to_numpy())
+    with pytest.raises(Exception):
+        a.vat_scale = 1.0
+
+
+def test_compute_kpis_by_entity_matches_per_entity_kpis(ledger):
+    core = compute_core(ledger)
+    table = compute_kpis_by_entity(core).set_index("entity_name")
+    assert table["rows"].sum() == len(core)
+    for ent, part in core.groupby("entity_name"):
+        k = compute_kpis(part)
+        row = table.loc[ent]
+        assert row["rows"] == k.rows
+        assert row["total_revenue"] == pytest.approx(k.total_revenue)
+        assert row["net_vat"] == pytest.approx(k.net_vat)
+        assert row["zakat_due"] == pytest.approx(k.zakat_due)
+
+
+def test_entity_keys_normalize_blank_and_padded_names():
+    df = pd.DataFrame({"entity_name": [" الرياض ", None, "", "جدة"]})
+    keys = entity_keys(df, "entity_name")
+    assert keys[0] == "الرياض" and keys[3] == "جدة"
+    assert keys[1] == keys[2]
@@ -0,0 +1,73 @@
+# tests/test_ledger.py
+"""نوافذ RunningLedger (prefix sums) مقابل df.tail وتقطيع الإطار مباشرة."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.kpi import compute_kpis
+from engine.ledger import RunningLedger
+
+from tests.conftest import make_ledger
+
+
+@pytest.fixture
+def core() -> pd.DataFrame:
+    # منشأة واحدة: صف لكل شهر، فآخر n أشهر = df.tail(n)
+    return compute_core(make_ledger(months=30, entities=("الرياض",)))
+
+
+@pytest.mark.parametrize("n", [1, 3, 6, 12, 30, 45])
+def test_last_window_matches_tail(core, n):
+    ledger = RunningLedger.from_frame(core)
+    tail = core.tail(n)
+    sums = ledger.last(n)
+    assert sums["rows"] == len(tail)
+    assert sums["revenue"] == pytest.approx(tail["revenue"].sum())
+    assert sums["expenses"] == pytest.approx(tail["expenses"].sum())
+    assert sums["vat_out"] == pytest.approx(tail["vat_collected"].sum())
+
+    k, expected = ledger.last_kpis(n), compute_kpis(tail)
+    for name in ("total_revenue", "total_profit", "avg_profit_margin", "net_vat", "zakat_due"):
+        assert getattr(k, name) == pytest.approx(getattr(expected, name)), name
+
+
+def test_window_and_ytd_match_slices(core):
+    ledger = RunningLedger.from_frame(core)
+    part = core[(core["date"] >= "2023-04-01") & (core["date"] <= "2023-09-30")]
+    assert ledger.window("2023-04", "2023-09")["revenue"] == pytest.approx(part["revenue"].sum())
+
+    # آخر شهر 2025-06؛ السنة المالية تنتهي في مارس -> أبريل..يونيو
+    ytd = core[core["date"] >= "2025-04-01"]
+    assert ledger.ytd(fiscal_year_end_month=3)["revenue"] == pytest.approx(ytd["revenue"].sum())
+    assert ledger.ytd()["rows"] == 6
+
+
+def test_months_with_several_entities_sum_together(ledger):
+    core = compute_core(ledger)
+    rl = RunningLedger.from_frame(core)
+    assert rl.size == 24
+    by_month = core.groupby("date")["revenue"].sum().to_numpy()
+    np.testing.assert_allclose(rl.series("revenue").to_numpy(), by_month)
+
+
+def test_append_matches_from_frame(core):
+    head, tail = core.iloc[:-3], core.iloc[-3:]
+    rl = RunningLedger.from_frame(head)
+    for _, row in tail.iterrows():
+        rl.append(row["date"], {"rows": 1, "revenue": row["revenue"], "expenses": row["expenses"]})
+    full = RunningLedger.from_frame(core)
+    assert rl.size == full.size
+    assert rl.last(5)["revenue"] == pytest.approx(full.last(5)["revenue"])
+    with pytest.raises(ValueError):
+        rl.append("2023-01", {"revenue": 1.0})
+
+
+def test_append_fills_gap_months_with_zero():
+    rl = RunningLedger()
+    rl.append("2024-01", {"rows": 1, "revenue": 10.0})
+    rl.append("2024-04", {"rows": 1, "revenue": 5.0})
+    assert rl.series("revenue").tolist() == [10.0, 0.0, 0.0, 5.0]
+    assert rl.last(2)["revenue"] == 5.0
@@ -0,0 +1,58 @@
+# tests/test_money.py
+"""حساب الهللة: التحويل، قواعد التقريب، النسب، ووضع halala على المؤشرات."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.kpi import compute_kpis
+from engine.money import (
+    apply_rate, apply_rates, from_halalas, halala_mode, money_mode, to_halalas,
+)
+
+
+def test_to_halalas_rounding_modes():
+    values = np.array([1.005, 2.675, -1.005, 0.125, np.nan])
+    assert to_halalas(values).tolist() == [101, 268, -101, 13, 0]
+    assert to_halalas(values, "half_even").tolist() == [100, 268, -100, 12, 0]
+    assert to_halalas(values, "truncate").tolist() == [100, 267, -100, 12, 0]
+    assert to_halalas(pd.Series(["3.10", None, "x"])).tolist() == [310, 0, 0]
+    with pytest.raises(ValueError):
+        to_halalas(values, "bankers")
+
+
+def test_apply_rate_rounds_once_per_amount():
+    # 0.15 × 0.10 ريال = 1.5 هللة
+    h = np.array([10, 30, -10])
+    assert apply_rate(h, 0.15, "half_up").tolist() == [2, 5, -2]
+    assert apply_rate(h, 0.15, "half_even").tolist() == [2, 4, -2]
+    assert apply_rate(h, 0.15, "truncate").tolist() == [1, 4, -1]
+    assert apply_rate(12_345, 0.025) == 309
+
+
+def test_apply_rates_matches_apply_rate_per_element():
+    rng = np.random.default_rng(1)
+    h = rng.integers(-1_000_000, 1_000_000, 500)
+    rates = rng.choice(np.array([0.0, 0.05, 0.15, 0.2]), 500)
+    assert apply_rates(h, rates).tolist() == [apply_rate(v, r) for v, r in zip(h, rates)]
+    assert from_halalas(np.array([101, -5])).tolist() == [1.01, -0.05]
+
+
+def test_kpis_in_halala_mode_match_float_to_the_halala(ledger):
+    core = compute_core(ledger)
+    loose = compute_kpis(core)
+    with money_mode("halala"):
+        assert halala_mode()
+        exact = compute_kpis(core)
+    assert not halala_mode()
+    assert exact.net_vat == pytest.approx(loose.net_vat, abs=0.01)
+    assert exact.zakat_due == pytest.approx(loose.zakat_due, abs=0.01)
+    assert exact.zakat_due == round(exact.zakat_due, 2)
+
+
+def test_money_mode_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        with money_mode("decimal"):
+            pass
@@ -0,0 +1,78 @@
+# tests/test_pipeline.py
+"""الأنبوب الكسول: حساب كل عقدة مرة واحدة، وإبطال العقد المتأثرة بالمعاملات فقط."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.kpi import compute_kpis
+from engine.pipeline import AnalysisPipeline, PipelineMemo
+
+from tests.conftest import make_ledger
+
+
+@pytest.fixture
+def memo() -> PipelineMemo:
+    return PipelineMemo()
+
+
+def test_nodes_are_computed_once_and_match_direct_calls(ledger, memo):
+    pipe = AnalysisPipeline(ledger, memo=memo)
+    kpis = pipe["kpis"]
+    assert kpis == compute_kpis(compute_core(ledger))
+    assert set(pipe.timings) == {"core", "kpis"}
+    assert pipe.dependencies("taxes") == ("core", "kpis")
+
+    again = AnalysisPipeline(ledger.copy(), memo=memo)
+    assert again["kpis"] is kpis
+    assert again.hits == {"kpis"} and not again.timings
+    assert again["taxes"]["net_vat"] == kpis.net_vat
+    assert set(again.timings) == {"taxes"}
+
+
+def test_with_params_recomputes_only_affected_nodes(ledger, memo):
+    pipe = AnalysisPipeline(ledger, memo=memo)
+    quarterly = pipe["vat_returns"]
+    pipe["kpis"]
+    monthly_pipe = pipe.with_params(vat_frequency="monthly")
+    assert monthly_pipe.is_computed("kpis")
+    assert not monthly_pipe.is_computed("vat_returns")
+    monthly = monthly_pipe["vat_returns"]
+    assert set(monthly_pipe.timings) == {"vat_returns"}
+    assert len(monthly) == 3 * len(quarterly)
+    assert monthly["net_vat"].sum() == pytest.approx(quarterly["net_vat"].sum())
+
+
+def test_new_data_gets_a_new_fingerprint(ledger, memo):
+    pipe = AnalysisPipeline(ledger, memo=memo)
+    pipe["kpis"]
+    changed = AnalysisPipeline(make_ledger(seed=5), memo=memo)
+    assert changed.fingerprint != pipe.fingerprint
+    assert not changed.is_computed("kpis")
+
+
+def test_seeded_nodes_are_used_as_given(ledger, memo):
+    marker = object()
+    pipe = AnalysisPipeline(ledger, seed={"forecast": marker}, memo=memo)
+    assert pipe["forecast"] is marker
+    assert pipe.hits == {"forecast"}
+
+
+def test_compact_core_keeps_kpis_and_returns(ledger, memo):
+    plain = AnalysisPipeline(ledger, params={"compact_frames": False}, memo=memo)
+    compact = plain.with_params(compact_frames=True)
+    assert compact["kpis"] == plain["kpis"]
+    pd.testing.assert_frame_equal(compact["vat_returns"], plain["vat_returns"])
+    assert isinstance(compact["core"]["entity_name"].dtype, pd.CategoricalDtype)
+
+
+def test_memo_is_bounded_and_params_are_checked(ledger):
+    small = PipelineMemo(maxsize=2)
+    pipe = AnalysisPipeline(ledger, memo=small)
+    pipe["taxes"]                               # core, kpis, taxes
+    assert len(small) == 2 and not pipe.is_computed("core")
+    with pytest.raises(ValueError):
+        AnalysisPipeline(ledger, params={"vat_rate": 0.1})
+    with pytest.raises(KeyError):
+        pipe["balance_sheet"]
@@ -0,0 +1,93 @@
+# tests/test_store.py
+"""رحلة الدفتر عبر LedgerStore ذهابًا وإيابًا، والقراءة ببصمة الملف للعميل العائد."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.incremental import forget, incremental_run, row_hashes
+from engine.io import load_csv
+from engine.store import LedgerStore
+
+from tests.conftest import csv_upload, make_ledger
+
+
+@pytest.fixture
+def store():
+    with LedgerStore(":memory:") as s:
+        yield s
+
+
+@pytest.fixture
+def raw(ledger) -> pd.DataFrame:
+    return load_csv(csv_upload(ledger), use_cache=False)
+
+
+def test_round_trip_keeps_rows_and_dtypes(store, raw):
+    assert store.replace("acme", raw, fingerprint="fp-1") == len(raw)
+    back = store.load("acme")
+    assert list(back.columns) == list(raw.columns)
+    assert back.dtypes.to_dict() == raw.dtypes.to_dict()
+    np.testing.assert_array_equal(row_hashes(back), row_hashes(raw))
+
+
+def test_lookup_by_fingerprint_follows_the_current_version(store, raw):
+    store.replace("acme", raw, fingerprint="fp-1")
+    assert store.lookup("fp-1") == "acme"
+    assert store.lookup("fp-2") is None
+    pd.testing.assert_frame_equal(store.load_upload("fp-1"), store.load("acme"))
+
+    # دفتر الشركة تغيّر بعد ذلك: البصمة القديمة لم تعد تطابقه
+    store.upsert("acme", raw.iloc[:2].assign(revenue=1.0))
+    assert store.lookup("fp-1") is None and store.load_upload("fp-1") is None
+
+
+def test_upsert_replaces_same_keys_and_appends_new(store):
+    old = make_ledger(months=6)
+    new = make_ledger(months=8, seed=3)
+    store.replace("acme", old)
+    store.upsert("acme", new)
+    back = store.load("acme")
+    assert len(back) == len(new)
+    np.testing.assert_allclose(
+        back.sort_values(["entity_name", "date"])["revenue"],
+        new.sort_values(["entity_name", "date"])["revenue"],
+    )
+    assert store.entities("acme") == sorted(new["entity_name"].unique())
+
+
+def test_missing_values_and_text_columns(store):
+    df = pd.DataFrame({
+        "date": ["2024-01", "2024-02", None],
+        "revenue": [1.5, np.nan, 3.0],
+        "memo": ["أ", None, "ج"],
+        "count": pd.array([1, None, 3], dtype="Int64"),
+    })
+    store.replace("acme", df)
+    back = store.load("acme")
+    assert back["date"].tolist()[:2] == ["2024-01", "2024-02"] and pd.isna(back["date"][2])
+    assert back["revenue"].isna().tolist() == [False, True, False]
+    assert back["memo"].tolist()[::2] == ["أ", "ج"] and pd.isna(back["memo"][1])
+    assert back["count"].dtype == "Int64" and back["count"].isna().tolist() == [False, True, False]
+
+
+def test_monthly_and_range_queries(store, ledger):
+    store.replace("acme", ledger)
+    monthly = store.monthly("acme", start="2023-03-01", end="2023-05-31")
+    direct = ledger[(ledger["date"] >= "2023-03-01") & (ledger["date"] <= "2023-05-31")]
+    np.testing.assert_allclose(monthly["revenue"], direct.groupby("date")["revenue"].sum())
+    assert store.date_range("acme") == (ledger["date"].min(), ledger["date"].max())
+    with pytest.raises(KeyError):
+        store.load("globex")
+
+
+def test_stored_ledger_feeds_incremental_run(store, raw):
+    forget()
+    try:
+        incremental_run("acme", raw)
+        store.replace("acme", raw, fingerprint="fp-1")
+        state = incremental_run("acme", store.load_upload("fp-1"))
+        assert state.diff.unchanged
+    finally:
+        forget()
@@ -0,0 +1,75 @@
+# tests/test_streaming.py
+"""التجميع المتدفق للقيود مقابل groupby مباشر على الإطار كاملًا."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.kpi import compute_kpis
+from engine.streaming import aggregate_transactions
+from engine.taxes import compute_vat
+
+
+def _transactions(rows: int = 3_000, vat: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366, rows), unit="D"),
+        "entity_name": rng.choice(np.array(["الرياض", "جدة"]), rows),
+        "revenue": np.round(rng.uniform(0, 5_000, rows), 2),
+        "expenses": np.round(rng.uniform(0, 3_000, rows), 2),
+    })
+    if vat:
+        df["vat_collected"] = np.round(df["revenue"] * 0.15, 2)
+    return df
+
+
+def _chunks(df: pd.DataFrame, size: int):
+    return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+
+def test_chunked_aggregation_matches_direct_groupby():
+    tx = _transactions()
+    monthly, stats = aggregate_transactions(_chunks(tx, 250))
+    assert stats.rows == len(tx) and stats.chunks == 12
+
+    month = tx["date"].dt.to_period("M").dt.to_timestamp(how="end").dt.normalize()
+    direct = (tx.assign(date=month).groupby(["entity_name", "date"])[["revenue", "expenses"]]
+                .sum().reset_index())
+    assert len(monthly) == len(direct)
+    np.testing.assert_allclose(monthly["revenue"].to_numpy(), direct["revenue"].to_numpy())
+    np.testing.assert_allclose(monthly["expenses"].to_numpy(), direct["expenses"].to_numpy())
+    assert monthly["date"].tolist() == direct["date"].tolist()
+
+
+def test_missing_vat_columns_keep_the_rate_fallback():
+    # regression: القيود بلا أعمدة ضريبة كانت تُملأ بأصفار فيصبح صافي الضريبة 0
+    tx = _transactions()
+    monthly, _ = aggregate_transactions(_chunks(tx, 700))
+    assert "vat_collected" not in monthly.columns
+    assert "vat_paid" not in monthly.columns
+    expected = (tx["revenue"].sum() - tx["expenses"].sum()) * 0.15
+    assert compute_vat(compute_core(monthly)) == pytest.approx(expected, abs=1e-6)
+    assert compute_kpis(compute_core(monthly)).net_vat == pytest.approx(expected, abs=1e-6)
+
+
+def test_metric_present_in_some_chunks_only_sums_as_zero_elsewhere():
+    tx = _transactions(vat=True)
+    first, rest = tx.iloc[:1_000], tx.iloc[1_000:].drop(columns="vat_collected")
+    monthly, _ = aggregate_transactions([first, rest])
+    assert monthly["vat_collected"].sum() == pytest.approx(first["vat_collected"].sum())
+
+
+def test_alias_columns_are_resolved_like_compute_core():
+    tx = _transactions(vat=True)
+    renamed = tx.rename(columns={"date": "تاريخ", "revenue": "sales", "vat_collected": "output_vat",
+                                 "entity_name": "المنشأة"})
+    expected, _ = aggregate_transactions(_chunks(tx, 500))
+    monthly, _ = aggregate_transactions(_chunks(renamed, 500))
+    pd.testing.assert_frame_equal(monthly, expected)
+
+
+def test_chunk_without_date_column_is_rejected():
+    with pytest.raises(ValueError):
+        aggregate_transactions([pd.DataFrame({"revenue": [1.0]})])
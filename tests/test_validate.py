@@ -0,0 +1,63 @@
+# tests/test_validate.py
+"""أقنعة قواعد جودة البيانات: بت لكل قاعدة لكل صف."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from engine.validate import (
+    BAD_DATE, DUPLICATE_MONTH, DUPLICATE_ROW, MISSING_DATE, NEGATIVE_REVENUE, NON_NUMERIC,
+    validate_columns, validate_frame,
+)
+
+
+@pytest.fixture
+def dirty() -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": ["2024-01-31", "2024-02-29", "not a date", "", "2024-02-10", "2024-01-31"],
+        "entity_name": ["A", "A", "A", "A", "A", "A"],
+        "revenue": ["100", "abc", "-5", "20", " ", "100"],
+        "expenses": [10, 20, 30, 40, 50, 10],
+    })
+
+
+def test_each_row_gets_the_bits_of_the_rules_it_breaks(dirty):
+    report = validate_frame(dirty)
+    assert report.rows == 6
+    assert report.mask.tolist() == [
+        0,
+        NON_NUMERIC,
+        BAD_DATE | NEGATIVE_REVENUE,
+        MISSING_DATE,
+        DUPLICATE_MONTH,                    # فبراير مكرر للمنشأة A
+        DUPLICATE_MONTH | DUPLICATE_ROW,    # نسخة مطابقة للصف الأول
+    ]
+    assert dict(report.counts) == {
+        "non_numeric": 1, "negative_revenue": 1, "bad_date": 1,
+        "missing_date": 1, "duplicate_month": 2, "duplicate_row": 1,
+    }
+    assert report.bad_rows == 5 and not report.ok
+    assert report.rows_with("duplicate_month").tolist() == [4, 5]
+    assert "صفوف مكررة: 1" in report.summary()
+
+
+def test_same_month_in_different_entities_is_not_a_duplicate(dirty):
+    df = dirty.iloc[[0, 5]].assign(entity_name=["A", "B"], date=["2024-01-31", "2024-01-15"])
+    assert validate_frame(df).ok
+
+
+def test_rule_subset_and_fail_fast(dirty):
+    report = validate_frame(dirty, rules=["missing_date"])
+    assert dict(report.counts) == {"missing_date": 1}
+    assert report.mask.tolist() == [0, 0, 0, MISSING_DATE, 0, 0]
+    with pytest.raises(ValueError, match="first at row 1"):
+        validate_frame(dirty, mode="fail_fast")
+    with pytest.raises(ValueError):
+        validate_frame(dirty, rules=["spelling"])
+
+
+def test_clean_ledger_passes(ledger):
+    report = validate_frame(ledger)
+    assert report.ok and report.bad_rows == 0
+    assert report.summary() == "لا توجد مشاكل في جودة البيانات."
+    assert validate_columns(ledger) == ["revenue", "expenses"]
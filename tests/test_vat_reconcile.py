@@ -0,0 +1,76 @@
+# tests/test_vat_reconcile.py
+"""مطابقة ضريبة سطور الفواتير: الدفعات = الإطار الكامل، والمخالفات المزروعة تُكتشف."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.vat_reconcile import reconcile_invoices, reconcile_lines
+
+
+def _invoice_lines(rows: int = 2_000, bad_share: float = 0.02):
+    rng = np.random.default_rng(3)
+    amount = np.round(rng.uniform(-100, 5_000, rows), 2)
+    vat = np.round(amount * 0.15, 2)
+    bad = rng.random(rows) < bad_share
+    vat[bad] += 1.0
+    lines = pd.DataFrame({
+        "invoice_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366, rows), unit="D"),
+        "invoice_type": rng.choice(np.array(["sales", "purchase"]), rows),
+        "net_amount": amount,
+        "vat_amount": vat,
+        "entity_name": rng.choice(np.array(["الرياض", "جدة"]), rows),
+    })
+    return lines, int(bad.sum())
+
+
+@pytest.mark.parametrize("frequency", ["monthly", "quarterly"])
+def test_chunked_equals_full_and_finds_planted_mismatches(frequency):
+    lines, planted = _invoice_lines()
+    full = reconcile_invoices(lines, frequency=frequency)
+    chunked = reconcile_invoices((lines.iloc[i:i + 300] for i in range(0, len(lines), 300)),
+                                 frequency=frequency)
+    pd.testing.assert_frame_equal(full.periods, chunked.periods)
+    assert full.mismatched_lines == chunked.mismatched_lines == planted
+    assert len(full.mismatches) == planted
+    assert full.lines == len(lines) and full.unassigned_lines == 0
+    assert len(full.periods) == 2 * (12 if frequency == "monthly" else 4)
+
+    sales = lines[lines["invoice_type"] == "sales"]
+    assert full.periods["output_stated"].sum() == pytest.approx(sales["vat_amount"].sum(), abs=1e-6)
+    assert full.periods["difference"].sum() == pytest.approx(
+        full.periods["net_vat_stated"].sum() - full.periods["net_vat_expected"].sum(), abs=1e-6)
+
+
+def test_periods_carry_the_filing_calendar():
+    lines, _ = _invoice_lines(rows=200, bad_share=0.0)
+    first = reconcile_invoices(lines).periods.iloc[0]
+    assert (first["period"], first["due_date"]) == ("2024Q1", pd.Timestamp("2024-04-30"))
+    with pytest.raises(ValueError):
+        reconcile_invoices(lines, frequency="weekly")
+
+
+def test_line_rates_and_tolerance():
+    lines = pd.DataFrame({
+        "type": ["sales", "sales", "purchase"],
+        "amount": [100.0, 100.0, 200.0],
+        "vat": [5.0, 15.02, 30.0],
+        "vat_rate": [5, np.nan, 0.15],         # 5 = 5%، الفارغ = النسبة الافتراضية
+    })
+    out = reconcile_lines(lines)
+    assert out["direction"].tolist() == ["output", "output", "input"]
+    assert out["expected_vat"].tolist() == [5.0, 15.0, 30.0]
+    assert out["mismatch"].tolist() == [False, True, False]
+    assert not reconcile_lines(lines, tolerance=0.05)["mismatch"].any()
+    with pytest.raises(ValueError):
+        reconcile_lines(lines.drop(columns="vat"))
+
+
+def test_unassigned_lines_are_counted():
+    lines, _ = _invoice_lines(rows=50, bad_share=0.0)
+    lines.loc[0, "invoice_type"] = "unknown"
+    lines.loc[1, "invoice_date"] = pd.NaT
+    result = reconcile_invoices(lines)
+    assert result.unassigned_lines == 2
+    assert result.periods["lines"].sum() == 48
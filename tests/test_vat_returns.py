@@ -0,0 +1,60 @@
+# tests/test_vat_returns.py
+"""إقرارات VAT لكل (منشأة × فترة) مقابل compute_vat على الجزء المقابل، والمساعدات المشتركة."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.compute_core import compute_core
+from engine.kpi import compute_kpis
+from engine.taxes import compute_vat
+from engine.vat_returns import (
+    compute_vat_returns, entity_period_sums, month_periods, next_month_due, vat_return_totals,
+)
+
+
+@pytest.mark.parametrize("frequency", ["monthly", "quarterly"])
+def test_returns_match_compute_vat_per_period(ledger_no_vat, frequency):
+    core = compute_core(ledger_no_vat)
+    returns = compute_vat_returns(core, frequency)
+    period = core["date"].dt.to_period("M" if frequency == "monthly" else "Q").astype(str)
+    for (ent, p), part in core.groupby([core["entity_name"], period]):
+        row = returns[(returns["entity_name"] == ent) & (returns["period"] == p)]
+        assert len(row) == 1
+        assert row["net_vat"].iloc[0] == pytest.approx(compute_vat(part), abs=1e-6)
+    totals = vat_return_totals(returns)
+    assert totals["net_vat"].sum() == pytest.approx(compute_kpis(core).net_vat, abs=1e-6)
+
+
+def test_due_date_is_end_of_following_month(ledger):
+    returns = compute_vat_returns(compute_core(ledger), "quarterly")
+    first = returns.iloc[0]
+    assert (first["period"], first["period_end"]) == ("2023Q1", pd.Timestamp("2023-03-31"))
+    assert first["due_date"] == pd.Timestamp("2023-04-30")
+
+
+def test_empty_periods_are_zero_returns(ledger):
+    core = compute_core(ledger)
+    gap = core[~core["date"].between("2023-04-01", "2023-06-30")]
+    returns = compute_vat_returns(gap, "quarterly")
+    q2 = returns[returns["period"] == "2023Q2"]
+    assert len(q2) == 2 and (q2["rows"] == 0).all() and (q2["net_vat"] == 0).all()
+    with pytest.raises(ValueError):
+        compute_vat_returns(core, "weekly")
+
+
+def test_shared_period_helpers():
+    ords = np.array([2024 * 12, 2024 * 12 + 11])     # يناير وديسمبر 2024
+    months = month_periods(ords)
+    assert months.astype(str).tolist() == ["2024-01", "2024-12"]
+    assert next_month_due(months).tolist() == [pd.Timestamp("2024-02-29"), pd.Timestamp("2025-01-31")]
+    assert next_month_due(months, day=15).tolist() == [pd.Timestamp("2024-02-15"), pd.Timestamp("2025-01-15")]
+
+    grid = entity_period_sums(np.array(["B", "A", "B"], dtype=object), np.array([5, 5, 7]),
+                              {"x": np.array([1.0, 2.0, 3.0])})
+    assert (grid.start, grid.t) == (5, 3)
+    assert grid.entity_column().tolist() == ["A"] * 3 + ["B"] * 3
+    assert grid.per_period([5, 6, 7]).tolist() == [5, 6, 7] * 2
+    assert grid.sums["x"].tolist() == [2.0, 0.0, 0.0, 1.0, 0.0, 3.0]
+    assert grid.sums["rows"].tolist() == [1, 0, 0, 1, 0, 1]
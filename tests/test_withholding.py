@@ -0,0 +1,64 @@
+# tests/test_withholding.py
+"""ضريبة الاستقطاع: النسب حسب نوع الدفعة، الإعفاء والنسب الاتفاقية، والصفوف المستبعدة."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from engine.config import WITHHOLDING_DEFAULT_TYPE
+from engine.withholding import (
+    INVALID_AMOUNT, INVALID_DATE, classify_payments, compute_withholding, withholding_totals,
+)
+
+
+@pytest.fixture
+def payments() -> pd.DataFrame:
+    return pd.DataFrame({
+        "payment_date": ["2024-01-15", "2024-01-20", "2024-02-03", "bad date", "2024-02-10"],
+        "amount": ["2,000", 1_000.0, 500.0, 100.0, "n/a"],
+        "payment_type": ["royalties", "management fees", "something else", "rent", "rent"],
+    })
+
+
+def test_rates_due_dates_and_rejected_rows(payments):
+    result = compute_withholding(payments)
+    out = result.payments
+    assert out["amount"].tolist() == [2_000.0, 1_000.0, 500.0]
+    assert out["rate"].tolist() == [0.15, 0.20, 0.15]
+    assert out["withholding"].tolist() == [300.0, 200.0, 75.0]
+    assert out["net_payment"].tolist() == [1_700.0, 800.0, 425.0]
+    assert out["month"].tolist() == ["2024-01", "2024-01", "2024-02"]
+    assert out["due_date"].tolist() == [pd.Timestamp("2024-02-10")] * 2 + [pd.Timestamp("2024-03-10")]
+
+    assert result.rejected["reason"].tolist() == [INVALID_DATE, INVALID_AMOUNT]
+    assert result.invalid_dates == 1 and result.invalid_amounts == 1
+    assert result.rejected.index.tolist() == [3, 4]
+
+
+def test_treaty_rates_and_residents(payments):
+    payments = payments.assign(withholding_rate=[5, None, 0.1, None, None],
+                               is_resident=["no", "yes", "no", "no", "no"])
+    out = compute_withholding(payments).payments
+    assert out["rate"].tolist() == [0.05, 0.0, 0.1]
+    assert out["withholding"].tolist() == [100.0, 0.0, 50.0]
+
+
+def test_totals_by_month_and_type(payments):
+    out = compute_withholding(payments).payments
+    totals = withholding_totals(out)
+    assert totals["withholding"].tolist() == [500.0, 75.0]
+    assert totals["payments"].tolist() == [2, 1]
+    by_type = withholding_totals(out, by_type=True)
+    assert len(by_type) == 3 and "payment_type" in by_type.columns
+    assert withholding_totals(out.iloc[:0]).empty
+
+
+def test_classify_payments_maps_unknown_to_default():
+    kinds, rates = classify_payments(pd.Series(["Royalties", None, "إيجار", "gifts"]))
+    assert kinds.tolist() == ["royalties", WITHHOLDING_DEFAULT_TYPE, "rent", WITHHOLDING_DEFAULT_TYPE]
+    assert rates.tolist() == [0.15, 0.15, 0.05, 0.15]
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError):
+        compute_withholding(pd.DataFrame({"amount": [1.0]}))
@@ -0,0 +1,69 @@
+# tests/test_zakat_returns.py
+"""زكاة كل (منشأة × سنة مالية) من رصيد الإقفال، محسوبة يدويًا على صفوف شهرية."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from engine.money import money_mode
+from engine.reminder_core import CompanyProfile
+from engine.zakat_returns import compute_zakat_returns, fiscal_years, zakat_return_totals
+
+JUNE = CompanyProfile(fiscal_year_end_month=6, fiscal_year_end_day=30)
+
+
+@pytest.fixture
+def monthly() -> pd.DataFrame:
+    # السنة المالية تنتهي في 30 يونيو. صف يونيو 2023 قبل مايو في الملف: الإقفال بالتاريخ لا بالترتيب
+    return pd.DataFrame({
+        "date": ["2023-01-31", "2023-06-30", "2023-05-31", "2023-07-31", "2024-03-31",
+                 "2023-03-31", "2023-04-30", "2024-06-30"],
+        "entity_name": ["الرياض"] * 5 + ["جدة"] * 3,
+        "revenue": [10_000.0] * 8,
+        "cash": [100_000.0, 60_000.0, 90_000.0, 70_000.0, 40_000.0, 0.0, 0.0, 0.0],
+        "accounts_receivable": [20_000.0, 30_000.0, 25_000.0, 10_000.0, 12_000.0, 0.0, 0.0, 0.0],
+        "accounts_payable": [5_000.0, 10_000.0, 8_000.0, 4_000.0, 2_000.0, 0.0, 0.0, 0.0],
+        "zakat_base": [0.0] * 5 + [300_000.0, 200_000.0, 500_000.0],
+    })
+
+
+def test_closing_balances_not_sums_of_months(monthly):
+    returns = compute_zakat_returns(monthly, JUNE).set_index(["entity_name", "fiscal_year"])
+    riyadh23 = returns.loc[("الرياض", "FY2023")]
+    assert riyadh23["rows"] == 3
+    # رصيد 30 يونيو 2023 فقط: (60,000 + 30,000) - 10,000
+    assert (riyadh23["assets"], riyadh23["liabilities"]) == (90_000.0, 10_000.0)
+    assert riyadh23["zakat_base"] == 80_000.0
+    assert riyadh23["zakat_due"] == pytest.approx(2_000.0)
+
+    # FY2024 لم تُقفل بعد: آخر صف مؤرخ (مارس 2024)
+    riyadh24 = returns.loc[("الرياض", "FY2024")]
+    assert riyadh24["rows"] == 2
+    assert riyadh24["zakat_base"] == (40_000.0 + 12_000.0) - 2_000.0
+
+    # وعاء جاهز: آخر قيمة في السنة (أبريل 2023 لـ FY2023، يونيو 2024 لـ FY2024)
+    assert returns.loc[("جدة", "FY2023"), "zakat_base"] == 200_000.0
+    assert returns.loc[("جدة", "FY2024"), "zakat_due"] == pytest.approx(12_500.0)
+
+    assert returns.loc[("الرياض", "FY2023"), "period_end"] == pd.Timestamp("2023-06-30")
+    assert returns.loc[("الرياض", "FY2023"), "due_date"] == pd.Timestamp("2023-10-28")
+
+    totals = zakat_return_totals(returns.reset_index()).set_index("fiscal_year")
+    assert totals.loc["FY2023", "zakat_base"] == 280_000.0
+    assert totals["rows"].sum() == len(monthly)
+
+
+def test_halala_mode_gives_the_same_balances(monthly):
+    plain = compute_zakat_returns(monthly, JUNE)
+    with money_mode("halala"):
+        exact = compute_zakat_returns(monthly, JUNE)
+    pd.testing.assert_series_equal(plain["zakat_due"], exact["zakat_due"])
+
+
+def test_fiscal_years_and_bad_profiles(monthly):
+    fy = fiscal_years(pd.Series(["2023-06-30", "2023-07-01", None]), 6, 30)
+    assert fy.tolist() == [2023, 2024, -1]
+    # 29 فبراير يُقص لآخر الشهر في السنوات البسيطة
+    assert fiscal_years(pd.Series(["2023-02-28", "2023-03-01"]), 2, 29).tolist() == [2023, 2024]
+    with pytest.raises(ValueError):
+        compute_zakat_returns(monthly, CompanyProfile(fiscal_year_end_month=13))
@@ -2,7 +2,9 @@
 # app.py — Rakeem Intelligent Dashboard (Full Version with Forecast Alerts + Dynamic Report Recs)
 # =======================================
 
+import logging
 import os, sys
+from functools import lru_cache
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -21,18 +23,20 @@ if REPO_ROOT not in sys.path:
 
 
 # ---------- Imports ----------
-from engine.io import load_excel, load_csv
-from engine.validate import validate_columns
-from engine.compute_core import compute_core
-from engine.forecasting_core import build_revenue_forecast
-from engine.taxes import compute_vat, compute_zakat
+from engine.io import file_fingerprint, load_excel, load_excel_sheets, load_csv
+from engine.validate import validate_columns, validate_frame
+from engine.compact import compact_frame
+from engine.config import DEFAULT_ENGINE_CONFIG
+from engine.incremental import incremental_run
+from engine.pipeline import AnalysisPipeline, PipelineMemo
+from engine.store import get_store
 from generator.report_generator import generate_financial_report
 from llm.run import rakeem_engine
 from ui.calendar_page import render_calendar_page
 from engine.reminder_core import CompanyProfile
-from engine.taxes import compute_vat, compute_zakat
 from openai import OpenAI
 client = OpenAI()
+logger = logging.getLogger("rakeem.app")
 
 
 # ---------- Theme ----------
@@ -308,7 +312,8 @@ def format_sar(x):
         return "—"
 
 
-def rakeem_llm_alert(title, reason, recommendations):
+@lru_cache(maxsize=128)
+def _rakeem_llm_alert(title, reason, recommendations):
     prompt = f"""
 أنت نظام مالي احترافي اسمه "ركيم".
 أعد صياغة التنبيه بطريقة مترابطة ومهنية، في فقرة واضحة واحدة تشرح:
@@ -332,7 +337,7 @@ def rakeem_llm_alert(title, reason, recommendations):
 {reason}
 
 التوصيات:
-{recommendations}
+{list(recommendations)}
 
 أعد الصياغة الآن.
 """
@@ -346,17 +351,23 @@ def rakeem_llm_alert(title, reason, recommendations):
     return res.choices[0].message.content
 
 
-# ---------- Pages ----------
-def dashboard_page(df, company_name: str):
+def rakeem_llm_alert(title, reason, recommendations):
+    # نفس التنبيه بعد إعادة رفع الملف لا يُعاد إرساله للنموذج
+    return _rakeem_llm_alert(title, reason, tuple(recommendations))
 
 
+# ---------- Pages ----------
+def dashboard_page(pipe, company_name: str):
+    df = pipe["core"]
+
     # ---------- Core Financial Totals ----------
-    rev = df["revenue"].sum()
-    exp = df["expenses"].sum()
-    prof = df["profit"].sum()
-    cash = df["cash_flow"].sum()
-    vat = compute_vat(df)
-    zakat = compute_zakat(df)
+    kpis = pipe["kpis"]
+    rev = kpis.total_revenue
+    exp = kpis.total_expenses
+    prof = kpis.total_profit
+    cash = kpis.total_cash_flow
+    vat = kpis.net_vat
+    zakat = kpis.zakat_due
 
 
     # ---------- KPI Section ----------
@@ -377,12 +388,33 @@ def dashboard_page(df, company_name: str):
         )
     st.markdown('</div></div>', unsafe_allow_html=True)
 
+    # ---------- Per-Entity Breakdown ----------
+    by_entity = pipe["kpis_by_entity"]
+    if len(by_entity) > 1:
+        st.markdown('<div class="section"><div class="sec-title">المؤشرات حسب المنشأة</div>', unsafe_allow_html=True)
+        st.dataframe(
+            by_entity[["entity_name", "total_revenue", "total_expenses", "total_profit",
+                       "total_cash_flow", "net_vat", "zakat_due"]].rename(columns={
+                "entity_name": "المنشأة",
+                "total_revenue": "الإيرادات",
+                "total_expenses": "المصروفات",
+                "total_profit": "صافي الربح",
+                "total_cash_flow": "التدفق النقدي",
+                "net_vat": "صافي الضريبة (VAT)",
+                "zakat_due": "الزكاة المستحقة",
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.markdown("</div>", unsafe_allow_html=True)
+
     # ---------- Monthly Trends ----------
     st.markdown('<div class="section"><div class="sec-title">الاتجاهات الشهرية</div>', unsafe_allow_html=True)
+    monthly = pipe["cube"].frame("month", ["revenue", "expenses", "profit"])
     tabs = st.tabs(["الإيرادات", "المصروفات", "الأرباح"])
     for i, col in enumerate(["revenue", "expenses", "profit"]):
         with tabs[i]:
-            d = df[["date", col]].dropna()
+            d = monthly[["date", col]]
             if not d.empty:
                 fig = px.line(d, x="date", y=col, template="plotly_white", color_discrete_sequence=[PRIMARY])
                 fig.update_layout(height=350, margin=dict(l=10, r=10, t=20, b=10))
@@ -395,78 +427,19 @@ def dashboard_page(df, company_name: str):
 
     try:
         # ===== بناء التنبؤ =====
-        fc = build_revenue_forecast(df, periods=6)
+        fc = pipe["forecast"]
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=df["date"], y=df["revenue"], name="الإيرادات الفعلية", line=dict(color=PRIMARY)))
         fig.add_trace(go.Scatter(x=fc["date"], y=fc["forecast"], name="التنبؤ", line=dict(color=GOLD, dash="dash")))
         fig.update_layout(template="plotly_white", height=400)
         st.plotly_chart(fig, use_container_width=True)
 
-        # ===== تحليل آخر 3 أشهر =====
-        recent_df = df.tail(3)
-        rev_recent = recent_df["revenue"].sum()
-        profit_recent = recent_df["profit"].sum()
-        cashflow_recent = recent_df["cash_flow"].sum()
-        vat_recent = compute_vat(recent_df)
-        zakat_recent = compute_zakat(recent_df)
-
-        alerts = []
-
-        # ===== تنبيه: الربحية =====
-        profit_margin = (profit_recent / rev_recent) if rev_recent > 0 else 0
-
-        if profit_margin < 0.1:
-            title = "انخفاض حاد في هامش الربح (<10%)"
-            reason = "التحليل يبين تراجعًا ملحوظًا في الربحية خلال آخر ثلاثة أشهر."
-            recs = [
-                "إعادة تقييم الأسعار وتحسين هوامش الربح.",
-                "تقليص المصروفات التشغيلية ذات التأثير المحدود."
-            ]
-            llm_text = rakeem_llm_alert(title, reason, recs)
-            alerts.append({"level": "high", "title": title, "llm": llm_text})
-
-        elif profit_margin < 0.2:
-            title = "ضعف مستوى الربحية (<20%)"
-            reason = "الربحية الحالية أقل من المستوى المتوقع للاستقرار المالي."
-            recs = [
-                "رفع كفاءة دورة الإيرادات عبر تعزيز المبيعات.",
-                "مراجعة المصروفات التشغيلية وتحسين كفاءتها."
-            ]
-            llm_text = rakeem_llm_alert(title, reason, recs)
-            alerts.append({"level": "medium", "title": title, "llm": llm_text})
-
-        # ===== تنبيه: التدفق النقدي =====
-        if cashflow_recent < 0:
-            title = "تدفق نقدي سلبي"
-            reason = "المتحصلات النقدية أقل من المصروفات خلال الفترة الأخيرة."
-            recs = [
-                "تعزيز التحصيل وتقليل آجال السداد.",
-                "إدارة الالتزامات قصيرة الأجل بشكل أكثر مرونة."
-            ]
-            llm_text = rakeem_llm_alert(title, reason, recs)
-            alerts.append({"level": "high", "title": title, "llm": llm_text})
-
-        # ===== تنبيه: الزكاة =====
-        if zakat_recent > rev_recent * 0.2:
-            title = "ارتفاع نسبة الزكاة (>20%)"
-            reason = "الزكاة المستحقة مرتفعة مقارنة بحجم الإيرادات."
-            recs = [
-                "مراجعة آلية احتساب الزكاة.",
-                "تقييم الأصول غير المستغلة لتقليل البنود الخاضعة."
-            ]
-            llm_text = rakeem_llm_alert(title, reason, recs)
-            alerts.append({"level": "medium", "title": title, "llm": llm_text})
-
-        # ===== تنبيه: ضريبة القيمة المضافة =====
-        if vat_recent > rev_recent * 0.2:
-            title = "ارتفاع ضريبة القيمة المضافة (>20%)"
-            reason = "القيمة المسجلة للضريبة مرتفعة مقارنة بالإيرادات."
-            recs = [
-                "التحقق من دقة خصم ضريبة المدخلات.",
-                "مطابقة الإقرارات الضريبية مع حركة المبيعات."
-            ]
-            llm_text = rakeem_llm_alert(title, reason, recs)
-            alerts.append({"level": "medium", "title": title, "llm": llm_text})
+        # ===== تحليل آخر 3 أشهر (قواعد التنبيه في engine.rules_engine.build_alerts) =====
+        alerts = [
+            {"level": a["level"], "title": a["title"],
+             "llm": rakeem_llm_alert(a["title"], a["reason"], a["recs"])}
+            for a in pipe["alerts"]
+        ]
 
         # ===== عرض التنبيهات =====
         if alerts:
@@ -504,7 +477,7 @@ def dashboard_page(df, company_name: str):
     st.markdown('<div class="page-spacer"></div>', unsafe_allow_html=True)
 
 
-def chat_page(df):
+def chat_page(pipe):
     # تحديد اسم الشركة لعرضه داخل الرسائل عند الحاجة
     company_name = st.session_state.get("company_name", "شركتك")
 
@@ -534,7 +507,7 @@ def chat_page(df):
     if user_q:
         st.session_state.chat_msgs.append({"role":"user","content":user_q})
         try:
-            res = rakeem_engine.answer(user_q, df=df, company_name=company_name)
+            res = rakeem_engine.answer(user_q, company_name=company_name, pipeline=pipe)
             reply = res.get("html", "—")
         except Exception as e:
             reply = f"⚠ حدث خطأ أثناء التحليل: {e}"
@@ -552,58 +525,30 @@ def review_page():
     st.file_uploader("📤 رفع تقرير المراجعة النهائي", type=["pdf","xlsx","docx"])
     st.markdown('<div class="page-spacer"></div>', unsafe_allow_html=True)
 
-def report_page(df):
+def report_page(pipe):
     st.markdown('<div class="section"><div class="sec-title">توليد التقارير 📄</div>', unsafe_allow_html=True)
 
-    # أرقام أساسية للتوصيات الديناميكية
-    rev       = float(df["revenue"].sum())
-    exp       = float(df["expenses"].sum())
-    profit    = float(df["profit"].sum())
-    cashflow  = float(df["cash_flow"].sum())
-    net_vat   = float(compute_vat(df))
-    zakat_due = float(compute_zakat(df))
-
     company_name = st.session_state.get("company_name", "شركة غير محددة")
 
     if st.button("توليد التقرير الآن"):
-        # توصيات ديناميكية (مأخوذة من الكود المرجعي)
-        dyn_recs = []
-        profit_margin = (profit / rev) if rev > 0 else 0.0
-        if exp > rev * 0.7:
-            dyn_recs.append("خفض المصروفات التشغيلية التي زادت عن 70٪ من الإيرادات خلال الفترة.")
-        else:
-            dyn_recs.append("استمر في ضبط المصروفات التشغيلية عند مستوياتها الحالية.")
-
-        if profit_margin < 0.2:
-            dyn_recs.append("ارفع هوامش الربح بمراجعة التسعير أو تحسين مزيج المنتجات.")
-        else:
-            dyn_recs.append("حافظ على مستوى هوامش الربح الحالي مع مراقبة أي تراجع مفاجئ.")
-
-        if cashflow < 0:
-            dyn_recs.append("حسّن دورة التحصيل النقدي وتقصير آجال المدينين لتحسين التدفق النقدي.")
-        else:
-            dyn_recs.append("استثمر جزءًا من التدفق النقدي الإيجابي في أنشطة توليد الإيرادات.")
-
-        dyn_recs.append("التأكد من مطابقة الإقرارات الضريبية والزكوية للبيانات المالية المعتمدة.")
-
+        # المؤشرات والتوصيات الديناميكية والجداول من عقدة report (تُحسب مرة لكل ملف)
+        report = pipe["report"]
+        data_tables = dict(report["data_tables"])
+        if "gosi_totals" in st.session_state:
+            data_tables["اشتراكات التأمينات الاجتماعية"] = st.session_state["gosi_totals"][
+                ["month", "due_date", "employees", "employer", "employee", "total"]
+            ]
+        if "withholding_totals" in st.session_state:
+            data_tables["ضريبة الاستقطاع"] = st.session_state["withholding_totals"][
+                ["month", "due_date", "payments", "amount", "withholding"]
+            ]
         try:
             path = generate_financial_report(
                 company_name=company_name,   # ← اسم الشركة الفعلي
                 report_title=f"التقرير المالي الشامل — {company_name}",
-                metrics={
-                    "total_revenue": rev,
-                    "total_expenses": exp,
-                    "total_profit": profit,
-                    "total_cashflow": cashflow,
-                    "net_vat": net_vat,
-                    "zakat_due": zakat_due,
-                },
-                recommendations=dyn_recs,
-                data_tables={
-                    "الإيرادات": df[["date","revenue"]],
-                    "المصروفات": df[["date","expenses"]],
-                    "الأرباح": df[["date","profit"]],
-                },
+                metrics=report["metrics"],
+                recommendations=report["recommendations"],
+                data_tables=data_tables,
                 template_path="generator/report_template.html",
                 output_pdf="financial_report.pdf"
             )
@@ -615,11 +560,17 @@ def report_page(df):
 
     st.markdown('<div class="page-spacer"></div>', unsafe_allow_html=True)
 
-def calendar_page():
+def calendar_page(pipe=None):
     import datetime as dt
     import calendar
     import pandas as pd
-    from engine.reminder_core import CompanyProfile, load_deadlines, next_due_date, upcoming_deadlines
+    from engine.reminder_core import CompanyProfile, load_deadlines, next_due_date
+    from engine.vat_returns import VAT_FREQUENCIES, vat_return_totals
+    from engine.zakat_returns import ZAKAT_DEADLINE_ID, zakat_return_totals
+    from engine.columns import resolve_aliases
+    from engine.config import PAYROLL_COLUMNS
+    from engine.gosi import GOSI_DEADLINE_ID, compute_gosi, gosi_totals
+    from engine.withholding import WITHHOLDING_DEADLINE_ID, compute_withholding, withholding_totals
 
     # ===== إعدادات الشركة =====
     st.markdown('<div class="section"><div class="sec-title">📅 التقويم الذكي — الالتزامات السعودية</div>', unsafe_allow_html=True)
@@ -630,12 +581,34 @@ def calendar_page():
     with col2:
         year = st.number_input("📅 السنة", 2024, 2030, dt.date.today().year)
     with col3:
-        vat_freq = st.selectbox("💰 تكرار ضريبة القيمة المضافة", ["monthly", "quarterly"],
+        # بدون key: Streamlit يحذف حالة العنصر عند عدم عرضه، فالاختيار يُحفظ في مفتاح جلسة عادي
+        freq_options = ["monthly", "quarterly"]
+        vat_freq = st.selectbox("💰 تكرار ضريبة القيمة المضافة", freq_options,
+                                index=freq_options.index(st.session_state.get(
+                                    "vat_frequency", CompanyProfile().vat_frequency)),
                                 format_func=lambda x: "شهري" if x == "monthly" else "ربع سنوي")
+        st.session_state["vat_frequency"] = vat_freq
+
+    # ===== نهاية السنة المالية: نفس الملف الشخصي للمواعيد ولمبالغ الزكاة =====
+    # تُحفظ في مفاتيح جلسة عادية (ليست مفاتيح عناصر) فيقرؤها الأنبوب في كل صفحة
+    default_profile = CompanyProfile()
+    col4, col5 = st.columns(2)
+    with col4:
+        fye_month = st.number_input(
+            "🗓 شهر نهاية السنة المالية", 1, 12,
+            int(st.session_state.get("fiscal_year_end_month", default_profile.fiscal_year_end_month)),
+        )
+    with col5:
+        fye_day = st.number_input(
+            "🗓 يوم نهاية السنة المالية", 1, 31,
+            int(st.session_state.get("fiscal_year_end_day", default_profile.fiscal_year_end_day)),
+        )
+    st.session_state["fiscal_year_end_month"] = int(fye_month)
+    st.session_state["fiscal_year_end_day"] = int(fye_day)
 
     profile = CompanyProfile(
-        fiscal_year_end_month=int(month),
-        fiscal_year_end_day=1,
+        fiscal_year_end_month=int(fye_month),
+        fiscal_year_end_day=int(fye_day),
         vat_frequency=vat_freq,
     )
 
@@ -643,6 +616,35 @@ def calendar_page():
     selected_year = int(year)
     selected_month = int(month)
 
+    # ===== ملف الرواتب (اختياري): اشتراكات التأمينات الاجتماعية لكل شهر =====
+    payroll_file = st.file_uploader("👥 ملف الرواتب (اختياري) لحساب اشتراكات التأمينات",
+                                    type=["xlsx", "xls", "csv"], key="payroll_file")
+    if payroll_file is not None:
+        try:
+            payroll = (load_csv(payroll_file) if payroll_file.name.lower().endswith(".csv")
+                       else load_excel(payroll_file, sheet=0))
+            # بدون عمود شهر: نفس الرواتب لكل أشهر السنة المختارة
+            months = (None if "month" in resolve_aliases(payroll, PAYROLL_COLUMNS)
+                      else pd.period_range(f"{selected_year}-01", periods=12, freq="M"))
+            st.session_state["gosi_totals"] = gosi_totals(compute_gosi(payroll, months=months))
+        except ValueError as e:
+            st.warning(f"تعذر حساب اشتراكات التأمينات: {e}")
+
+    # ===== دفتر المدفوعات لغير المقيمين (اختياري): ضريبة الاستقطاع لكل شهر =====
+    payments_file = st.file_uploader("🌍 مدفوعات لغير المقيمين (اختياري) لحساب ضريبة الاستقطاع",
+                                     type=["xlsx", "xls", "csv"], key="payments_file")
+    if payments_file is not None:
+        try:
+            payments = (load_csv(payments_file) if payments_file.name.lower().endswith(".csv")
+                        else load_excel(payments_file, sheet=0))
+            wht = compute_withholding(payments)
+            st.session_state["withholding_totals"] = withholding_totals(wht.payments)
+            if len(wht.rejected):
+                st.warning(f"⚠ استُبعد {len(wht.rejected):,} صف من حساب الاستقطاع: "
+                           f"{wht.invalid_dates:,} بتاريخ غير صالح و {wht.invalid_amounts:,} بمبلغ غير رقمي.")
+        except ValueError as e:
+            st.warning(f"تعذر حساب ضريبة الاستقطاع: {e}")
+
     # ===== دالة مساعدة لرسم شبكة الشهر =====
     def _month_grid(year, month, week_start=6):
         cal = calendar.Calendar(firstweekday=week_start)
@@ -656,18 +658,53 @@ def calendar_page():
     # ===== تحميل المهام =====
     data_path = "data/saudi_deadlines_ar.json"
     items = load_deadlines(data_path)
+
+    # مبالغ الالتزامات من بيانات الملف حسب تاريخ الاستحقاق: {المعرّف: {التاريخ: (الفترة, المبلغ)}}
+    vat_id = VAT_FREQUENCIES[vat_freq][0]
+    vat_ids = {v[0] for v in VAT_FREQUENCIES.values()}
+    amounts = {}
+    if pipe is not None:
+        cal_pipe = pipe.with_params(
+            vat_frequency=profile.vat_frequency,
+            fiscal_year_end_month=profile.fiscal_year_end_month,
+            fiscal_year_end_day=profile.fiscal_year_end_day,
+        )
+        vat = vat_return_totals(cal_pipe["vat_returns"])
+        zakat = zakat_return_totals(cal_pipe["zakat_returns"])
+        amounts[vat_id] = {r.due_date.date(): (r.period, r.net_vat) for r in vat.itertuples(index=False)}
+        amounts[ZAKAT_DEADLINE_ID] = {
+            r.due_date.date(): (r.fiscal_year, r.zakat_due) for r in zakat.itertuples(index=False)
+        }
+    if "gosi_totals" in st.session_state:
+        amounts[GOSI_DEADLINE_ID] = {
+            r.due_date.date(): (r.month, r.total)
+            for r in st.session_state["gosi_totals"].itertuples(index=False)
+        }
+    if "withholding_totals" in st.session_state:
+        amounts[WITHHOLDING_DEADLINE_ID] = {
+            r.due_date.date(): (r.month, r.withholding)
+            for r in st.session_state["withholding_totals"].itertuples(index=False)
+        }
+
     rows = []
     for it in items:
-        due = next_due_date(it, today, profile)
-        if due and due.month == selected_month and due.year == selected_year:
-            diff = (due - today).days
+        _id = it.get("المعرّف")
+        if _id in vat_ids and _id != vat_id:
+            continue  # إقرار VAT واحد حسب تكرار الشركة
+        by_due = amounts.get(_id, {})
+        dues = {next_due_date(it, today, profile)} | set(by_due)
+        for due in sorted(d for d in dues if d):
+            if due.month != selected_month or due.year != selected_year:
+                continue
+            period, amount = by_due.get(due, (None, None))
             rows.append({
-                "الاسم": it.get("الاسم"),
+                "الاسم": f"{it.get('الاسم')} ({period})" if period else it.get("الاسم"),
                 "الجهة": it.get("الجهة"),
                 "الفئة": it.get("الفئة"),
                 "تاريخ_الاستحقاق": due.isoformat(),
-                "الأيام_المتبقية": diff,
+                "الأيام_المتبقية": (due - today).days,
                 "الوصف": it.get("الوصف"),
+                "المبلغ": float(amount) if amount is not None else None,
             })
 
     df = pd.DataFrame(rows)
@@ -757,12 +794,15 @@ def calendar_page():
             cat = r["الفئة"]
             due = r["تاريخ_الاستحقاق"]
             remain = r["الأيام_المتبقية"]
+            amount = r.get("المبلغ")
+            amount_html = "" if amount is None or pd.isna(amount) else \
+                f" · <span style='color:{PRIMARY};font-weight:700;'>💰 المبلغ المستحق: {format_sar(amount)}</span>"
             st.markdown(
                 f"""
                 <div style='background:white;border:1px solid #e5e7eb;padding:10px 14px;border-radius:10px;margin-bottom:8px;'>
                     <b style='color:{PRIMARY}'>{name}</b> — {org} ({cat})<br>
                     <span style='color:#b91c1c;font-weight:700;'>📅 {due}</span> ·
-                    <span style='color:#f59e0b;font-weight:700;'>⏳ {"اليوم" if remain==0 else ("غدًا" if remain==1 else f"بعد {remain} يوم")}</span>
+                    <span style='color:#f59e0b;font-weight:700;'>⏳ {"اليوم" if remain==0 else ("غدًا" if remain==1 else f"بعد {remain} يوم")}</span>{amount_html}
                 </div>
                 """,
                 unsafe_allow_html=True
@@ -797,6 +837,7 @@ with st.sidebar:
         unsafe_allow_html=True
     )
     upl = st.file_uploader("", type=["xlsx","xls","csv"], key="uploaded_file")
+    st.checkbox("دمج كل أوراق المصنف (ورقة لكل فرع/سنة)", key="all_sheets")
 
     st.markdown("<hr>", unsafe_allow_html=True)
     st.markdown("<div class='sidebar-title'></div>", unsafe_allow_html=True)
@@ -870,9 +911,75 @@ if not upl:
     st.stop()
 
 ext = str(upl.name).split(".")[-1].lower()
-df_raw = load_excel(upl, sheet=0) if ext in ("xlsx","xls") else load_csv(upl)
+store = get_store() if DEFAULT_ENGINE_CONFIG.store.enabled else None
+upload_key = f"{file_fingerprint(upl.getvalue())}-{'sheets' if st.session_state.get('all_sheets') else ext}"
+# العميل العائد بنفس الملف: الدفتر يُقرأ من المخزن ببصمة الملف بدل تحليل Excel/CSV
+stored_company = None
+if store is not None:
+    try:
+        stored_company = store.lookup(upload_key)
+    except Exception:
+        logger.exception("Ledger store lookup failed for %s", upload_key)
+# مفتاح الشركة يُثبَّت عند أول رفع لهذا الملف — company_name يُضبط بعد أول تشغيل فلا يغيّر
+# المفتاح في rerun التالي، وإعادة رفع نسخة محدثة بنفس الاسم تبقى تشغيلًا تزايديًا
+company_key = st.session_state.setdefault(
+    f"company_key:{upl.name}", stored_company or st.session_state.get("company_name") or str(upl.name)
+)
+df_raw = None
+if stored_company is not None:
+    try:
+        df_raw = store.load(stored_company)
+    except Exception:
+        logger.exception("Ledger store read failed for %s", stored_company)
+if df_raw is None:
+    if ext in ("xlsx","xls"):
+        df_raw = load_excel_sheets(upl) if st.session_state.get("all_sheets") else load_excel(upl, sheet=0)
+    else:
+        df_raw = load_csv(upl)
+    # المخزن يُكتب مرة واحدة لكل ملف جديد — rerun بنفس الملف يقرأ منه أعلاه
+    if store is not None:
+        try:
+            store.replace(company_key, df_raw, fingerprint=upload_key)
+        except Exception:
+            # المخزن تحسين فقط — نكمل بالإطار المحلل
+            logger.exception("Ledger store write failed for %s", company_key)
 validate_columns(df_raw)
-df = compute_core(df_raw)
+quality = validate_frame(df_raw, mode="report")
+if not quality.ok:
+    st.warning(f"⚠ ملاحظات على جودة البيانات ({quality.bad_rows:,} صف): {quality.summary()}")
+# إعادة رفع نفس الملف (مع صفوف جديدة) تعيد حساب الصفوف والأشهر والمنشآت المتأثرة فقط
+run = incremental_run(
+    company_key,
+    df_raw,
+    forecast_periods=6,
+    fiscal_year_end_month=st.session_state.get("fiscal_year_end_month", CompanyProfile().fiscal_year_end_month),
+)
+df = run.core
+if DEFAULT_ENGINE_CONFIG.compact_frames:
+    df, compact_report = compact_frame(df)
+    logger.info("compact_frames: core %s -> %s bytes (%.0f%% saved, dropped %s)",
+                f"{compact_report.before_bytes:,}", f"{compact_report.after_bytes:,}",
+                compact_report.saved_pct, list(compact_report.dropped))
+# كل العقد المزروعة من نفس الإطار: مع الضغط تُزرع النواة فقط وتُحسب kpis/cube/forecast
+# منها داخل الأنبوب، وبدونه مشتقات run صالحة كما هي (نفس run.core)
+seed = {"core": df}
+if not DEFAULT_ENGINE_CONFIG.compact_frames:
+    seed.update(kpis=run.kpis, cube=run.cube, forecast=run.forecast)
+# باقي المشتقات (تنبيهات، توصيات، جداول التقرير...) تُحسب عند أول صفحة تطلبها فقط
+pipe = AnalysisPipeline(
+    df_raw,
+    params={
+        "forecast_periods": run.forecast_periods,
+        "fiscal_year_end_month": run.fiscal_year_end_month,
+        "fiscal_year_end_day": st.session_state.get("fiscal_year_end_day", CompanyProfile().fiscal_year_end_day),
+        "vat_frequency": st.session_state.get("vat_frequency", CompanyProfile().vat_frequency),
+        "compact_frames": DEFAULT_ENGINE_CONFIG.compact_frames,
+    },
+    fingerprint=run.fingerprint,
+    seed=seed,
+    # ذاكرة لكل جلسة — ملفات مستخدم لا تُخرج نتائج مستخدم آخر من LRU مشترك
+    memo=st.session_state.setdefault("pipeline_memo", PipelineMemo()),
+)
 
 if "company_name" not in st.session_state:
     st.session_state["company_name"] = infer_company_name(df_raw, df)
@@ -880,15 +987,15 @@ if "company_name" not in st.session_state:
 # ---------- Routing ----------
 page = st.session_state["page"]
 if page == "dashboard":
-    dashboard_page(df, st.session_state["company_name"])
+    dashboard_page(pipe, st.session_state["company_name"])
 elif page == "chat":
-    chat_page(df)
+    chat_page(pipe)
 elif page == "review":
     review_page()
 elif page == "reports":
-    report_page(df)
+    report_page(pipe)
 elif page == "calendar":
-    calendar_page()
+    calendar_page(pipe)
 
 # ---------- Footer ----------
 st.markdown('<div class="footer">© 2025 ركيـم — منصة الذكاء المالي المتكاملة</div>', unsafe_allow_html=True)